@@ -1,3 +1,5 @@
+import threading
+
 import instructor
 import openai
 from atomic_agents.lib.components.system_prompt_generator import SystemPromptGenerator
@@ -10,6 +12,7 @@ from agents.schemas import (
     CaseDecisionOutputSchema,
 )
 from config import get_api_key
+from tracing import trace_agent
 
 
 def setup_openai_client():
@@ -18,6 +21,27 @@ def setup_openai_client():
     return instructor.from_openai(openai.OpenAI(api_key=api_key))
 
 
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client():
+    """This process's shared client, created on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = setup_openai_client()
+    return _client
+
+
+def reset_openai_client():
+    """Forget the shared client, e.g. in a forked worker whose parent made one"""
+    global _client
+    with _client_lock:
+        _client = None
+
+
 def create_case_decision_system_prompt():
     """Create system prompt for case decision agent (AC vs RA)"""
     return SystemPromptGenerator(
@@ -113,22 +137,23 @@ def create_image_analysis_prompt():
     )
 
 
-def create_case_decision_agent(client):
+def create_case_decision_agent(client, model: str = "gpt-4.1"):
     """Create case decision agent for AC/RA classification"""
-    return BaseAgent(
+    agent = BaseAgent(
         config=BaseAgentConfig(
             client=client,
-            model="gpt-4.1",
+            model=model,
             system_prompt_generator=create_case_decision_system_prompt(),
             input_schema=CaseDecisionInputSchema,
             output_schema=CaseDecisionOutputSchema,
         )
     )
+    return trace_agent(agent, "case_decision")
 
 
 def create_image_analyzer(client):
     """Create image analysis agent"""
-    return BaseAgent(
+    agent = BaseAgent(
         config=BaseAgentConfig(
             client=client,
             model="gpt-4.1-mini",
@@ -137,13 +162,15 @@ def create_image_analyzer(client):
             output_schema=ImageAnalysisOutput,
         )
     )
+    return trace_agent(agent, "image_analyzer")
 
 
-def create_chat_agent(client, memory, session_context: str = ""):
-    """Create chat agent with memory and session context"""
+def create_chat_agent(client, memory, session_context: str = "", reference_notes=None):
+    """Create chat agent with memory, session context and retrieved policy notes"""
 
     # Create base system prompt
     base_prompt = create_chat_system_prompt()
+    enhanced_background = base_prompt.background
 
     # Always get the latest session context
     if session_context:
@@ -166,23 +193,34 @@ def create_chat_agent(client, memory, session_context: str = ""):
             context_lines.append(f"📍 Location: {context_dict['Location']}")
         if context_dict.get("Destination"):
             context_lines.append(f"🎯 Destination: {context_dict['Destination']}")
+        if context_dict.get("Prefectures"):
+            context_lines.append(f"🗺️ Prefectures: {context_dict['Prefectures']}")
         if context_dict.get("Description"):
             context_lines.append(f"📝 Details: {context_dict['Description']}")
 
         # Add structured context to background
-        enhanced_background = base_prompt.background + [
+        enhanced_background = enhanced_background + [
             "CURRENT CASE CONTEXT:",
             *context_lines,
         ]
+
+    # Only the policy chunks relevant to this turn, not the whole manual
+    if reference_notes:
+        enhanced_background = enhanced_background + [
+            "ΣΧΕΤΙΚΕΣ ΟΔΗΓΙΕΣ (ακολούθησέ τες αν αφορούν την περίπτωση):",
+            *[f"📚 {note['text']}" for note in reference_notes],
+        ]
+
+    if enhanced_background is base_prompt.background:
+        enhanced_prompt = base_prompt
+    else:
         enhanced_prompt = SystemPromptGenerator(
             background=enhanced_background,
             steps=base_prompt.steps,
             output_instructions=base_prompt.output_instructions,
         )
-    else:
-        enhanced_prompt = base_prompt
 
-    return BaseAgent(
+    agent = BaseAgent(
         config=BaseAgentConfig(
             client=client,
             model="gpt-4.1",
@@ -193,3 +231,4 @@ def create_chat_agent(client, memory, session_context: str = ""):
             output_schema=CustomOutputSchema,
         )
     )
+    return trace_agent(agent, "chat")
@@ -0,0 +1,36 @@
+from typing import List, Tuple
+
+# Words that mark a case as an accident (AC) or a breakdown (RA) when the
+# decision agent is unavailable; checked in this order
+CASE_KEYWORDS = {
+    "AC": ["τράκαρα", "χτύπησα", "ατύχημα", "χτύπημα", "ζημιά"],
+    "RA": ["βλάβη", "λάστιχο", "βενζίνη", "μπαταρία", "κινητήρας"],
+}
+
+
+def classify_by_keywords(user_message: str) -> Tuple[str, List[str]]:
+    """Case type from keywords alone, with the keywords that matched"""
+    user_lower = user_message.lower()
+    for case_type, words in CASE_KEYWORDS.items():
+        matched = [word for word in words if word in user_lower]
+        if matched:
+            return case_type, matched
+    return "OTHER", []
+
+
+def get_case_type_code(case_type: str) -> str:
+    """Map Greek case types to database codes"""
+    if not case_type:
+        return None
+
+    case_type = case_type.lower().strip()
+    mapping = {
+        "ατύχημα": "AC",
+        "οδική βοήθεια": "RA",
+        "άλλο": "OTHER",
+        # Keep English codes for backward compatibility
+        "ac": "AC",
+        "ra": "RA",
+        "other": "OTHER",
+    }
+    return mapping.get(case_type, "OTHER")
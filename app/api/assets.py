@@ -0,0 +1,70 @@
+"""Content-hash fingerprinted URLs for the files in static/.
+
+`url_for('static', filename=...)` gets a `?v=<hash>` argument, so templates
+need no changes and a changed file always gets a new URL. Requests carrying
+the current hash are cached by browsers for a year; anything else (e.g. the
+plain `/static/...` paths in script.js) is revalidated as before.
+"""
+
+import hashlib
+import os
+from typing import Dict
+
+from flask import request
+
+
+# One year, the conventional maximum for immutable assets
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+FINGERPRINT_LENGTH = 12
+
+
+def fingerprint_static(static_folder: str) -> Dict[str, str]:
+    """Short SHA-256 of every file under static/, keyed by its URL path"""
+    fingerprints = {}
+    for root, _dirs, files in os.walk(static_folder):
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            filename = os.path.relpath(path, static_folder).replace(os.sep, "/")
+            fingerprints[filename] = digest[:FINGERPRINT_LENGTH]
+    return fingerprints
+
+
+def init_static_fingerprints(app) -> Dict[str, str]:
+    """Fingerprint static URLs and cache fingerprinted requests as immutable"""
+    fingerprints = fingerprint_static(app.static_folder)
+
+    # In debug mode files are edited while the server runs, so re-hash them
+    def current_fingerprint(filename: str):
+        if app.debug:
+            path = os.path.join(app.static_folder, filename)
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    return hashlib.sha256(f.read()).hexdigest()[:FINGERPRINT_LENGTH]
+        return fingerprints.get(filename)
+
+    @app.url_defaults
+    def add_static_fingerprint(endpoint, values):
+        if endpoint == "static" and "v" not in values:
+            fingerprint = current_fingerprint(values.get("filename", ""))
+            if fingerprint:
+                values["v"] = fingerprint
+
+    @app.after_request
+    def cache_fingerprinted_static(response):
+        if request.endpoint != "static" or response.status_code not in (200, 206, 304):
+            return response
+
+        version = request.args.get("v")
+        filename = (request.view_args or {}).get("filename", "")
+        if version and version == current_fingerprint(filename):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    print(f"🔖 Fingerprinted {len(fingerprints)} static files")
+    return fingerprints
@@ -0,0 +1,70 @@
+"""gzip/brotli compression of JSON and HTML responses.
+
+Brotli is used when the `brotli` package is installed and the client accepts
+it, gzip otherwise. Streams (the admin event feed) and file responses are
+passed through untouched.
+"""
+
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # gzip only without the brotli package
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = frozenset({"application/json", "text/html"})
+
+
+def choose_encoding(accept_encodings) -> str:
+    """Best encoding the client accepts that we can produce, or None"""
+    if brotli is not None and accept_encodings["br"] > 0:
+        return "br"
+    if accept_encodings["gzip"] > 0:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        # Brotli quality runs 0-11; keep it in the fast range for dynamic bodies
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=min(level, 9))
+
+
+def init_compression(app) -> None:
+    """Compress eligible responses according to Accept-Encoding"""
+
+    @app.after_request
+    def compress_response(response):
+        response.vary.add("Accept-Encoding")
+
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or "Content-Encoding" in response.headers
+            or request.method == "HEAD"
+        ):
+            return response
+
+        data = response.get_data()
+        if len(data) < app.config["COMPRESS_MIN_SIZE"]:
+            return response
+
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        response.set_data(compress(data, encoding, app.config["COMPRESS_LEVEL"]))
+        response.headers["Content-Encoding"] = encoding
+
+        # The compressed bytes differ from the identity ones, so a strong
+        # validator has to become weak (as nginx does)
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
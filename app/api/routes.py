@@ -1,27 +1,164 @@
 import os
-import uuid
-from flask import request, jsonify, render_template, session, send_from_directory
-from werkzeug.utils import secure_filename
-import instructor
+import queue
+import sys
+import threading
+import time
+
+from flask import (
+    Response,
+    g,
+    request,
+    jsonify,
+    render_template,
+    session,
+    send_from_directory,
+    stream_with_context,
+)
 
 from utils import (
     get_or_create_session,
     update_case_from_ai_response,
     db,
+    get_db,
     classify_case_with_decision_agent,
     get_session_context,
 )
-from agents.agents import setup_openai_client, create_image_analyzer, create_chat_agent
-from agents.schemas import ImageAnalysisInput
-from atomic_agents.agents.base_agent import BaseAgentInputSchema
+from database.events import event_log_path, format_sse
+from database.loader import RequestLoader
+from database.profiling import QueryProfiler
+from database.readonly import open_read_only
+from database.rollups import since_bucket, summarize_rollups
+from database.plates import format_plate, normalize_plate
+from images.jobs import ImageJobQueue
+from images.storage import save_upload
+from reference.knowledge import retrieve_guidance
+from tracing import trace
 
 
 def register_routes(app):
-    """Register all routes with the Flask app"""
+    """Register all routes with the Flask app.
+
+    The agent libraries and the OpenAI client are loaded on first use (or by
+    warm_up_agents in the background), so importing and registering the app
+    stays fast.
+    """
+
+    if app.config["DB_PROFILING"]:
+        db.profiler = QueryProfiler(app.config["DB_SLOW_QUERY_MS"])
+        print(f"🐢 Profiling database statements (slow above {app.config['DB_SLOW_QUERY_MS']} ms)")
+
+    # Admin event streams read every worker's changes from a log next to the
+    # database, in a file of its own so logging never holds the database's lock
+    db.events.persist_to(event_log_path(db.db_path))
+
+    # Admin and reporting reads, kept off the connections that write
+    reports_db = db
+    if app.config["ADMIN_READ_ONLY"]:
+        reports_db = open_read_only(
+            db,
+            pool_size=app.config["ADMIN_READ_POOL_SIZE"],
+            snapshot_interval=app.config["ADMIN_SNAPSHOT_INTERVAL"] or None,
+        )
+
+    preprocess_options = {
+        "max_dimension": app.config["IMAGE_MAX_DIMENSION"],
+        "image_format": app.config["IMAGE_FORMAT"],
+        "quality": app.config["IMAGE_QUALITY"],
+    }
+
+    def run_image_job(job):
+        from agents.agents import create_image_analyzer, get_openai_client
+        from images.analysis import analyze_uploaded_images
+
+        # Jobs run outside any request, so they get a loader and trace of their own
+        loader = RequestLoader(db)
+        loader.start_counting()
+        try:
+            with trace("image_job", job_id=job["job_id"], session_id=job["session_id"]):
+                # A fresh analyzer per call keeps agent memory from leaking between sessions
+                return analyze_uploaded_images(
+                    loader,
+                    lambda: create_image_analyzer(get_openai_client()),
+                    job["session_id"],
+                    job["payload"]["images"],
+                    job["payload"]["chat_context"],
+                    preprocess_options,
+                    mode=app.config["IMAGE_ANALYSIS_MODE"],
+                    concurrency=app.config["IMAGE_ANALYSIS_CONCURRENCY"],
+                )
+        finally:
+            loader.stop_counting()
+            print(
+                f"🗄️ Image job {job['job_id'][:8]}...: {loader.stats['queries']} queries, "
+                f"{loader.stats['hits']} served from the job cache"
+            )
+
+    @app.before_request
+    def open_request_loader():
+        get_db().start_counting()
+
+    @app.teardown_request
+    def log_request_queries(error=None):
+        loader = g.pop("loader", None)
+        if loader is None:
+            return
+        loader.stop_counting()
+        if loader.stats["queries"] and app.config["LOG_QUERY_COUNTS"]:
+            print(
+                f"🗄️ {request.method} {request.path}: {loader.stats['queries']} queries, "
+                f"{loader.stats['hits']} served from the request cache"
+            )
 
-    # Setup OpenAI client and image analyzer
-    client = setup_openai_client()
-    image_analyzer = create_image_analyzer(client)
+    # Background workers for image analysis
+    image_jobs = ImageJobQueue(
+        db,
+        run_image_job,
+        workers=app.config["IMAGE_JOB_WORKERS"],
+        lease_seconds=app.config["IMAGE_JOB_LEASE"],
+    )
+
+    def warm_up_agents():
+        """Import the agent libraries and create the client off the request path"""
+        started = time.perf_counter()
+        try:
+            import agents.agents
+            import images.analysis  # noqa: F401
+
+            agents.agents.get_openai_client()
+        except Exception as e:
+            print(f"⚠️ Agent warm-up failed, agents load on first use instead: {e}")
+            return
+        print(f"🔥 Agents warmed up in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def start_worker_services(requeue: bool = True):
+        """Start this process's image workers and warm up its agents.
+
+        Under a pre-fork server this runs in every worker after the fork:
+        threads do not survive fork, and the client's pooled connections
+        must not be shared between processes. The worker serves requests
+        while the warm-up runs; a request that needs an agent first just
+        loads it itself.
+        """
+        agents_module = sys.modules.get("agents.agents")
+        if agents_module is not None:
+            agents_module.reset_openai_client()
+        image_jobs.start(requeue=requeue)
+        if app.config["WARM_UP_AGENTS"]:
+            threading.Thread(target=warm_up_agents, name="agent-warm-up", daemon=True).start()
+
+    def stop_worker_services():
+        """Let in-flight image jobs finish before the process exits"""
+        image_jobs.stop(timeout=app.config["IMAGE_JOB_STOP_TIMEOUT"])
+
+    app.extensions["start_worker_services"] = start_worker_services
+    app.extensions["stop_worker_services"] = stop_worker_services
+
+    if app.config["SERVER_PREFORK"]:
+        # The workers start their services after fork; requeue only once here,
+        # and only expired leases, as old workers may still run theirs
+        image_jobs.requeue_interrupted()
+    else:
+        start_worker_services()
 
     @app.route("/")
     def index():
@@ -31,6 +168,142 @@ def register_routes(app):
     def admin():
         return render_template("admin.html")
 
+    @app.route("/admin/events")
+    def admin_events():
+        """Stream database changes to the admin dashboard (Server-Sent Events).
+
+        Events are read from the shared event log, so a stream gets the
+        changes of every worker process: its own at once (the subscriber
+        queue wakes it up), the others' within ADMIN_EVENTS_POLL seconds.
+        """
+        last_event_id = request.headers.get("Last-Event-ID", type=int)
+        subscriber = db.events.subscribe()
+        poll = app.config["ADMIN_EVENTS_POLL"]
+        keepalive = app.config["ADMIN_EVENTS_KEEPALIVE"]
+
+        def stream():
+            try:
+                yield "retry: 3000\n\n"
+
+                # Reconnects continue where they left off; new streams start now
+                last_sent = last_event_id
+                if last_sent is None:
+                    last_sent = db.events.latest_id()
+                idle = 0.0
+
+                while not subscriber.closed:
+                    missed = db.events.events_since(last_sent)
+                    if missed is None:
+                        # Events we would need are gone: ask the client to reload
+                        yield format_sse({"type": "resync", "data": {}})
+                        last_sent = db.events.latest_id()
+                        continue
+                    for event in missed:
+                        yield format_sse(event)
+                        last_sent = event["id"]
+                    if missed:
+                        idle = 0.0
+
+                    try:
+                        woken = [subscriber.get(timeout=poll)]
+                    except queue.Empty:
+                        idle += poll
+                        if idle >= keepalive:
+                            yield ": keepalive\n\n"
+                            idle = 0.0
+                        continue
+                    while not subscriber.empty():
+                        woken.append(subscriber.get_nowait())
+                    # Only a wake-up: the log has these events (and any
+                    # others), except those that could not be logged
+                    for event in woken:
+                        if event["id"] is None:
+                            yield format_sse(event)
+            finally:
+                db.events.unsubscribe(subscriber)
+
+        return Response(
+            stream_with_context(stream()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.route("/admin/session/<session_id>")
+    def admin_session(session_id):
+        """Session, case, images and a page of messages in one response.
+
+        The ETag is the session's version counter, so revalidating an
+        unchanged view costs one primary-key lookup and returns a 304.
+        """
+        try:
+            limit = max(1, min(request.args.get("limit", 50, type=int), 500))
+            before_id = request.args.get("before", type=int)
+
+            # Read the version before the data: a write in between only
+            # makes the body newer than its ETag, never older
+            version = reports_db.get_session_version(session_id)
+            if version is None:
+                return jsonify({"error": "Session not found"}), 404
+
+            etag = f"v{version}-l{limit}-b{before_id or 0}"
+            # Weak comparison: compressed responses carry the weak form
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                case_data = reports_db.get_case_by_session(session_id)
+                if case_data:
+                    add_case_details(case_data, session_id, reports_db)
+
+                history = reports_db.get_chat_history_page(session_id, limit, before_id)
+                response = jsonify(
+                    {
+                        "session": reports_db.get_session(session_id),
+                        "case": case_data,
+                        "messages": history["messages"],
+                        "has_more": history["has_more"],
+                        "version": version,
+                    }
+                )
+
+            response.set_etag(etag)
+            # Let the browser keep the body but revalidate on every use
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/admin/db/stats", methods=["GET", "DELETE"])
+    def admin_db_stats():
+        """Image dedupe totals and, with profiling on, statement statistics of
+        this process; DELETE starts the latter over"""
+        if request.method == "DELETE":
+            if db.profiler is None:
+                return jsonify({"error": "Database profiling is off (set DB_PROFILING=1)"}), 404
+            db.profiler.reset()
+        stats = {"images": reports_db.get_image_dedupe_stats()}
+        if db.profiler is not None:
+            stats.update(db.profiler.snapshot())
+        return jsonify(stats)
+
+    @app.route("/admin/stats")
+    def admin_stats():
+        """Case volume, case types, fast-track and fraud rates and session
+        duration per hour or day, read from the rollup tables"""
+        try:
+            granularity = request.args.get("granularity", "hour")
+            if granularity not in ("hour", "day"):
+                return jsonify({"error": "granularity must be hour or day"}), 400
+            default_days = 1 if granularity == "hour" else 30
+            days = max(1, min(request.args.get("days", default_days, type=int), 366))
+
+            since = since_bucket(granularity, days)
+            stats = summarize_rollups(reports_db.get_rollups(granularity, since))
+            return jsonify({"granularity": granularity, "since": since, **stats})
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
     @app.route("/classify_case", methods=["POST"])
     def classify_case():
         """Test endpoint for the case decision agent"""
@@ -69,17 +342,17 @@ def register_routes(app):
             session_id, memory = get_or_create_session()
 
             # Get existing chat history for this session
-            chat_history = db.get_chat_history(session_id)
+            chat_history = get_db().get_chat_history(session_id)
 
             # If no history exists, add initial message
             if not chat_history:
                 initial_reply = "Πώς μπορώ να σας βοηθήσω;"
 
                 # Store initial message in database
-                db.add_message(session_id, "assistant", initial_reply)
+                get_db().add_message(session_id, "assistant", initial_reply)
 
                 # Get the updated chat history (will include the initial message with timestamp)
-                chat_history = db.get_chat_history(session_id)
+                chat_history = get_db().get_chat_history(session_id)
 
                 return jsonify(
                     {
@@ -120,7 +393,7 @@ def register_routes(app):
             session_id, memory = get_or_create_session()
 
             # Store user message in database
-            db.add_message(session_id, "user", user_input)
+            get_db().add_message(session_id, "user", user_input)
 
             # Get session context for memory awareness
             session_context = get_session_context(session_id)
@@ -130,7 +403,7 @@ def register_routes(app):
             if use_decision_agent:
                 try:
                     # Get chat context for decision agent
-                    chat_history = db.get_chat_history(session_id)
+                    chat_history = get_db().get_chat_history(session_id)
                     chat_context = " ".join(
                         [msg["message"] for msg in chat_history[-3:]]
                     )
@@ -147,20 +420,39 @@ def register_routes(app):
                 except Exception as e:
                     print(f"Decision agent failed, continuing with regular flow: {e}")
 
-            # Create agent with session memory and context
-            agent = create_chat_agent(client, memory, session_context)
+            # Retrieve the policy chunks relevant to the last few messages
+            recent_messages = get_db().get_chat_history(session_id)[-3:]
+            reference_notes = retrieve_guidance(
+                " ".join(msg["message"] for msg in recent_messages),
+                k=app.config["KNOWLEDGE_TOP_K"],
+            )
+
+            from agents.agents import create_chat_agent, get_openai_client
+            from atomic_agents.agents.base_agent import BaseAgentInputSchema
+
+            # Create agent with session memory, context and policy notes
+            agent = create_chat_agent(
+                get_openai_client(), memory, session_context, reference_notes
+            )
 
             # Process the user's input through the agent and get the response
             response = agent.run(BaseAgentInputSchema(chat_message=user_input))
 
             # Store bot response in database
-            db.add_message(session_id, "assistant", response.chat_message)
+            get_db().add_message(session_id, "assistant", response.chat_message)
 
             # Update case information based on AI analysis
-            update_case_from_ai_response(session_id, response)
+            case_writes = update_case_from_ai_response(session_id, response)
 
             # Prepare response
-            response_data = {"reply": response.chat_message, "session_id": session_id}
+            response_data = {
+                "reply": response.chat_message,
+                "session_id": session_id,
+                "case_writes": case_writes,
+                "reference_sources": [
+                    f"{note['source']} p.{note['page']}" for note in reference_notes
+                ],
+            }
 
             # Add decision agent info if used
             if decision_info:
@@ -207,12 +499,14 @@ def register_routes(app):
         """Get chat history for current session or specified session"""
         try:
             # Check if session_id is provided as a query parameter (for admin)
-            session_id = request.args.get("session_id") or session.get("session_id")
+            admin_session_id = request.args.get("session_id")
+            session_id = admin_session_id or session.get("session_id")
 
             if not session_id:
                 return jsonify({"messages": []})
 
-            messages = db.get_chat_history(session_id)
+            store = reports_db if admin_session_id else get_db()
+            messages = store.get_chat_history(session_id)
             return jsonify({"messages": messages})
 
         except Exception as e:
@@ -222,7 +516,7 @@ def register_routes(app):
     def get_sessions():
         """Get all chat sessions (admin endpoint)"""
         try:
-            sessions = db.get_all_sessions()
+            sessions = reports_db.get_all_sessions()
             return jsonify({"sessions": sessions})
 
         except Exception as e:
@@ -230,35 +524,58 @@ def register_routes(app):
 
     @app.route("/case_images/<filename>")
     def serve_case_image(filename):
-        """Serve uploaded case images"""
-        return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
+        """Serve uploaded case images (with ETag, Last-Modified and Range support)"""
+        # Blobs are named after the SHA-256 of their content, which makes
+        # the name a strong validator and the file safe to cache for long
+        response = send_from_directory(
+            app.config["UPLOAD_FOLDER"],
+            filename,
+            conditional=True,
+            etag=os.path.splitext(filename)[0],
+            max_age=app.config["CASE_IMAGE_MAX_AGE"],
+        )
+        # Customer photos must not end up in shared caches
+        response.cache_control.public = False
+        response.cache_control.private = True
+        response.cache_control.immutable = True
+        return response
+
+    def add_case_details(case_data, session_id, store):
+        """Attach images and other cases of the same vehicle to a case"""
+        case_images = store.get_case_images(session_id=session_id)
+        case_data["images"] = [
+            {
+                "url": f"/case_images/{img['filename']}",
+                "original_filename": img["original_filename"],
+                "type": img["image_type"],
+                "analysis": img["analysis_data"],
+                "timestamp": img["upload_timestamp"],
+            }
+            for img in case_images
+        ]
+
+        # Other cases on the same vehicle, for repeat-incident review
+        case_data["vehicle_cases"] = store.get_cases_by_plate(
+            case_data["registration_number"], exclude_session_id=session_id
+        )
+        return case_data
 
     @app.route("/get_case_info", methods=["GET"])
     def get_case_info():
         """Get case information for current session or specified session"""
         try:
             # Check if session_id is provided as a query parameter (for admin)
-            session_id = request.args.get("session_id") or session.get("session_id")
+            admin_session_id = request.args.get("session_id")
+            session_id = admin_session_id or session.get("session_id")
 
             if not session_id:
                 return jsonify({"error": "No session found"}), 400
 
-            case_data = db.get_case_by_session(session_id)
+            store = reports_db if admin_session_id else db
+            case_data = store.get_case_by_session(session_id)
 
             if case_data:
-                # Get case images
-                case_images = db.get_case_images(session_id=session_id)
-                case_data["images"] = [
-                    {
-                        "url": f"/case_images/{img['filename']}",
-                        "original_filename": img["original_filename"],
-                        "type": img["image_type"],
-                        "analysis": img["analysis_data"],
-                        "timestamp": img["upload_timestamp"],
-                    }
-                    for img in case_images
-                ]
-
+                add_case_details(case_data, session_id, store)
                 return jsonify({"case": case_data})
             else:
                 return jsonify(
@@ -271,9 +588,46 @@ def register_routes(app):
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
+    @app.route("/get_vehicle_cases", methods=["GET"])
+    def get_vehicle_cases():
+        """Get all cases for a vehicle by registration number (admin endpoint)"""
+        try:
+            registration_number = request.args.get("registration_number", "")
+            plate_key = normalize_plate(registration_number)
+
+            if not plate_key:
+                return jsonify({"error": "No registration number provided"}), 400
+
+            cases = reports_db.get_cases_by_plate(registration_number)
+            return jsonify(
+                {
+                    "registration_number": format_plate(registration_number),
+                    "cases": cases,
+                }
+            )
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/get_cases_by_tag", methods=["GET"])
+    def get_cases_by_tag():
+        """Cases carrying any (or, with match=all, every) of the given tags (admin endpoint)"""
+        try:
+            tags = request.args.getlist("tag")
+            if not any(tag.strip() for tag in tags):
+                return jsonify({"error": "No tag provided"}), 400
+
+            match_all = request.args.get("match", "any") == "all"
+            limit = max(1, min(request.args.get("limit", 50, type=int), 500))
+            result = reports_db.get_cases_by_tags(tags, match_all=match_all, limit=limit)
+            return jsonify({"match": "all" if match_all else "any", **result})
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
     @app.route("/upload_images", methods=["POST"])
     def upload_images():
-        """Handle image uploads and analysis"""
+        """Save uploaded images and queue them for analysis"""
         try:
             session_id, memory = get_or_create_session()
 
@@ -285,112 +639,39 @@ def register_routes(app):
                 return jsonify({"error": "No images selected"}), 400
 
             # Get chat context
-            chat_history = db.get_chat_history(session_id)
+            chat_history = get_db().get_chat_history(session_id)
             chat_context = " ".join(
                 [msg["message"] for msg in chat_history[-5:]]
             )  # Last 5 messages
 
-            # Process images
-            instructor_images = []
-            uploaded_filenames = []
-            stored_images = []
-
-            for file in files:
-                if file and file.filename != "":
-                    # Secure filename and save
-                    filename = secure_filename(f"{uuid.uuid4()}_{file.filename}")
-                    filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                    file.save(filepath)
+            # Save uploads content-addressed, hashing them as they stream in
+            saved_images = [
+                save_upload(file, app.config["UPLOAD_FOLDER"])
+                for file in files
+                if file and file.filename != ""
+            ]
 
-                    # Create instructor image
-                    instructor_images.append(instructor.Image.from_path(filepath))
-                    uploaded_filenames.append(filename)
-
-            if not instructor_images:
+            if not saved_images:
                 return jsonify({"error": "No valid images uploaded"}), 400
 
-            # Analyze images
-            analysis_request = ImageAnalysisInput(
-                instruction_text="Ανάλυσε αυτές τις εικόνες που σχετίζονται με το περιστατικό οχήματος. Εξάγαγε όλες τις χρήσιμες πληροφορίες για την υπόθεση.",
-                images=instructor_images,
-                chat_context=chat_context,
+            # Store the upload message now; the reply is posted by the worker
+            get_db().add_message(
+                session_id, "user", f"📸 Ανέβασε {len(saved_images)} εικόνες"
             )
 
-            analysis_result = image_analyzer.run(analysis_request)
-
-            # Store the analysis message in chat history
-            db.add_message(
-                session_id, "user", f"📸 Ανέβασε {len(instructor_images)} εικόνες"
+            # Analyze in the background so the request returns immediately
+            job_id = image_jobs.submit(
+                session_id, {"images": saved_images, "chat_context": chat_context}
             )
-            db.add_message(session_id, "assistant", analysis_result.chat_message)
-
-            # Store images and their analysis in database
-            for i, (filename, img_analysis) in enumerate(
-                zip(uploaded_filenames, analysis_result.image_analyses)
-            ):
-                # Store image in database
-                image_data = {
-                    "image_type": img_analysis.image_type,
-                    "damage_description": img_analysis.damage_description,
-                    "license_plate": img_analysis.license_plate_number,
-                    "vehicle_make_model": img_analysis.vehicle_make_model,
-                    "location_details": img_analysis.location_details,
-                    "severity": img_analysis.severity_assessment,
-                    "recommended_action": img_analysis.recommended_action,
-                }
-
-                db.store_case_image(
-                    session_id=session_id,
-                    filename=filename,
-                    original_filename=files[i].filename,
-                    image_type=img_analysis.image_type,
-                    analysis_data=image_data,
-                )
-                stored_images.append(filename)
-
-            # Extract and update case information from image analysis
-            for img_analysis in analysis_result.image_analyses:
-                case_data = {}
-
-                if img_analysis.license_plate_number:
-                    case_data["registration_number"] = img_analysis.license_plate_number
-
-                if img_analysis.damage_description:
-                    case_data["description"] = img_analysis.damage_description
-
-                if img_analysis.location_details:
-                    case_data["location"] = img_analysis.location_details
-
-                if img_analysis.severity_assessment:
-                    case_data["damage_severity"] = img_analysis.severity_assessment
-
-                if img_analysis.recommended_action:
-                    case_data["recommended_action"] = img_analysis.recommended_action
-
-                # Update case if we have any new information
-                if case_data:
-                    db.update_case_info(session_id=session_id, **case_data)
-
-                    # Update case flags based on image analysis
-                    existing_case = db.get_case_by_session(session_id)
-                    if existing_case:
-                        db.update_case_flags(
-                            case_id=existing_case["id"],
-                            fast_track=img_analysis.severity_assessment == "minor",
-                            sworn_declaration=img_analysis.severity_assessment
-                            == "severe",
-                        )
 
             return jsonify(
                 {
-                    "reply": analysis_result.chat_message,
-                    "image_analyses": [
-                        analysis.__dict__ for analysis in analysis_result.image_analyses
-                    ],
+                    "job_id": job_id,
+                    "status": "queued",
                     "session_id": session_id,
-                    "stored_images": stored_images,
+                    "poll_url": f"/upload_jobs/{job_id}",
                 }
-            )
+            ), 202
 
         except Exception as e:
             return jsonify(
@@ -400,6 +681,30 @@ def register_routes(app):
                 }
             ), 500
 
+    @app.route("/upload_jobs/<job_id>", methods=["GET"])
+    def get_upload_job(job_id):
+        """Get the progress and result of an image-analysis job"""
+        try:
+            job = db.get_image_job(job_id)
+
+            if not job or job["session_id"] != session.get("session_id"):
+                return jsonify({"error": "Job not found"}), 404
+
+            response_data = {"job_id": job_id, "status": job["status"]}
+            if job["status"] == "done":
+                response_data.update(job["result"])
+            elif job["status"] == "failed":
+                response_data["reply"] = (
+                    "Συγγνώμη, υπήρξε πρόβλημα με την ανάλυση των εικόνων. "
+                    "Παρακαλώ δοκιμάστε ξανά."
+                )
+                response_data["error"] = job["error"]
+
+            return jsonify(response_data)
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
     @app.route("/end_session", methods=["POST"])
     def end_session():
         """End the current session"""
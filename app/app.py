@@ -1,13 +1,28 @@
 from config import create_app
+from api.assets import init_static_fingerprints
+from api.compression import init_compression
 from api.routes import register_routes
+from tracing import init_tracing
+from reference.datasets import preload_reference_data
 
 # Create Flask app
 app = create_app()
 
+# Parse reference data once, before any worker is forked
+if app.config["PRELOAD_REFERENCE_DATA"]:
+    preload_reference_data()
+
+
+# Trace requests (before the other hooks, so their work is inside the trace)
+init_tracing(app)
 
 # Register routes
 register_routes(app)
 
+# Response compression and long-lived caching of static assets
+init_static_fingerprints(app)
+init_compression(app)
+
 
 if __name__ == "__main__":
     app.run(host="127.0.0.1", port=8080, debug=True)
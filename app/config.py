@@ -18,8 +18,86 @@ def create_app():
     app.secret_key = "hellas-direct-chatbot-secret-key"  # Required for sessions
     app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB max file size
 
-    # Set upload folder relative to project root
-    upload_folder = os.path.join(project_root, "uploads")
+    # Images are downscaled and re-encoded before being sent to the vision model
+    app.config["IMAGE_MAX_DIMENSION"] = int(os.getenv("IMAGE_MAX_DIMENSION", "1568"))
+    app.config["IMAGE_FORMAT"] = os.getenv("IMAGE_FORMAT", "JPEG")  # JPEG or WEBP
+    app.config["IMAGE_QUALITY"] = int(os.getenv("IMAGE_QUALITY", "85"))
+
+    # Background workers that run queued image analyses
+    app.config["IMAGE_JOB_WORKERS"] = int(os.getenv("IMAGE_JOB_WORKERS", "2"))
+
+    # "batch" sends all images in one vision call, "fanout" one call per image
+    app.config["IMAGE_ANALYSIS_MODE"] = os.getenv("IMAGE_ANALYSIS_MODE", "batch")
+    app.config["IMAGE_ANALYSIS_CONCURRENCY"] = int(
+        os.getenv("IMAGE_ANALYSIS_CONCURRENCY", "4")
+    )
+
+    # Seconds a running image job stays leased to its worker without a renewal;
+    # jobs of a worker that died are picked up again after this long
+    app.config["IMAGE_JOB_LEASE"] = float(os.getenv("IMAGE_JOB_LEASE", "60"))
+
+    # Seconds a stopping worker waits for its running image jobs
+    app.config["IMAGE_JOB_STOP_TIMEOUT"] = float(
+        os.getenv("IMAGE_JOB_STOP_TIMEOUT", "25")
+    )
+
+    # Set by gunicorn.conf.py: per-process services start in each worker after fork
+    app.config["SERVER_PREFORK"] = os.getenv("SERVER_PREFORK", "0") == "1"
+
+    # Import the agent libraries and create the OpenAI client in a background
+    # thread once the process is serving, instead of on the first request
+    app.config["WARM_UP_AGENTS"] = os.getenv("WARM_UP_AGENTS", "1") == "1"
+
+    # Print the number of database statements each request ran
+    app.config["LOG_QUERY_COUNTS"] = os.getenv("LOG_QUERY_COUNTS", "1") == "1"
+
+    # Time every database statement; /admin/db/stats shows the totals and
+    # statements slower than DB_SLOW_QUERY_MS are logged with their query plan
+    app.config["DB_PROFILING"] = os.getenv("DB_PROFILING", "0") == "1"
+    app.config["DB_SLOW_QUERY_MS"] = float(os.getenv("DB_SLOW_QUERY_MS", "50"))
+
+    # Admin and reporting reads use pooled read-only connections; with
+    # ADMIN_SNAPSHOT_INTERVAL > 0 they read a backup of the database taken
+    # at most that many seconds ago instead of the live file
+    app.config["ADMIN_READ_ONLY"] = os.getenv("ADMIN_READ_ONLY", "1") == "1"
+    app.config["ADMIN_READ_POOL_SIZE"] = int(os.getenv("ADMIN_READ_POOL_SIZE", "4"))
+    app.config["ADMIN_SNAPSHOT_INTERVAL"] = float(os.getenv("ADMIN_SNAPSHOT_INTERVAL", "0"))
+
+    # Policy chunks retrieved from data/ and added to each chat turn
+    app.config["KNOWLEDGE_TOP_K"] = int(os.getenv("KNOWLEDGE_TOP_K", "3"))
+
+    # Load data/ reference files at startup (shared by forked workers)
+    app.config["PRELOAD_REFERENCE_DATA"] = (
+        os.getenv("PRELOAD_REFERENCE_DATA", "1") == "1"
+    )
+
+    # Seconds between keepalive comments on idle admin event streams
+    app.config["ADMIN_EVENTS_KEEPALIVE"] = int(
+        os.getenv("ADMIN_EVENTS_KEEPALIVE", "15")
+    )
+
+    # Seconds between checks of the event log for other workers' changes
+    app.config["ADMIN_EVENTS_POLL"] = float(os.getenv("ADMIN_EVENTS_POLL", "1"))
+
+    # gzip/brotli for JSON and HTML bodies of at least COMPRESS_MIN_SIZE bytes
+    app.config["COMPRESS_MIN_SIZE"] = int(os.getenv("COMPRESS_MIN_SIZE", "500"))
+    app.config["COMPRESS_LEVEL"] = int(os.getenv("COMPRESS_LEVEL", "6"))
+
+    # Uploads are content-addressed, so a served image never changes
+    app.config["CASE_IMAGE_MAX_AGE"] = int(
+        os.getenv("CASE_IMAGE_MAX_AGE", str(30 * 24 * 3600))
+    )
+
+    # Span tracing of requests and image jobs, exported as JSON lines (opt-in)
+    app.config["TRACING"] = os.getenv("TRACING", "0") == "1"
+    app.config["TRACE_FILE"] = os.getenv(
+        "TRACE_FILE", os.path.join(project_root, "traces", "spans.jsonl")
+    )
+    app.config["TRACE_MAX_BYTES"] = int(os.getenv("TRACE_MAX_BYTES", str(50 * 1024 * 1024)))
+    app.config["TRACE_SAMPLE_RATE"] = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+
+    # Set upload folder relative to project root (UPLOAD_FOLDER overrides it)
+    upload_folder = os.getenv("UPLOAD_FOLDER") or os.path.join(project_root, "uploads")
     app.config["UPLOAD_FOLDER"] = upload_folder
 
     # Create uploads directory if it doesn't exist
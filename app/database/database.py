@@ -1,20 +1,117 @@
 import sqlite3
 import json
+import os
+import threading
+from contextvars import ContextVar
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 import uuid
 
+from database.events import events
+from database.plates import format_plate, normalize_plate
+from tracing import trace_methods
 
+# Statement counter of the current request or job, when it is being counted
+# (see database.loader); None means nobody is counting
+query_counter: ContextVar[Optional[Dict[str, int]]] = ContextVar("query_counter", default=None)
+
+COUNTED_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+
+class _Unchanged:
+    def __repr__(self):
+        return "UNCHANGED"
+
+
+# Default of the case detail writes (update_case_analysis and friends): leave
+# the column as it is. None is a value there and clears the column.
+UNCHANGED = _Unchanged()
+
+
+# Rollup buckets: strftime formats of the UTC timestamps they group by
+ROLLUP_BUCKETS = {"hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d"}
+_ROLLUP_GRANULARITIES = " UNION ALL ".join(
+    f"SELECT '{granularity}' AS granularity, '{bucket_format}' AS bucket_format"
+    for granularity, bucket_format in ROLLUP_BUCKETS.items()
+)
+
+
+def normalize_tags(tags) -> List[str]:
+    """Distinct lower-case tags, in their first order, without blanks"""
+    seen = []
+    for tag in tags or ():
+        tag = str(tag).strip().lower()
+        if tag and tag not in seen:
+            seen.append(tag)
+    return seen
+
+
+@trace_methods("db")
 class ChatDatabase:
-    def __init__(self, db_path: str = "chat_database.db"):
+    def __init__(
+        self,
+        db_path: str = "chat_database.db",
+        event_bus=None,
+        profiler=None,
+        lazy_schema: bool = False,
+        case_id_offset: int = 0,
+    ):
         self.db_path = db_path
-        self.init_database()
+        self.events = event_bus or events  # notified after every committed write
+        self.profiler = profiler  # a database.profiling.QueryProfiler, or None
+        # Case ids start above this, so several files can hand out distinct ids
+        self.case_id_offset = case_id_offset
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        # A lazy schema is created by the first connection instead
+        if not lazy_schema:
+            self.init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection, creating the schema first if that is still pending"""
+        if not self._schema_ready:
+            self.init_database()
+        return self._open()
+
+    def _open(self) -> sqlite3.Connection:
+        """Open a connection, counting its statements if the caller asked to"""
+        if self.profiler is not None:
+            conn = self.profiler.connect(self.db_path)
+        else:
+            conn = sqlite3.connect(self.db_path)
+        self._count_statements(conn)
+        return conn
+
+    @staticmethod
+    def _count_statements(conn: sqlite3.Connection) -> None:
+        """Count conn's statements into the current query_counter, if any"""
+        counter = query_counter.get()
+        if counter is None:
+            conn.set_trace_callback(None)
+            return
+
+        def count(statement):
+            if statement.lstrip()[:7].upper().startswith(COUNTED_STATEMENTS):
+                counter["queries"] += 1
+
+        conn.set_trace_callback(count)
 
     def init_database(self):
-        """Initialize the database with required tables"""
-        conn = sqlite3.connect(self.db_path)
+        """Initialize the database with required tables (once per instance)"""
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            self._create_schema()
+            self._schema_ready = True
+
+    def _create_schema(self):
+        conn = self._open()
         cursor = conn.cursor()
 
+        # Readers never block the writer, which matters with several worker
+        # processes sharing the file (the setting is stored in the database)
+        cursor.execute("PRAGMA journal_mode=WAL")
+
         # Chat Sessions Table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS chat_sessions (
@@ -26,6 +123,8 @@ class ChatDatabase:
                 status TEXT DEFAULT 'active'
             )
         """)
+        # Bumped by every write that changes what the admin view of a session shows
+        self._ensure_column(cursor, "chat_sessions", "version", "INTEGER NOT NULL DEFAULT 0")
 
         # Chat Messages Table
         cursor.execute("""
@@ -38,6 +137,10 @@ class ChatDatabase:
                 FOREIGN KEY (session_id) REFERENCES chat_sessions (session_id)
             )
         """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_chat_messages_session
+            ON chat_messages (session_id, id)
+        """)
 
         # Cases Table - Main case information
         cursor.execute("""
@@ -52,9 +155,29 @@ class ChatDatabase:
                 final_destination TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                plate_key TEXT,
                 FOREIGN KEY (session_id) REFERENCES chat_sessions (session_id)
             )
         """)
+        self._ensure_column(cursor, "cases", "plate_key", "TEXT")
+        if self.case_id_offset:
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'cases'")
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute(
+                    "INSERT INTO sqlite_sequence (name, seq) VALUES ('cases', ?)",
+                    (self.case_id_offset,),
+                )
+            elif row[0] < self.case_id_offset:
+                cursor.execute(
+                    "UPDATE sqlite_sequence SET seq = ? WHERE name = 'cases'",
+                    (self.case_id_offset,),
+                )
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_cases_plate_key
+            ON cases (plate_key, created_at)
+        """)
+        self._backfill_plate_keys(cursor)
 
         # Case Images Table - Store uploaded images
         cursor.execute("""
@@ -67,10 +190,30 @@ class ChatDatabase:
                 image_type TEXT,
                 analysis_data TEXT,
                 upload_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                content_hash TEXT,
                 FOREIGN KEY (case_id) REFERENCES cases (id),
                 FOREIGN KEY (session_id) REFERENCES chat_sessions (session_id)
             )
         """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_case_images_session
+            ON case_images (session_id)
+        """)
+        self._ensure_column(cursor, "case_images", "content_hash", "TEXT")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_case_images_content_hash
+            ON case_images (content_hash)
+        """)
+
+        # Image Analysis Cache - One vision analysis per distinct image content
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS image_analysis_cache (
+                content_hash TEXT PRIMARY KEY,
+                analysis_data TEXT NOT NULL,
+                hit_count INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
 
         # Case Analysis Table - Inferred data
         cursor.execute("""
@@ -85,6 +228,8 @@ class ChatDatabase:
                 FOREIGN KEY (case_id) REFERENCES cases (id)
             )
         """)
+        # The per-case detail tables are joined and upserted by case_id
+        self._ensure_one_row_per_case(cursor, "case_analysis")
 
         # Case Flags Table - Critical decisions
         cursor.execute("""
@@ -100,6 +245,7 @@ class ChatDatabase:
                 FOREIGN KEY (case_id) REFERENCES cases (id)
             )
         """)
+        flags_migrated = self._ensure_one_row_per_case(cursor, "case_flags")
 
         # Case Summary Table
         cursor.execute("""
@@ -113,16 +259,294 @@ class ChatDatabase:
                 FOREIGN KEY (case_id) REFERENCES cases (id)
             )
         """)
+        summary_migrated = self._ensure_one_row_per_case(cursor, "case_summary")
+
+        # Case Tags Table - case_summary.tags, one row per tag, for filtering
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'case_tags'"
+        )
+        tags_table_existed = cursor.fetchone() is not None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS case_tags (
+                tag TEXT NOT NULL,
+                case_id INTEGER NOT NULL,
+                PRIMARY KEY (tag, case_id),
+                FOREIGN KEY (case_id) REFERENCES cases (id)
+            ) WITHOUT ROWID
+        """)
+        # Replacing a case's tags deletes by case_id
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_case_tags_case
+            ON case_tags (case_id)
+        """)
+        if not tags_table_existed or summary_migrated:
+            cursor.execute("DELETE FROM case_tags")
+            self._backfill_case_tags(cursor)
+
+        # Rollups - Case and session counts per hour and per day, kept up to
+        # date by the writes that change them (see _rollup_case, _rollup_session)
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'case_rollups'"
+        )
+        rollups_existed = cursor.fetchone() is not None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS case_rollups (
+                granularity TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                case_type TEXT NOT NULL,
+                cases INTEGER NOT NULL DEFAULT 0,
+                fast_track INTEGER NOT NULL DEFAULT 0,
+                fraud INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (granularity, bucket, case_type)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS session_rollups (
+                granularity TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                sessions_ended INTEGER NOT NULL DEFAULT 0,
+                duration_seconds REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (granularity, bucket)
+            ) WITHOUT ROWID
+        """)
+        if not rollups_existed or flags_migrated:
+            self._rebuild_rollups(cursor)
+
+        # Image Analysis Jobs - Background vision work that survives restarts
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS image_analysis_jobs (
+                job_id TEXT PRIMARY KEY,
+                session_id TEXT,
+                status TEXT DEFAULT 'queued' CHECK(status IN ('queued', 'running', 'done', 'failed')),
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (session_id) REFERENCES chat_sessions (session_id)
+            )
+        """)
+        # A running job is leased to one worker until claimed_at + the lease;
+        # the worker renews it while it works (see images.jobs)
+        self._ensure_column(cursor, "image_analysis_jobs", "claimed_at", "TIMESTAMP")
+        self._ensure_column(cursor, "image_analysis_jobs", "worker_pid", "INTEGER")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_image_analysis_jobs_status
+            ON image_analysis_jobs (status, created_at)
+        """)
 
         conn.commit()
         conn.close()
 
+    @staticmethod
+    def _ensure_column(cursor, table: str, column: str, definition: str):
+        """Add a column to an existing table created by an older schema"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    @staticmethod
+    def _backfill_plate_keys(cursor):
+        """Fill plate_key for cases stored before plates were normalized"""
+        cursor.execute("""
+            SELECT id, registration_number FROM cases
+            WHERE plate_key IS NULL AND registration_number IS NOT NULL
+        """)
+        rows = cursor.fetchall()
+        cursor.executemany(
+            "UPDATE cases SET plate_key = ? WHERE id = ?",
+            [(normalize_plate(registration) or "", case_id) for case_id, registration in rows],
+        )
+
+    @staticmethod
+    def _ensure_one_row_per_case(cursor, table: str) -> bool:
+        """Give a per-case detail table a unique case_id, returning True if it had to.
+
+        Older versions inserted a new row per chat turn; every case keeps
+        only its latest row, which carries the latest values.
+        """
+        index = f"idx_{table}_case_unique"
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index,))
+        if cursor.fetchone() is not None:
+            return False
+
+        cursor.execute(f"""
+            DELETE FROM {table}
+            WHERE case_id IS NOT NULL AND id NOT IN (
+                SELECT MAX(id) FROM {table} WHERE case_id IS NOT NULL GROUP BY case_id
+            )
+        """)
+        if cursor.rowcount:
+            print(f"🧹 Removed {cursor.rowcount} superseded rows from {table}")
+        cursor.execute(f"DROP INDEX IF EXISTS idx_{table}_case")
+        cursor.execute(f"CREATE UNIQUE INDEX {index} ON {table} (case_id)")
+        return True
+
+    @staticmethod
+    def _backfill_case_tags(cursor):
+        """Fill case_tags from the JSON tags of summaries stored before it existed"""
+        cursor.execute("""
+            INSERT OR IGNORE INTO case_tags (tag, case_id)
+            SELECT lower(trim(tag.value)), cs.case_id
+            FROM case_summary cs, json_each(cs.tags) tag
+            WHERE cs.case_id IS NOT NULL AND json_valid(cs.tags)
+              AND json_type(cs.tags) = 'array' AND tag.type = 'text'
+              AND trim(tag.value) != ''
+        """)
+
+    @staticmethod
+    def _replace_case_tags(cursor, case_id: int, tags: List[str]):
+        """Make case_tags hold exactly these tags for a case"""
+        cursor.execute("DELETE FROM case_tags WHERE case_id = ?", (case_id,))
+        cursor.executemany(
+            "INSERT OR IGNORE INTO case_tags (tag, case_id) VALUES (?, ?)",
+            [(tag, case_id) for tag in normalize_tags(tags)],
+        )
+
+    @staticmethod
+    def _rollup_case(cursor, case_id: int, sign: int):
+        """Add (sign=1) or retract (sign=-1) a case's counts in its rollup buckets.
+
+        Writes that change a counted column retract the case before the
+        write and add it back after, in the same transaction.
+        """
+        cursor.execute(
+            f"""
+            INSERT INTO case_rollups (granularity, bucket, case_type, cases, fast_track, fraud)
+            SELECT g.granularity, strftime(g.bucket_format, c.created_at),
+                   COALESCE(c.case_type, 'OTHER'), ?,
+                   ? * (COALESCE(cf.is_fast_track, 0) != 0), ? * (COALESCE(cf.is_fraud, 0) != 0)
+            FROM cases c
+            LEFT JOIN case_flags cf ON cf.case_id = c.id
+            CROSS JOIN ({_ROLLUP_GRANULARITIES}) g
+            WHERE c.id = ? AND c.created_at IS NOT NULL
+            ON CONFLICT (granularity, bucket, case_type) DO UPDATE SET
+                cases = cases + excluded.cases,
+                fast_track = fast_track + excluded.fast_track,
+                fraud = fraud + excluded.fraud
+        """,
+            (sign, sign, sign, case_id),
+        )
+
+    @staticmethod
+    def _rollup_session(cursor, session_id: str, sign: int):
+        """Add or retract an ended session's count and duration in its rollup buckets"""
+        cursor.execute(
+            f"""
+            INSERT INTO session_rollups (granularity, bucket, sessions_ended, duration_seconds)
+            SELECT g.granularity, strftime(g.bucket_format, s.ended_at), ?,
+                   ? * COALESCE(MAX(0, (julianday(s.ended_at) - julianday(s.started_at)) * 86400), 0)
+            FROM chat_sessions s
+            CROSS JOIN ({_ROLLUP_GRANULARITIES}) g
+            WHERE s.session_id = ? AND s.ended_at IS NOT NULL
+            ON CONFLICT (granularity, bucket) DO UPDATE SET
+                sessions_ended = sessions_ended + excluded.sessions_ended,
+                duration_seconds = duration_seconds + excluded.duration_seconds
+        """,
+            (sign, sign, session_id),
+        )
+
+    @staticmethod
+    def _rebuild_rollups(cursor):
+        """Recompute every rollup from the cases and sessions tables"""
+        cursor.execute("DELETE FROM case_rollups")
+        cursor.execute(f"""
+            INSERT INTO case_rollups (granularity, bucket, case_type, cases, fast_track, fraud)
+            SELECT g.granularity, strftime(g.bucket_format, c.created_at),
+                   COALESCE(c.case_type, 'OTHER'), COUNT(*),
+                   SUM(COALESCE(cf.is_fast_track, 0) != 0), SUM(COALESCE(cf.is_fraud, 0) != 0)
+            FROM cases c
+            LEFT JOIN case_flags cf ON cf.case_id = c.id
+            CROSS JOIN ({_ROLLUP_GRANULARITIES}) g
+            WHERE c.created_at IS NOT NULL
+            GROUP BY 1, 2, 3
+        """)
+        cursor.execute("DELETE FROM session_rollups")
+        cursor.execute(f"""
+            INSERT INTO session_rollups (granularity, bucket, sessions_ended, duration_seconds)
+            SELECT g.granularity, strftime(g.bucket_format, s.ended_at), COUNT(*),
+                   SUM(COALESCE(MAX(0, (julianday(s.ended_at) - julianday(s.started_at)) * 86400), 0))
+            FROM chat_sessions s
+            CROSS JOIN ({_ROLLUP_GRANULARITIES}) g
+            WHERE s.ended_at IS NOT NULL
+            GROUP BY 1, 2
+        """)
+
+    @staticmethod
+    def _touch_sessions(cursor, session_id: str = None, plate_keys=(), case_id: int = None):
+        """Bump the version of the sessions whose admin view a write changed.
+
+        Besides the session itself that includes every session listing the
+        written case under "other cases for this vehicle".
+        """
+        if session_id:
+            cursor.execute(
+                "UPDATE chat_sessions SET version = version + 1 WHERE session_id = ?",
+                (session_id,),
+            )
+        if case_id is not None:
+            cursor.execute(
+                """
+                UPDATE chat_sessions SET version = version + 1
+                WHERE session_id = (SELECT session_id FROM cases WHERE id = ?)
+            """,
+                (case_id,),
+            )
+        for plate_key in {key for key in plate_keys if key}:
+            cursor.execute(
+                """
+                UPDATE chat_sessions SET version = version + 1
+                WHERE session_id IN (
+                    SELECT session_id FROM cases WHERE plate_key = ? AND session_id != ?
+                )
+            """,
+                (plate_key, session_id or ""),
+            )
+
+    def touch_plate_sessions(self, plate_keys, exclude_session_id: str = None) -> int:
+        """Bump the version of sessions whose cases have one of these plates.
+
+        For writes made elsewhere (another shard) that change the "other cases
+        for this vehicle" of sessions here. Takes the write lock only if such
+        a session exists. Returns the number of sessions bumped.
+        """
+        plate_keys = sorted({key for key in plate_keys if key})
+        if not plate_keys:
+            return 0
+
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        try:
+            placeholders = ", ".join("?" for _ in plate_keys)
+            cursor.execute(
+                f"SELECT 1 FROM cases WHERE plate_key IN ({placeholders}) LIMIT 1", plate_keys
+            )
+            if cursor.fetchone() is None:
+                return 0
+
+            cursor.execute(
+                f"""
+                UPDATE chat_sessions SET version = version + 1
+                WHERE session_id IN (
+                    SELECT session_id FROM cases
+                    WHERE plate_key IN ({placeholders}) AND session_id != ?
+                )
+            """,
+                (*plate_keys, exclude_session_id or ""),
+            )
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
     def create_chat_session(
-        self, customer_name: str = None, registration_number: str = None
+        self, customer_name: str = None, registration_number: str = None, session_id: str = None
     ) -> str:
-        """Create a new chat session"""
-        session_id = str(uuid.uuid4())
-        conn = sqlite3.connect(self.db_path)
+        """Create a new chat session (with a new id unless one is given)"""
+        session_id = session_id or str(uuid.uuid4())
+        conn = self._connect()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -130,16 +554,26 @@ class ChatDatabase:
             INSERT INTO chat_sessions (session_id, customer_name, registration_number)
             VALUES (?, ?, ?)
         """,
-            (session_id, customer_name, registration_number),
+            (session_id, customer_name, format_plate(registration_number)),
         )
 
         conn.commit()
         conn.close()
+
+        self.events.publish(
+            "session-created",
+            {
+                "session_id": session_id,
+                "customer_name": customer_name,
+                "registration_number": format_plate(registration_number),
+                "status": "active",
+            },
+        )
         return session_id
 
     def add_message(self, session_id: str, sender: str, message: str):
         """Add a message to the chat session"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -149,13 +583,19 @@ class ChatDatabase:
         """,
             (session_id, sender, message),
         )
+        self._touch_sessions(cursor, session_id)
 
         conn.commit()
         conn.close()
 
+        self.events.publish(
+            "message-added",
+            {"session_id": session_id, "sender": sender, "message": message},
+        )
+
     def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
         """Get all messages for a chat session"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -175,6 +615,35 @@ class ChatDatabase:
         conn.close()
         return messages
 
+    def get_chat_history_page(
+        self, session_id: str, limit: int = 50, before_id: int = None
+    ) -> Dict[str, Any]:
+        """The newest `limit` messages of a session older than before_id, oldest first"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        query = """
+            SELECT id, sender, message, timestamp
+            FROM chat_messages
+            WHERE session_id = ?
+        """
+        params = [session_id]
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit + 1)  # one extra row tells whether there are more
+
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        conn.close()
+
+        messages = [
+            {"id": row[0], "sender": row[1], "message": row[2], "timestamp": row[3]}
+            for row in reversed(rows[:limit])
+        ]
+        return {"messages": messages, "has_more": len(rows) > limit}
+
     def create_case(
         self,
         session_id: str,
@@ -186,113 +655,312 @@ class ChatDatabase:
         final_destination: str,
     ) -> int:
         """Create a new case"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
         cursor.execute(
             """
             INSERT INTO cases 
             (session_id, case_type, registration_number, customer_name, 
-             description, location, final_destination)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+             description, location, final_destination, plate_key)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """,
             (
                 session_id,
                 case_type,
-                registration_number,
+                format_plate(registration_number),
                 customer_name,
                 description,
                 location,
                 final_destination,
+                normalize_plate(registration_number),
             ),
         )
 
         case_id = cursor.lastrowid
+        self._rollup_case(cursor, case_id, 1)
+        self._touch_sessions(cursor, session_id, [normalize_plate(registration_number)])
         conn.commit()
         conn.close()
+
+        self.events.publish(
+            "case-updated", {"session_id": session_id, "case_id": case_id, "table": "cases"}
+        )
         return case_id
 
+    def _upsert_case_row(
+        self, table: str, case_id: int, columns: Dict[str, Any], before=None, after=None
+    ) -> int:
+        """Write the given columns of a per-case detail row, returning rows written.
+
+        Columns given as UNCHANGED are left alone; None sets them to NULL.
+        before(cursor) and after(cursor), if given, run in the same
+        transaction before and after the write.
+        """
+        columns = {k: v for k, v in columns.items() if v is not UNCHANGED}
+        if not columns:
+            return 0
+
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        try:
+            if before is not None:
+                before(cursor)
+            cursor.execute(
+                f"""
+                UPDATE {table}
+                SET {", ".join(f"{name} = ?" for name in columns)}
+                WHERE case_id = ?
+            """,
+                (*columns.values(), case_id),
+            )
+
+            if cursor.rowcount == 0:
+                cursor.execute(
+                    f"""
+                    INSERT INTO {table} (case_id, {", ".join(columns)})
+                    VALUES (?, {", ".join("?" for _ in columns)})
+                """,
+                    (case_id, *columns.values()),
+                )
+
+            written = cursor.rowcount
+            if written:
+                if after is not None:
+                    after(cursor)
+                self._touch_sessions(cursor, case_id=case_id)
+            conn.commit()
+        finally:
+            conn.close()
+
+        if written:
+            self.events.publish("case-updated", {"case_id": case_id, "table": table})
+        return written
+
     def update_case_analysis(
         self,
         case_id: int,
-        malfunction: str = None,
-        resolution: str = None,
-        repair_shop: str = None,
-        within_prefecture: bool = None,
-    ):
-        """Update case analysis data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            INSERT OR REPLACE INTO case_analysis 
-            (case_id, possible_vehicle_malfunction, possible_problem_resolution,
-             recommended_auto_repair_shop, is_destination_within_prefecture)
-            VALUES (?, ?, ?, ?, ?)
-        """,
-            (case_id, malfunction, resolution, repair_shop, within_prefecture),
+        malfunction: str = UNCHANGED,
+        resolution: str = UNCHANGED,
+        repair_shop: str = UNCHANGED,
+        within_prefecture: bool = UNCHANGED,
+    ) -> int:
+        """Update case analysis data (only the provided columns)"""
+        return self._upsert_case_row(
+            "case_analysis",
+            case_id,
+            {
+                "possible_vehicle_malfunction": malfunction,
+                "possible_problem_resolution": resolution,
+                "recommended_auto_repair_shop": repair_shop,
+                "is_destination_within_prefecture": within_prefecture,
+            },
         )
 
-        conn.commit()
-        conn.close()
-
     def update_case_flags(
         self,
         case_id: int,
-        delay_voucher: bool = None,
-        geolocation_sent: bool = None,
-        sworn_declaration: bool = None,
-        fast_track: bool = None,
-        fraud: bool = None,
-    ):
-        """Update case flags"""
-        conn = sqlite3.connect(self.db_path)
+        delay_voucher: bool = UNCHANGED,
+        geolocation_sent: bool = UNCHANGED,
+        sworn_declaration: bool = UNCHANGED,
+        fast_track: bool = UNCHANGED,
+        fraud: bool = UNCHANGED,
+    ) -> int:
+        """Update case flags (only the provided columns)"""
+        before = after = None
+        if fast_track is not UNCHANGED or fraud is not UNCHANGED:
+            # Both are counted in the rollups
+
+            def before(cursor):
+                self._rollup_case(cursor, case_id, -1)
+
+            def after(cursor):
+                self._rollup_case(cursor, case_id, 1)
+
+        return self._upsert_case_row(
+            "case_flags",
+            case_id,
+            {
+                "delay_voucher_used": delay_voucher,
+                "geolocation_link_sent": geolocation_sent,
+                "sworn_declaration_needed": sworn_declaration,
+                "is_fast_track": fast_track,
+                "is_fraud": fraud,
+            },
+            before=before,
+            after=after,
+        )
+
+    def update_case_summary(
+        self,
+        case_id: int,
+        communication_quality: str = UNCHANGED,
+        tags: List[str] = UNCHANGED,
+        summary: str = UNCHANGED,
+    ) -> int:
+        """Update case summary (only the provided columns), keeping case_tags in sync"""
+        after = None
+        if tags is not UNCHANGED:
+
+            def after(cursor):
+                self._replace_case_tags(cursor, case_id, tags or [])
+
+        return self._upsert_case_row(
+            "case_summary",
+            case_id,
+            {
+                "communication_quality": communication_quality,
+                "tags": tags if tags is None or tags is UNCHANGED else json.dumps(tags),
+                "short_summary": summary,
+            },
+            after=after,
+        )
+
+    def get_cases_by_tags(
+        self, tags: List[str], match_all: bool = False, limit: int = 50
+    ) -> Dict[str, Any]:
+        """Cases with any (or all) of the tags, newest first, via the case_tags index.
+
+        Returns the number of matching cases, the number of cases per
+        requested tag and up to limit cases with their tags.
+        """
+        tags = normalize_tags(tags)
+        if not tags:
+            return {"total": 0, "tag_counts": {}, "cases": []}
+
+        conn = self._connect()
         cursor = conn.cursor()
+        placeholders = ", ".join("?" for _ in tags)
 
-        cursor.execute(
+        try:
+            cursor.execute(
+                f"""
+                SELECT tag, COUNT(*) FROM case_tags
+                WHERE tag IN ({placeholders})
+                GROUP BY tag
+            """,
+                tags,
+            )
+            tag_counts = {tag: 0 for tag in tags}
+            tag_counts.update(cursor.fetchall())
+
+            matching = f"""
+                SELECT case_id FROM case_tags
+                WHERE tag IN ({placeholders})
+                GROUP BY case_id
             """
-            INSERT OR REPLACE INTO case_flags 
-            (case_id, delay_voucher_used, geolocation_link_sent, 
-             sworn_declaration_needed, is_fast_track, is_fraud)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """,
-            (
-                case_id,
-                delay_voucher,
-                geolocation_sent,
-                sworn_declaration,
-                fast_track,
-                fraud,
-            ),
-        )
+            params = list(tags)
+            if match_all:
+                matching += " HAVING COUNT(*) = ?"
+                params.append(len(tags))
 
-        conn.commit()
-        conn.close()
+            cursor.execute(f"SELECT COUNT(*) FROM ({matching})", params)
+            total = cursor.fetchone()[0]
 
-    def update_case_summary(
-        self, case_id: int, communication_quality: str, tags: List[str], summary: str
-    ):
-        """Update case summary"""
-        conn = sqlite3.connect(self.db_path)
+            cursor.execute(
+                f"""
+                SELECT id, session_id, case_type, registration_number, customer_name,
+                       description, location, created_at
+                FROM cases
+                WHERE id IN ({matching})
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """,
+                (*params, limit),
+            )
+            cases = [
+                {
+                    "id": row[0],
+                    "session_id": row[1],
+                    "case_type": row[2],
+                    "registration_number": row[3],
+                    "customer_name": row[4],
+                    "description": row[5],
+                    "location": row[6],
+                    "created_at": row[7],
+                    "tags": [],
+                }
+                for row in cursor.fetchall()
+            ]
+
+            if cases:
+                by_id = {case["id"]: case for case in cases}
+                cursor.execute(
+                    f"""
+                    SELECT case_id, tag FROM case_tags
+                    WHERE case_id IN ({", ".join("?" for _ in by_id)})
+                    ORDER BY tag
+                """,
+                    list(by_id),
+                )
+                for case_id, tag in cursor.fetchall():
+                    by_id[case_id]["tags"].append(tag)
+        finally:
+            conn.close()
+
+        return {"total": total, "tag_counts": tag_counts, "cases": cases}
+
+    def rebuild_rollups(self) -> Dict[str, int]:
+        """Recompute the rollup tables from scratch, returning the rows written"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("BEGIN")
+            self._rebuild_rollups(cursor)
+            conn.commit()
+            cursor.execute("SELECT COUNT(*) FROM case_rollups")
+            case_rows = cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM session_rollups")
+            session_rows = cursor.fetchone()[0]
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        return {"case_rollups": case_rows, "session_rollups": session_rows}
+
+    def get_rollups(self, granularity: str, since: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Rollup rows of one granularity from bucket `since` on (primary-key range scans)"""
+        conn = self._connect()
         cursor = conn.cursor()
 
-        tags_json = json.dumps(tags)
         cursor.execute(
             """
-            INSERT OR REPLACE INTO case_summary 
-            (case_id, communication_quality, tags, short_summary)
-            VALUES (?, ?, ?, ?)
+            SELECT bucket, case_type, cases, fast_track, fraud
+            FROM case_rollups
+            WHERE granularity = ? AND bucket >= ?
+            ORDER BY bucket
         """,
-            (case_id, communication_quality, tags_json, summary),
+            (granularity, since),
         )
+        cases = [
+            {"bucket": row[0], "case_type": row[1], "cases": row[2], "fast_track": row[3], "fraud": row[4]}
+            for row in cursor.fetchall()
+        ]
+
+        cursor.execute(
+            """
+            SELECT bucket, sessions_ended, duration_seconds
+            FROM session_rollups
+            WHERE granularity = ? AND bucket >= ?
+            ORDER BY bucket
+        """,
+            (granularity, since),
+        )
+        sessions = [
+            {"bucket": row[0], "sessions_ended": row[1], "duration_seconds": row[2]}
+            for row in cursor.fetchall()
+        ]
 
-        conn.commit()
         conn.close()
+        return {"cases": cases, "sessions": sessions}
 
     def get_case_by_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get case information by session ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -365,9 +1033,99 @@ class ChatDatabase:
         conn.close()
         return case_data
 
+    def get_cases_by_plate(
+        self,
+        registration_number: str,
+        since_days: int = None,
+        exclude_session_id: str = None,
+    ) -> List[Dict[str, Any]]:
+        """All cases for one vehicle, newest first, via the plate_key index"""
+        plate_key = normalize_plate(registration_number)
+        if not plate_key:
+            return []
+
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        query = """
+            SELECT id, session_id, case_type, registration_number, customer_name,
+                   description, location, created_at
+            FROM cases
+            WHERE plate_key = ?
+        """
+        params = [plate_key]
+        if since_days is not None:
+            query += " AND created_at >= datetime('now', ?)"
+            params.append(f"-{int(since_days)} days")
+        if exclude_session_id:
+            query += " AND session_id != ?"
+            params.append(exclude_session_id)
+        query += " ORDER BY created_at DESC"
+
+        cursor.execute(query, params)
+        cases = [
+            {
+                "id": row[0],
+                "session_id": row[1],
+                "case_type": row[2],
+                "registration_number": row[3],
+                "customer_name": row[4],
+                "description": row[5],
+                "location": row[6],
+                "created_at": row[7],
+            }
+            for row in cursor.fetchall()
+        ]
+
+        conn.close()
+        return cases
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single chat session"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT session_id, customer_name, registration_number,
+                   started_at, ended_at, status
+            FROM chat_sessions
+            WHERE session_id = ?
+        """,
+            (session_id,),
+        )
+
+        row = cursor.fetchone()
+        conn.close()
+
+        if not row:
+            return None
+
+        return {
+            "session_id": row[0],
+            "customer_name": row[1],
+            "registration_number": row[2],
+            "started_at": row[3],
+            "ended_at": row[4],
+            "status": row[5],
+        }
+
+    def get_session_version(self, session_id: str) -> Optional[int]:
+        """Current view version of a session (a primary-key lookup), None if unknown"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "SELECT version FROM chat_sessions WHERE session_id = ?", (session_id,)
+        )
+        row = cursor.fetchone()
+        conn.close()
+
+        return row[0] if row else None
+
     def get_all_sessions(self) -> List[Dict[str, Any]]:
         """Get all chat sessions"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -395,13 +1153,16 @@ class ChatDatabase:
 
     def end_session(self, session_id: str):
         """Mark a session as ended and update related data"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
         try:
             # Begin transaction
             cursor.execute("BEGIN")
 
+            # Ending again moves the session to the bucket of its new end time
+            self._rollup_session(cursor, session_id, -1)
+
             # Update session status
             cursor.execute(
                 """
@@ -412,6 +1173,7 @@ class ChatDatabase:
                 """,
                 (session_id,),
             )
+            self._rollup_session(cursor, session_id, 1)
 
             # Update case status if exists
             cursor.execute(
@@ -422,6 +1184,7 @@ class ChatDatabase:
                 """,
                 (session_id,),
             )
+            self._touch_sessions(cursor, session_id)
 
             # Commit transaction
             conn.commit()
@@ -434,14 +1197,16 @@ class ChatDatabase:
         finally:
             conn.close()
 
+        self.events.publish("session-ended", {"session_id": session_id})
+
     def update_session_info(
         self,
         session_id: str,
         customer_name: str = None,
         registration_number: str = None,
-    ):
+    ) -> int:
         """Update session with customer information"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
         # Build dynamic update query
@@ -454,7 +1219,7 @@ class ChatDatabase:
 
         if registration_number is not None:
             update_fields.append("registration_number = ?")
-            values.append(registration_number)
+            values.append(format_plate(registration_number))
 
         if update_fields:
             values.append(session_id)  # Add session_id for WHERE clause
@@ -466,17 +1231,42 @@ class ChatDatabase:
             """
 
             cursor.execute(query, values)
+            written = cursor.rowcount
+            self._touch_sessions(cursor, session_id)
             conn.commit()
+        else:
+            written = 0
 
         conn.close()
 
-    def update_case_info(self, session_id: str, **kwargs):
-        """Update existing case information or create new case if none exists"""
-        conn = sqlite3.connect(self.db_path)
+        if written:
+            self.events.publish(
+                "session-updated",
+                {
+                    "session_id": session_id,
+                    "customer_name": customer_name,
+                    "registration_number": format_plate(registration_number),
+                },
+            )
+        return written
+
+    def update_case_info(
+        self, session_id: str, existing_case: dict = None, writes: Dict[str, int] = None, **kwargs
+    ):
+        """Update existing case information or create new case if none exists.
+
+        Pass the case as `existing_case` when it has just been read anyway,
+        and per-table write counters as `writes` to add the case rows written
+        to writes["cases"] (an update that changes nothing writes none).
+        """
+        conn = self._connect()
         cursor = conn.cursor()
 
         # Check if case exists
-        existing_case = self.get_case_by_session(session_id)
+        if existing_case is None:
+            existing_case = self.get_case_by_session(session_id)
+        changed = False
+        written = 0
 
         if existing_case:
             # Update existing case
@@ -497,21 +1287,43 @@ class ChatDatabase:
 
             for field in case_fields:
                 if kwargs.get(field) is not None:
-                    update_fields.append(f"{field} = ?")
+                    update_fields.append(field)
                     values.append(kwargs[field])
 
-            if update_fields:
-                update_fields.append("updated_at = CURRENT_TIMESTAMP")
-                values.append(case_id)
+            # Keep the plate canonical and its lookup key in step
+            if kwargs.get("registration_number") is not None:
+                index = update_fields.index("registration_number")
+                values[index] = format_plate(kwargs["registration_number"])
+                update_fields.append("plate_key")
+                values.append(normalize_plate(kwargs["registration_number"]))
 
+            if update_fields:
+                # Only rows where a value actually differs, so the rowcount is real
                 query = f"""
                     UPDATE cases 
-                    SET {", ".join(update_fields)}
-                    WHERE id = ?
+                    SET {", ".join(f"{field} = ?" for field in update_fields)},
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND ({" OR ".join(f"{field} IS NOT ?" for field in update_fields)})
                 """
+                values = [*values, case_id, *values]
+                # The case type is counted in the rollups
+                counted = kwargs.get("case_type") is not None
+                if counted:
+                    self._rollup_case(cursor, case_id, -1)
                 cursor.execute(query, values)
+                written = cursor.rowcount
+                if counted:
+                    self._rollup_case(cursor, case_id, 1)
+                changed = written > 0
+
+                # Cases listing this one by plate, before and after the change
+                if changed:
+                    plate_keys = [normalize_plate(existing_case["registration_number"])]
+                    if kwargs.get("registration_number") is not None:
+                        plate_keys.append(normalize_plate(kwargs["registration_number"]))
+                    self._touch_sessions(cursor, session_id, plate_keys)
         else:
-            # Create new case if none exists
+            # Create new case if none exists (create_case announces it)
             case_id = self.create_case(
                 session_id=session_id,
                 case_type=kwargs.get("case_type", "OTHER"),
@@ -521,9 +1333,18 @@ class ChatDatabase:
                 location=kwargs.get("location", ""),
                 final_destination=kwargs.get("final_destination", ""),
             )
+            written = 1
 
         conn.commit()
         conn.close()
+
+        if writes is not None:
+            writes["cases"] += written
+        if changed:
+            self.events.publish(
+                "case-updated",
+                {"session_id": session_id, "case_id": case_id, "table": "cases"},
+            )
         return case_id if "case_id" in locals() else None
 
     def store_case_image(
@@ -533,21 +1354,24 @@ class ChatDatabase:
         original_filename: str,
         image_type: str = None,
         analysis_data: dict = None,
+        content_hash: str = None,
+        case_id: int = None,
     ):
-        """Store information about an uploaded image"""
-        conn = sqlite3.connect(self.db_path)
+        """Store information about an uploaded image (looking up its case unless given)"""
+        conn = self._connect()
         cursor = conn.cursor()
 
         try:
             # Get case_id if it exists
-            case = self.get_case_by_session(session_id)
-            case_id = case["id"] if case else None
+            if case_id is None:
+                case = self.get_case_by_session(session_id)
+                case_id = case["id"] if case else None
 
             # Store image data
             cursor.execute(
                 """
-                INSERT INTO case_images (case_id, session_id, filename, original_filename, image_type, analysis_data)
-                VALUES (?, ?, ?, ?, ?, ?)
+                INSERT INTO case_images (case_id, session_id, filename, original_filename, image_type, analysis_data, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
                 (
                     case_id,
@@ -556,20 +1380,27 @@ class ChatDatabase:
                     original_filename,
                     image_type,
                     json.dumps(analysis_data) if analysis_data else None,
+                    content_hash,
                 ),
             )
 
             image_id = cursor.lastrowid
+            self._touch_sessions(cursor, session_id)
             conn.commit()
-            return image_id
         finally:
             conn.close()
 
+        self.events.publish(
+            "case-updated",
+            {"session_id": session_id, "case_id": case_id, "table": "case_images"},
+        )
+        return image_id
+
     def get_case_images(
         self, session_id: str = None, case_id: int = None
     ) -> List[Dict[str, Any]]:
         """Get all images for a case by session_id or case_id"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
 
         try:
@@ -611,3 +1442,258 @@ class ChatDatabase:
             return images
         finally:
             conn.close()
+
+    def get_cached_image_analysis(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Get the stored vision analysis for an image content hash, if any"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(
+                """
+                SELECT analysis_data FROM image_analysis_cache
+                WHERE content_hash = ?
+            """,
+                (content_hash,),
+            )
+            row = cursor.fetchone()
+            if not row:
+                return None
+
+            cursor.execute(
+                """
+                UPDATE image_analysis_cache
+                SET hit_count = hit_count + 1
+                WHERE content_hash = ?
+            """,
+                (content_hash,),
+            )
+            conn.commit()
+            return json.loads(row[0])
+        finally:
+            conn.close()
+
+    def cache_image_analysis(self, content_hash: str, analysis_data: dict):
+        """Remember the vision analysis of an image content hash"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO image_analysis_cache (content_hash, analysis_data)
+                VALUES (?, ?)
+            """,
+                (content_hash, json.dumps(analysis_data)),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_image_dedupe_stats(self) -> Dict[str, Any]:
+        """Get how many stored images share the same content"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT COUNT(*), COUNT(DISTINCT content_hash)
+                FROM case_images
+                WHERE content_hash IS NOT NULL
+            """)
+            image_rows, unique_blobs = cursor.fetchone()
+
+            cursor.execute("SELECT COALESCE(SUM(hit_count), 0) FROM image_analysis_cache")
+            cache_hits = cursor.fetchone()[0]
+
+            return {
+                "image_rows": image_rows,
+                "unique_blobs": unique_blobs,
+                "dedupe_ratio": round(1 - unique_blobs / image_rows, 4)
+                if image_rows
+                else 0.0,
+                "analysis_cache_hits": cache_hits,
+            }
+        finally:
+            conn.close()
+
+    def create_image_job(self, session_id: str, payload: dict) -> str:
+        """Queue an image-analysis job"""
+        job_id = str(uuid.uuid4())
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            INSERT INTO image_analysis_jobs (job_id, session_id, payload)
+            VALUES (?, ?, ?)
+        """,
+            (job_id, session_id, json.dumps(payload)),
+        )
+
+        conn.commit()
+        conn.close()
+        return job_id
+
+    def claim_next_image_job(
+        self, lease_seconds: float = 60, max_attempts: int = 3
+    ) -> Optional[Dict[str, Any]]:
+        """Atomically lease the oldest claimable job to this process and return it.
+
+        Claimable are queued jobs and running jobs whose lease expired (their
+        worker was killed or recycled). An expired job that already had
+        max_attempts is marked failed instead.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        expired = f"-{float(lease_seconds)} seconds"
+
+        try:
+            # Take the write lock up front so two workers never claim the same job
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                """
+                UPDATE image_analysis_jobs
+                SET status = 'failed', error = 'worker stopped while running the job',
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE status = 'running' AND attempts >= ?
+                  AND (claimed_at IS NULL OR claimed_at < datetime('now', ?))
+            """,
+                (max_attempts, expired),
+            )
+            cursor.execute(
+                """
+                SELECT job_id, session_id, payload, attempts, status
+                FROM image_analysis_jobs
+                WHERE status = 'queued'
+                   OR (status = 'running'
+                       AND (claimed_at IS NULL OR claimed_at < datetime('now', ?)))
+                ORDER BY created_at, rowid
+                LIMIT 1
+            """,
+                (expired,),
+            )
+            row = cursor.fetchone()
+            if not row:
+                conn.commit()  # jobs given up on above
+                return None
+
+            cursor.execute(
+                """
+                UPDATE image_analysis_jobs
+                SET status = 'running', attempts = attempts + 1, worker_pid = ?,
+                    claimed_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                WHERE job_id = ?
+            """,
+                (os.getpid(), row[0]),
+            )
+            conn.commit()
+            if row[4] == "running":
+                print(f"🔁 Reclaimed image-analysis job {row[0][:8]}... after its lease expired")
+
+            return {
+                "job_id": row[0],
+                "session_id": row[1],
+                "payload": json.loads(row[2]),
+                "attempts": row[3] + 1,
+            }
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def renew_image_job_leases(self, job_ids: List[str]) -> int:
+        """Extend the leases of jobs this process is still running"""
+        if not job_ids:
+            return 0
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            f"""
+            UPDATE image_analysis_jobs SET claimed_at = CURRENT_TIMESTAMP
+            WHERE status = 'running' AND worker_pid = ?
+              AND job_id IN ({", ".join("?" for _ in job_ids)})
+        """,
+            (os.getpid(), *job_ids),
+        )
+        renewed = cursor.rowcount
+
+        conn.commit()
+        conn.close()
+        return renewed
+
+    def finish_image_job(
+        self, job_id: str, status: str, result: dict = None, error: str = None
+    ):
+        """Record the outcome of an image-analysis job ('done', 'failed' or back to 'queued')"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            UPDATE image_analysis_jobs
+            SET status = ?, result = ?, error = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE job_id = ?
+        """,
+            (status, json.dumps(result) if result is not None else None, error, job_id),
+        )
+
+        conn.commit()
+        conn.close()
+
+    def requeue_running_image_jobs(self, lease_seconds: float = 60) -> int:
+        """Put jobs left 'running' by a stopped worker back on the queue.
+
+        Only jobs whose lease expired: a job whose lease still holds may be
+        running in a worker that outlives this process (a graceful reload).
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            UPDATE image_analysis_jobs
+            SET status = 'queued', updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'running'
+              AND (claimed_at IS NULL OR claimed_at < datetime('now', ?))
+        """,
+            (f"-{float(lease_seconds)} seconds",),
+        )
+        requeued = cursor.rowcount
+
+        conn.commit()
+        conn.close()
+        return requeued
+
+    def get_image_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get the status and result of an image-analysis job"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT job_id, session_id, status, result, error, attempts,
+                   created_at, updated_at
+            FROM image_analysis_jobs
+            WHERE job_id = ?
+        """,
+            (job_id,),
+        )
+        row = cursor.fetchone()
+        conn.close()
+
+        if not row:
+            return None
+
+        return {
+            "job_id": row[0],
+            "session_id": row[1],
+            "status": row[2],
+            "result": json.loads(row[3]) if row[3] else None,
+            "error": row[4],
+            "attempts": row[5],
+            "created_at": row[6],
+            "updated_at": row[7],
+        }
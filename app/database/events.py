@@ -0,0 +1,190 @@
+import itertools
+import json
+import os
+import queue
+import sqlite3
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+
+# Events kept for clients that reconnect with Last-Event-ID
+REPLAY_BUFFER_SIZE = 500
+
+# Events a slow subscriber may fall behind by before it is dropped
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+# Events kept in a shared event log (see EventBus.persist_to)
+LOG_RETENTION = 10000
+
+
+def event_log_path(db_path: str) -> str:
+    """Event log file of a database, e.g. chat_database.events.db"""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.events{ext or '.db'}"
+
+
+class EventBus:
+    """Pub/sub for database changes.
+
+    In-process by default. After persist_to(log_path) every event is also
+    appended to an event_log table in that SQLite file, and event ids and
+    events_since() come from the log, so every process sharing the file
+    (e.g. gunicorn workers) sees every event and the ids a client
+    reconnects with mean the same thing in every process. Subscriber
+    queues still only get the events of their own process; with a log,
+    consumers use them as a wake-up and read events with events_since().
+
+    The log is a file of its own (WAL, without an fsync per event), so
+    appending to it never holds the write lock of the database, or of any
+    shard, whose change it reports. An event that could not be logged is
+    only delivered to this process's subscribers, without an id.
+
+    Publishers never block: a subscriber whose queue is full is dropped and
+    has to reconnect (and resync) instead of slowing down the writers.
+    """
+
+    def __init__(self, buffer_size: int = REPLAY_BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._recent = deque(maxlen=buffer_size)
+        self._subscribers: List[queue.Queue] = []
+        self.log_path: Optional[str] = None
+        self.log_retention = LOG_RETENTION
+        self._log_ready = False
+
+    def persist_to(self, log_path: str, retention: int = LOG_RETENTION) -> None:
+        """Share events through an event_log table in log_path (see event_log_path)"""
+        self.log_path = log_path
+        self.log_retention = retention
+        self._log_ready = False
+
+    def _log_connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.log_path)
+        # Losing the last events on a power cut only costs dashboards a resync
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if not self._log_ready:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS event_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    type TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.commit()
+            self._log_ready = True
+        return conn
+
+    def _append_to_log(self, event_type: str, data: Dict[str, Any]) -> int:
+        conn = self._log_connect()
+        try:
+            cursor = conn.execute(
+                "INSERT INTO event_log (type, data) VALUES (?, ?)",
+                (event_type, json.dumps(data, ensure_ascii=False)),
+            )
+            event_id = cursor.lastrowid
+            # Trim now and then rather than on every write
+            if event_id % 100 == 0:
+                conn.execute(
+                    "DELETE FROM event_log WHERE id <= ?", (event_id - self.log_retention,)
+                )
+            conn.commit()
+            return event_id
+        finally:
+            conn.close()
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        event_id = None
+        if self.log_path:
+            try:
+                event_id = self._append_to_log(event_type, data)
+            except sqlite3.Error as e:
+                # The write it reports is committed already. Without an id of
+                # the log's own, the event only reaches this process's streams
+                # (a made-up id could clash with a logged one on resume)
+                print(f"⚠️ Could not log {event_type} event: {e}")
+
+        with self._lock:
+            if event_id is None and not self.log_path:
+                event_id = next(self._ids)
+            event = {"id": event_id, "type": event_type, "data": data}
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                self.unsubscribe(subscriber)
+                subscriber.closed = True
+        return event
+
+    def subscribe(self) -> queue.Queue:
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        subscriber.closed = False
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def latest_id(self) -> int:
+        """Id of the newest event, 0 if there is none"""
+        if self.log_path:
+            conn = self._log_connect()
+            try:
+                return conn.execute("SELECT COALESCE(MAX(id), 0) FROM event_log").fetchone()[0]
+            finally:
+                conn.close()
+        with self._lock:
+            return self._recent[-1]["id"] if self._recent else 0
+
+    def events_since(self, last_id: int, limit: int = REPLAY_BUFFER_SIZE) -> Optional[List[Dict[str, Any]]]:
+        """Events after last_id (at most limit), or None if some are no longer kept"""
+        if self.log_path:
+            conn = self._log_connect()
+            try:
+                oldest, newest = conn.execute(
+                    "SELECT COALESCE(MIN(id), 1), COALESCE(MAX(id), 0) FROM event_log"
+                ).fetchone()
+                if last_id > newest or last_id + 1 < oldest:
+                    return None
+                rows = conn.execute(
+                    "SELECT id, type, data FROM event_log WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, limit),
+                ).fetchall()
+            finally:
+                conn.close()
+            return [{"id": row[0], "type": row[1], "data": json.loads(row[2])} for row in rows]
+
+        with self._lock:
+            recent = list(self._recent)
+        newest = recent[-1]["id"] if recent else 0
+        oldest = recent[0]["id"] if recent else 1
+        # A newer id than ours means the process restarted since
+        if last_id > newest or last_id + 1 < oldest:
+            return None
+        return [event for event in recent if event["id"] > last_id][:limit]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Serialize an event as a Server-Sent Events message"""
+    lines = []
+    if event.get("id") is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event['data'], ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+# Process-wide bus the ChatDatabase write paths publish into
+events = EventBus()
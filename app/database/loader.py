@@ -0,0 +1,103 @@
+from typing import Any, Dict, List, Optional
+
+from database.database import query_counter
+
+
+# Writes that change cached reads, and which cached reads they change. Any
+# other attribute is passed straight through to the database.
+INVALIDATED_BY = {
+    "add_message": ("history",),
+    "update_session_info": ("session",),
+    "end_session": ("session", "case"),
+    "create_case": ("case",),
+    "update_case_info": ("case",),
+    "update_case_analysis": ("case",),
+    "update_case_flags": ("case",),
+    "update_case_summary": ("case",),
+}
+
+
+class RequestLoader:
+    """Identity map over ChatDatabase for the duration of one request or job.
+
+    Session, case and chat-history reads are memoized per session id, so
+    repeated reads within a request hit the database once; writes made
+    through the loader drop the entries they change. Returned rows are
+    shared between callers and must be treated as read-only.
+
+    Rows are never cached across requests, so a write by another request
+    is seen by the next one.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._cache: Dict[tuple, Any] = {}
+        self.stats = {"queries": 0, "hits": 0}
+
+    def start_counting(self) -> None:
+        """Count this context's database statements into self.stats"""
+        query_counter.set(self.stats)
+
+    def stop_counting(self) -> None:
+        query_counter.set(None)
+
+    def _load(self, kind: str, session_id: str, read):
+        key = (kind, session_id)
+        if key in self._cache:
+            self.stats["hits"] += 1
+            return self._cache[key]
+        value = read(session_id)
+        self._cache[key] = value
+        return value
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._load("session", session_id, self.db.get_session)
+
+    def get_case_by_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._load("case", session_id, self.db.get_case_by_session)
+
+    def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
+        return self._load("history", session_id, self.db.get_chat_history)
+
+    def update_case_info(self, session_id: str, **kwargs):
+        # The write needs the current case, which is usually already loaded
+        kwargs.setdefault("existing_case", self.get_case_by_session(session_id))
+        case_id = self.db.update_case_info(session_id, **kwargs)
+        self.invalidate(session_id, ("case",))
+        return case_id
+
+    def store_case_image(self, session_id: str, **kwargs):
+        if kwargs.get("case_id") is None:
+            case = self.get_case_by_session(session_id)
+            kwargs["case_id"] = case["id"] if case else None
+        return self.db.store_case_image(session_id=session_id, **kwargs)
+
+    def invalidate(self, session_id: str = None, kinds=("session", "case", "history"), case_id: int = None):
+        """Forget cached rows of a session, or of whichever session owns case_id"""
+        for key, value in list(self._cache.items()):
+            kind, cached_session = key
+            if kind not in kinds:
+                continue
+            if session_id is not None and cached_session == session_id:
+                del self._cache[key]
+            elif case_id is not None and kind == "case" and value and value["id"] == case_id:
+                del self._cache[key]
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.db, name)
+        kinds = INVALIDATED_BY.get(name)
+        if kinds is None:
+            return attr
+
+        def write(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            session_id = kwargs.get("session_id")
+            if session_id is None and args and isinstance(args[0], str):
+                session_id = args[0]
+            case_id = kwargs.get("case_id")
+            if case_id is None and args and isinstance(args[0], int):
+                case_id = args[0]
+            self.invalidate(session_id, kinds, case_id)
+            return result
+
+        return write
@@ -0,0 +1,49 @@
+import re
+import unicodedata
+from typing import Optional
+
+
+# Greek plates are three letters that have a Latin twin and four digits, so a
+# plate of that shape is stored with the Latin look-alikes ("ΙΚΥ 1234" and
+# "IKY-1234" are one plate). R is how Ρ is typed phonetically on a Latin
+# keyboard. Other plates (foreign, trade, diplomatic) are kept as typed, so
+# they are not merged with Greek ones they merely resemble.
+_LOOKALIKES = str.maketrans(
+    {
+        "Α": "A", "Β": "B", "Ε": "E", "Ζ": "Z", "Η": "H", "Ι": "I", "Κ": "K",
+        "Μ": "M", "Ν": "N", "Ο": "O", "Ρ": "P", "Τ": "T", "Υ": "Y", "Χ": "X",
+        "R": "P",
+    }
+)
+
+# In the digit part of a plate, letters mistyped for digits
+_DIGIT_LOOKALIKES = str.maketrans({"O": "0", "I": "1"})
+
+_GREEK_PLATE = re.compile(r"^([ABEZHIKMNOPRTYXΑΒΕΖΗΙΚΜΝΟΡΤΥΧ]{3})([0-9OI]{4})$")
+
+# Several claims on one vehicle within this window count as a fraud signal
+REPEAT_CLAIM_WINDOW_DAYS = 30
+REPEAT_CLAIM_THRESHOLD = 2  # other cases on the same plate
+
+
+def normalize_plate(raw: str) -> Optional[str]:
+    """Canonical lookup key of a registration number ("ΙΚΥ 1234" -> "IKY1234")"""
+    if not raw:
+        return None
+    decomposed = unicodedata.normalize("NFD", raw.upper())
+    stripped = "".join(c for c in decomposed if unicodedata.category(c) != "Mn")
+    key = "".join(c for c in stripped if c.isalnum())
+
+    match = _GREEK_PLATE.match(key)
+    if match:
+        key = match.group(1).translate(_LOOKALIKES) + match.group(2).translate(_DIGIT_LOOKALIKES)
+    return key or None
+
+
+def format_plate(raw: str) -> Optional[str]:
+    """Display form of a registration number ("ικυ 1234" -> "IKY-1234")"""
+    key = normalize_plate(raw)
+    if key is None:
+        return raw.strip() if raw and raw.strip() else None
+    match = re.match(r"^([A-Z]+)([0-9]+)$", key)
+    return f"{match.group(1)}-{match.group(2)}" if match else key
@@ -0,0 +1,178 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Statements worth an EXPLAIN QUERY PLAN when they are slow
+EXPLAINED_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(sql: str) -> str:
+    """Query text with literals replaced, so calls differing only in values group together"""
+    text = _WHITESPACE.sub(" ", sql).strip()
+    text = _LITERALS.sub("?", text)
+    return _PLACEHOLDER_LISTS.sub("(?, ...)", text)
+
+
+class QueryProfiler:
+    """Times every statement run through a profiled connection.
+
+    Keeps calls, total and max time per normalized query, and logs each
+    execution slower than slow_query_ms with its EXPLAIN QUERY PLAN. The
+    time of a query includes fetching its rows.
+    """
+
+    def __init__(self, slow_query_ms: float = 50.0, keep_slow: int = 50):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._queries: Dict[str, Dict[str, Any]] = {}
+        self._slow = deque(maxlen=keep_slow)
+        self._since = datetime.now().isoformat()
+
+    def connect(self, db_path: str, **kwargs) -> sqlite3.Connection:
+        conn = sqlite3.connect(db_path, factory=ProfiledConnection, **kwargs)
+        conn.profiler = self
+        return conn
+
+    def observe(self, cursor: "ProfiledCursor", elapsed_ms: float) -> None:
+        """Add time spent executing or fetching to the cursor's current statement"""
+        execution = cursor.execution
+        if execution is None:
+            return
+        execution["ms"] += elapsed_ms
+
+        with self._lock:
+            stats = self._queries.setdefault(
+                execution["query"], {"calls": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            if not execution["counted"]:
+                stats["calls"] += 1
+                execution["counted"] = True
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], execution["ms"])
+
+        if execution["ms"] >= self.slow_query_ms and not execution["logged"]:
+            execution["logged"] = True
+            self._log_slow(cursor.connection, execution)
+
+    def _log_slow(self, conn: sqlite3.Connection, execution: Dict[str, Any]) -> None:
+        plan = self.explain(conn, execution["sql"], execution["params"])
+        with self._lock:
+            self._slow.append(
+                {
+                    "query": execution["query"],
+                    "ms": round(execution["ms"], 3),
+                    "plan": plan,
+                    "at": datetime.now().isoformat(),
+                }
+            )
+        print(f"🐢 Slow query ({execution['ms']:.1f} ms): {execution['query'][:200]}")
+        for line in plan:
+            print(f"   {line}")
+
+    @staticmethod
+    def explain(conn: sqlite3.Connection, sql: str, params) -> List[str]:
+        """EXPLAIN QUERY PLAN of a statement, as indented lines"""
+        if not sql.lstrip()[:7].upper().startswith(EXPLAINED_STATEMENTS):
+            return []
+        try:
+            # A plain cursor, so the EXPLAIN itself is not profiled
+            rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        except sqlite3.Error as e:
+            return [f"(no plan: {e})"]
+
+        depth = {0: -1}
+        lines = []
+        for node_id, parent_id, _, detail in rows:
+            depth[node_id] = depth.get(parent_id, -1) + 1
+            lines.append("  " * depth[node_id] + detail)
+        return lines
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-query statistics, most total time first, and recent slow queries"""
+        with self._lock:
+            queries = [
+                {
+                    "query": query,
+                    "calls": stats["calls"],
+                    "total_ms": round(stats["total_ms"], 3),
+                    "avg_ms": round(stats["total_ms"] / max(stats["calls"], 1), 3),
+                    "max_ms": round(stats["max_ms"], 3),
+                }
+                for query, stats in self._queries.items()
+            ]
+            slow = list(reversed(self._slow))
+        queries.sort(key=lambda q: -q["total_ms"])
+        return {
+            "since": self._since,
+            "slow_query_ms": self.slow_query_ms,
+            "queries": queries,
+            "slow_queries": slow,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._queries.clear()
+            self._slow.clear()
+            self._since = datetime.now().isoformat()
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    execution: Optional[Dict[str, Any]] = None
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            self.connection.profiler.observe(self, (time.perf_counter() - start) * 1000)
+
+    def _start(self, sql: str, params) -> None:
+        self.execution = {
+            "query": normalize_query(sql),
+            "sql": sql,
+            "params": params,
+            "ms": 0.0,
+            "counted": False,
+            "logged": False,
+        }
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        return self._timed(sqlite3.Cursor.execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        self._start(sql, seq_of_parameters[0] if seq_of_parameters else ())
+        return self._timed(sqlite3.Cursor.executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self._timed(sqlite3.Cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.arraysize
+        return self._timed(sqlite3.Cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._timed(sqlite3.Cursor.fetchall)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    profiler: QueryProfiler
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
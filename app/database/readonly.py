@@ -0,0 +1,186 @@
+import copy
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from typing import List, Optional, Tuple
+
+from database.database import ChatDatabase
+from database.sharding import ShardedChatDatabase
+
+
+def read_only_uri(db_path: str) -> str:
+    """SQLite URI opening db_path read-only"""
+    return f"file:{urllib.parse.quote(os.path.abspath(db_path))}?mode=ro"
+
+
+def snapshot_path(db_path: str) -> str:
+    """Snapshot file of a database, e.g. chat_database.snapshot.db"""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.snapshot{ext or '.db'}"
+
+
+class _PooledConnection:
+    """A connection from a ReadOnlyChatDatabase pool; close() hands it back"""
+
+    def __init__(self, conn: sqlite3.Connection, pool: "ReadOnlyChatDatabase", generation: int):
+        self._conn = conn
+        self._pool = pool
+        self._generation = generation
+
+    def close(self) -> None:
+        self._pool._checkin(self._conn, self._generation)
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn, name)
+
+
+class ReadOnlyChatDatabase(ChatDatabase):
+    """ChatDatabase reads over a pool of read-only connections.
+
+    Connections are opened with mode=ro and PRAGMA query_only, so an admin or
+    reporting query can never take the write lock, and they are reused
+    instead of opened per call. With snapshot_interval set, reads go to a copy
+    of the database made with the SQLite backup API and refreshed in the
+    background once it is older than snapshot_interval seconds, so long
+    reports do not hold back WAL checkpoints of the live file either.
+
+    A reader never creates or migrates the schema itself: given the writer
+    (the ChatDatabase of the same file), it has the writer create it before
+    the first read, since mode=ro cannot open a file that does not exist yet.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        profiler=None,
+        pool_size: int = 4,
+        snapshot_interval: Optional[float] = None,
+        writer: Optional[ChatDatabase] = None,
+    ):
+        super().__init__(db_path, profiler=profiler, lazy_schema=True)
+        self._schema_ready = True
+        self.writer = writer
+        self.pool_size = pool_size
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_path = snapshot_path(db_path) if snapshot_interval else None
+        self._pool_lock = threading.Lock()
+        self._idle: List[Tuple[sqlite3.Connection, int]] = []
+        # Bumped by every snapshot refresh; older connections are not reused
+        self._generation = 0
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+
+    def _open(self) -> sqlite3.Connection:
+        if self.writer is not None and not self.writer._schema_ready:
+            self.writer.init_database()
+        self._refresh_snapshot_if_stale()
+        with self._pool_lock:
+            generation = self._generation
+            while self._idle:
+                conn, conn_generation = self._idle.pop()
+                if conn_generation == generation:
+                    break
+                conn.close()
+            else:
+                conn = None
+
+        if conn is None:
+            conn = self._open_read_only(self.snapshot_path or self.db_path)
+        self._count_statements(conn)
+        return _PooledConnection(conn, self, generation)
+
+    def _open_read_only(self, path: str) -> sqlite3.Connection:
+        # Pooled connections move between request threads, one at a time
+        options = {"uri": True, "check_same_thread": False}
+        if self.profiler is not None:
+            conn = self.profiler.connect(read_only_uri(path), **options)
+        else:
+            conn = sqlite3.connect(read_only_uri(path), **options)
+        # A plain cursor, so the setup is not profiled
+        sqlite3.Connection.execute(conn, "PRAGMA query_only = 1")
+        return conn
+
+    def _checkin(self, conn: sqlite3.Connection, generation: int) -> None:
+        conn.set_trace_callback(None)
+        with self._pool_lock:
+            if generation == self._generation and len(self._idle) < self.pool_size:
+                self._idle.append((conn, generation))
+                return
+        conn.close()
+
+    def _refresh_snapshot_if_stale(self) -> None:
+        if not self.snapshot_path:
+            return
+        try:
+            age = time.time() - os.path.getmtime(self.snapshot_path)
+        except FileNotFoundError:
+            # The first read waits for the first snapshot
+            with self._refresh_lock:
+                if not os.path.exists(self.snapshot_path):
+                    self.refresh_snapshot()
+            return
+
+        if age > self.snapshot_interval:
+            with self._pool_lock:
+                if self._refreshing:
+                    return
+                self._refreshing = True
+            threading.Thread(
+                target=self._refresh_in_background, name="db-snapshot", daemon=True
+            ).start()
+
+    def _refresh_in_background(self) -> None:
+        try:
+            with self._refresh_lock:
+                self.refresh_snapshot()
+        except Exception as e:
+            print(f"❌ Snapshot of {self.db_path} failed: {e}")
+        finally:
+            with self._pool_lock:
+                self._refreshing = False
+
+    def refresh_snapshot(self) -> None:
+        """Copy the live database into the snapshot file with the backup API"""
+        started = time.perf_counter()
+        partial = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        source = sqlite3.connect(read_only_uri(self.db_path), uri=True)
+        target = sqlite3.connect(partial)
+        try:
+            source.backup(target)
+            # A rollback-journal file opens read-only without -wal/-shm files
+            target.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            target.close()
+            source.close()
+        # Readers of the old snapshot keep their open file until they finish
+        os.replace(partial, self.snapshot_path)
+
+        with self._pool_lock:
+            self._generation += 1
+            stale, self._idle = self._idle, []
+        for conn, _ in stale:
+            conn.close()
+        print(f"📸 Snapshot of {self.db_path} refreshed in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def open_read_only(db, pool_size: int = 4, snapshot_interval: Optional[float] = None):
+    """Read-only counterpart of a ChatDatabase or ShardedChatDatabase"""
+
+    def reader(chat_db: ChatDatabase) -> ReadOnlyChatDatabase:
+        return ReadOnlyChatDatabase(
+            chat_db.db_path,
+            profiler=chat_db.profiler,
+            pool_size=pool_size,
+            snapshot_interval=snapshot_interval,
+            writer=chat_db,
+        )
+
+    if isinstance(db, ShardedChatDatabase):
+        # Same routing and thread pool, read-only files underneath
+        view = copy.copy(db)
+        view.primary = reader(db.primary)
+        view.shards = [reader(shard) for shard in db.shards]
+        return view
+    return reader(db)
@@ -0,0 +1,98 @@
+"""Case and session statistics from the rollup tables.
+
+The rollups are kept current by the database writes; rebuild them after
+importing data or changing the rollup definitions:
+
+    cd app && python -m database.rollups --rebuild
+    cd app && python -m database.rollups --granularity day --days 30
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from database.database import ROLLUP_BUCKETS
+
+CASE_TYPES = ("AC", "RA", "OTHER")
+
+
+def since_bucket(granularity: str, days: float) -> str:
+    """First bucket of the last `days` days (rollup buckets are in UTC)"""
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    return since.strftime(ROLLUP_BUCKETS[granularity])
+
+
+def _empty_counts() -> Dict[str, Any]:
+    return {
+        "cases": 0,
+        "by_type": {case_type: 0 for case_type in CASE_TYPES},
+        "fast_track": 0,
+        "fraud": 0,
+        "sessions_ended": 0,
+        "duration_seconds": 0.0,
+    }
+
+
+def _add_rates(counts: Dict[str, Any]) -> Dict[str, Any]:
+    cases, ended = counts["cases"], counts["sessions_ended"]
+    duration = counts.pop("duration_seconds")
+    counts["fast_track_rate"] = round(counts["fast_track"] / cases, 4) if cases else None
+    counts["fraud_rate"] = round(counts["fraud"] / cases, 4) if cases else None
+    counts["avg_session_seconds"] = round(duration / ended, 1) if ended else None
+    return counts
+
+
+def summarize_rollups(rollups: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Per-bucket and overall volume, case type split, rates and session duration"""
+    buckets: Dict[str, Dict[str, Any]] = {}
+    totals = _empty_counts()
+
+    for row in rollups["cases"]:
+        for counts in (buckets.setdefault(row["bucket"], _empty_counts()), totals):
+            counts["cases"] += row["cases"]
+            counts["by_type"][row["case_type"]] = (
+                counts["by_type"].get(row["case_type"], 0) + row["cases"]
+            )
+            counts["fast_track"] += row["fast_track"]
+            counts["fraud"] += row["fraud"]
+
+    for row in rollups["sessions"]:
+        for counts in (buckets.setdefault(row["bucket"], _empty_counts()), totals):
+            counts["sessions_ended"] += row["sessions_ended"]
+            counts["duration_seconds"] += row["duration_seconds"]
+
+    return {
+        "totals": _add_rates(totals),
+        "buckets": [
+            {"bucket": bucket, **_add_rates(counts)}
+            for bucket, counts in sorted(buckets.items())
+            # Buckets whose cases were all retracted (e.g. re-typed) stay as zero rows
+            if counts["cases"] or counts["sessions_ended"]
+        ],
+    }
+
+
+def main():
+    from database.sharding import open_database
+
+    parser = argparse.ArgumentParser(description="Show or rebuild the case statistics rollups")
+    parser.add_argument("--db", default=os.getenv("DATABASE_PATH", "chat_database.db"))
+    parser.add_argument("--shards", type=int, default=int(os.getenv("DB_SHARDS", "1")))
+    parser.add_argument("--rebuild", action="store_true", help="recompute from all cases and sessions")
+    parser.add_argument("--granularity", choices=sorted(ROLLUP_BUCKETS), default="hour")
+    parser.add_argument("--days", type=float, default=1, help="how far back to show")
+    args = parser.parse_args()
+
+    db = open_database(args.db, shards=args.shards)
+    if args.rebuild:
+        rows = db.rebuild_rollups()
+        print(f"📊 Rebuilt rollups of {args.db}: {rows['case_rollups']} case rows, {rows['session_rollups']} session rows")
+
+    stats = summarize_rollups(db.get_rollups(args.granularity, since_bucket(args.granularity, args.days)))
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import contextvars
+import heapq
+import os
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from database.database import ChatDatabase
+from database.events import events
+from database.plates import normalize_plate
+
+# Case ids of shard i start at i * CASE_ID_SPAN, so a case id names its shard
+# (and stays below 2**53 for JavaScript clients up to 8192 shards)
+CASE_ID_SPAN = 2**40
+
+# Methods served by the shard of their session_id (first argument or keyword)
+SESSION_METHODS = {
+    "add_message",
+    "get_chat_history",
+    "get_chat_history_page",
+    "get_case_by_session",
+    "get_session",
+    "get_session_version",
+    "end_session",
+    "update_session_info",
+    "store_case_image",
+}
+
+# Methods served by the shard of their case_id (first argument or keyword)
+CASE_METHODS = {"update_case_analysis", "update_case_flags", "update_case_summary"}
+
+# Case columns other sessions show in their list of cases of the same vehicle
+VEHICLE_CASE_FIELDS = (
+    "case_type",
+    "registration_number",
+    "customer_name",
+    "description",
+    "location",
+)
+
+# Tables that are not per session (image analysis cache and job queue) stay
+# in the main database file
+PRIMARY_METHODS = {
+    "get_cached_image_analysis",
+    "cache_image_analysis",
+    "create_image_job",
+    "claim_next_image_job",
+    "finish_image_job",
+    "requeue_running_image_jobs",
+    "renew_image_job_leases",
+    "get_image_job",
+}
+
+
+def shard_path(db_path: str, index: int, count: int) -> str:
+    """File of one shard, e.g. chat_database.s2of4.db next to chat_database.db"""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.s{index}of{count}{ext or '.db'}"
+
+
+class ShardedChatDatabase:
+    """ChatDatabase spread over N SQLite files to allow N concurrent writers.
+
+    Each session's rows (messages, case, analysis, flags, summary, images)
+    live in the shard chosen by hashing its session_id. The image analysis
+    cache and job queue stay in db_path. Listings that span sessions are
+    queried on every shard in parallel and merged in order.
+
+    The shard count is part of the file names, so changing it starts from
+    empty shards rather than misrouting existing sessions.
+
+    Every shard file and its schema are created up front (lazy_schema only
+    applies to the primary), so reads that span all shards never depend on
+    which shards have been written to yet.
+    """
+
+    def __init__(self, db_path: str, shards: int, event_bus=None, lazy_schema: bool = False):
+        self.db_path = db_path
+        self.events = event_bus or events
+        self.primary = ChatDatabase(db_path, event_bus=self.events, lazy_schema=lazy_schema)
+        self.shards = [
+            ChatDatabase(
+                shard_path(db_path, i, shards),
+                event_bus=self.events,
+                case_id_offset=i * CASE_ID_SPAN,
+            )
+            for i in range(shards)
+        ]
+        # Threads start on first use, so a pre-fork master that never
+        # scatters has none when it forks
+        self._pool = ThreadPoolExecutor(max_workers=shards, thread_name_prefix="db-shard")
+
+    @property
+    def profiler(self):
+        return self.primary.profiler
+
+    @profiler.setter
+    def profiler(self, profiler):
+        for db in [self.primary, *self.shards]:
+            db.profiler = profiler
+
+    def shard_for(self, session_id: str) -> ChatDatabase:
+        return self.shards[zlib.crc32(session_id.encode("utf-8")) % len(self.shards)]
+
+    def shard_for_case(self, case_id: int) -> ChatDatabase:
+        return self.shards[case_id // CASE_ID_SPAN]
+
+    def _scatter(self, call) -> List[Any]:
+        """call(shard) on every shard in parallel, in the caller's context (trace, query count)"""
+        futures = [
+            self._pool.submit(contextvars.copy_context().run, call, shard) for shard in self.shards
+        ]
+        return [future.result() for future in futures]
+
+    def init_database(self):
+        for db in [self.primary, *self.shards]:
+            db.init_database()
+
+    def create_chat_session(self, customer_name: str = None, registration_number: str = None) -> str:
+        session_id = str(uuid.uuid4())
+        return self.shard_for(session_id).create_chat_session(
+            customer_name, registration_number, session_id=session_id
+        )
+
+    def _touch_other_shards(self, shard: ChatDatabase, session_id: str, plate_keys) -> None:
+        """Bump sessions on other shards that list this session's case by plate"""
+        plate_keys = [key for key in plate_keys if key]
+        if not plate_keys:
+            return
+        for other in self.shards:
+            if other is not shard:
+                other.touch_plate_sessions(plate_keys, exclude_session_id=session_id)
+
+    def create_case(
+        self,
+        session_id: str,
+        case_type: str,
+        registration_number: str,
+        customer_name: str,
+        description: str,
+        location: str,
+        final_destination: str,
+    ) -> int:
+        shard = self.shard_for(session_id)
+        case_id = shard.create_case(
+            session_id,
+            case_type,
+            registration_number,
+            customer_name,
+            description,
+            location,
+            final_destination,
+        )
+        self._touch_other_shards(shard, session_id, [normalize_plate(registration_number)])
+        return case_id
+
+    def update_case_info(
+        self, session_id: str, existing_case: dict = None, writes: Dict[str, int] = None, **kwargs
+    ):
+        shard = self.shard_for(session_id)
+        if existing_case is None:
+            existing_case = shard.get_case_by_session(session_id)
+        counted = writes if writes is not None else {"cases": 0}
+        written_before = counted["cases"]
+        case_id = shard.update_case_info(
+            session_id, existing_case=existing_case, writes=counted, **kwargs
+        )
+
+        # Other shards need a write lock only when their listing of this case
+        # changed, not on writes that changed nothing (or nothing they show)
+        written = counted["cases"] > written_before
+        if written and any(kwargs.get(field) is not None for field in VEHICLE_CASE_FIELDS):
+            plates = [kwargs.get("registration_number")]
+            if existing_case:
+                plates.append(existing_case["registration_number"])
+            self._touch_other_shards(shard, session_id, [normalize_plate(p) for p in plates if p])
+        return case_id
+
+    def get_case_images(self, session_id: str = None, case_id: int = None) -> List[Dict[str, Any]]:
+        if session_id:
+            return self.shard_for(session_id).get_case_images(session_id=session_id)
+        if case_id:
+            return self.shard_for_case(case_id).get_case_images(case_id=case_id)
+        return []
+
+    def get_all_sessions(self) -> List[Dict[str, Any]]:
+        """Sessions of every shard, newest first"""
+        per_shard = self._scatter(lambda shard: shard.get_all_sessions())
+        return list(
+            heapq.merge(*per_shard, key=lambda s: s["started_at"] or "", reverse=True)
+        )
+
+    def get_cases_by_plate(
+        self,
+        registration_number: str,
+        since_days: int = None,
+        exclude_session_id: str = None,
+    ) -> List[Dict[str, Any]]:
+        """Cases of one vehicle from every shard, newest first"""
+        per_shard = self._scatter(
+            lambda shard: shard.get_cases_by_plate(registration_number, since_days, exclude_session_id)
+        )
+        return list(
+            heapq.merge(*per_shard, key=lambda c: c["created_at"] or "", reverse=True)
+        )
+
+    def get_cases_by_tags(
+        self, tags: List[str], match_all: bool = False, limit: int = 50
+    ) -> Dict[str, Any]:
+        """Tagged cases from every shard, newest first, with counts summed"""
+        per_shard = self._scatter(lambda shard: shard.get_cases_by_tags(tags, match_all, limit))
+        tag_counts = {}
+        for result in per_shard:
+            for tag, count in result["tag_counts"].items():
+                tag_counts[tag] = tag_counts.get(tag, 0) + count
+        cases = heapq.merge(
+            *(result["cases"] for result in per_shard),
+            key=lambda c: (c["created_at"] or "", c["id"]),
+            reverse=True,
+        )
+        return {
+            "total": sum(result["total"] for result in per_shard),
+            "tag_counts": tag_counts,
+            "cases": list(cases)[:limit],
+        }
+
+    def rebuild_rollups(self) -> Dict[str, int]:
+        per_shard = self._scatter(lambda shard: shard.rebuild_rollups())
+        return {key: sum(rows[key] for rows in per_shard) for key in per_shard[0]}
+
+    def get_rollups(self, granularity: str, since: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Rollup rows of every shard; buckets repeat once per shard"""
+        per_shard = self._scatter(lambda shard: shard.get_rollups(granularity, since))
+        return {
+            "cases": [row for rollups in per_shard for row in rollups["cases"]],
+            "sessions": [row for rollups in per_shard for row in rollups["sessions"]],
+        }
+
+    def get_image_dedupe_stats(self) -> Dict[str, Any]:
+        def content_hashes(shard):
+            conn = shard._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT content_hash FROM case_images WHERE content_hash IS NOT NULL"
+                ).fetchall()
+            finally:
+                conn.close()
+            return [row[0] for row in rows]
+
+        hashes = [h for shard_hashes in self._scatter(content_hashes) for h in shard_hashes]
+        stats = self.primary.get_image_dedupe_stats()  # for the cache hit count
+        unique_blobs = len(set(hashes))
+        stats.update(
+            {
+                "image_rows": len(hashes),
+                "unique_blobs": unique_blobs,
+                "dedupe_ratio": round(1 - unique_blobs / len(hashes), 4) if hashes else 0.0,
+            }
+        )
+        return stats
+
+    def __getattr__(self, name: str):
+        if name in PRIMARY_METHODS:
+            return getattr(self.primary, name)
+
+        if name in SESSION_METHODS:
+            key, route = "session_id", self.shard_for
+        elif name in CASE_METHODS:
+            key, route = "case_id", self.shard_for_case
+        else:
+            raise AttributeError(f"{type(self).__name__} has no attribute {name!r}")
+
+        def routed(*args, **kwargs):
+            value = kwargs[key] if key in kwargs else args[0]
+            return getattr(route(value), name)(*args, **kwargs)
+
+        return routed
+
+
+def open_database(db_path: str, shards: int = 1, lazy_schema: bool = False):
+    """A ChatDatabase, or a ShardedChatDatabase when shards > 1"""
+    if shards > 1:
+        return ShardedChatDatabase(db_path, shards, lazy_schema=lazy_schema)
+    return ChatDatabase(db_path, lazy_schema=lazy_schema)
@@ -0,0 +1,298 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import instructor
+
+from agents.schemas import ImageAnalysisInput, VehicleImageAnalysis
+from database.database import query_counter
+from images.preprocessing import preprocess_image, summarize_preprocessing
+from images.storage import summarize_dedupe
+from tracing import traced
+
+
+# severity_assessment values by rank; the highest among a case's images sets its flags
+SEVERITY_RANK = {"minor": 0, "moderate": 1, "severe": 2}
+
+ANALYSIS_INSTRUCTION = "Ανάλυσε αυτές τις εικόνες που σχετίζονται με το περιστατικό οχήματος. Εξάγαγε όλες τις χρήσιμες πληροφορίες για την υπόθεση."
+
+
+def describe_cached_analyses(analyses: list) -> str:
+    """Build the chat reply for images whose analysis was already known"""
+    lines = ["Έχουμε ήδη αναλύσει αυτές τις φωτογραφίες:"]
+    for analysis in analyses:
+        details = analysis.damage_description or analysis.relevant_case_info
+        if analysis.license_plate_number:
+            details = f"πινακίδα {analysis.license_plate_number}"
+        lines.append(
+            f"- {analysis.image_type}: {details}" if details else f"- {analysis.image_type}"
+        )
+    return "\n".join(lines)
+
+
+@traced("images.prepare")
+def _prepare_images(pending: list, preprocess_options: dict):
+    """Preprocess pending uploads and wrap them for the vision model"""
+    preprocessed = [
+        preprocess_image(saved["path"], **preprocess_options) for saved in pending
+    ]
+    instructor_images = [
+        instructor.Image.from_path(prepared["path"]) for prepared in preprocessed
+    ]
+    return preprocessed, instructor_images
+
+
+def run_batch_analysis(
+    create_analyzer, pending: list, chat_context: str, preprocess_options: dict
+):
+    """Analyze all pending images in a single vision call.
+
+    Returns (chat_message, analyses by content hash, preprocessing results,
+    failed uploads). The model's per-image analyses are matched to files by
+    position, so a short answer leaves the trailing images unanalyzed.
+    """
+    preprocessed, instructor_images = _prepare_images(pending, preprocess_options)
+
+    analysis_result = create_analyzer().run(
+        ImageAnalysisInput(
+            instruction_text=ANALYSIS_INSTRUCTION,
+            images=instructor_images,
+            chat_context=chat_context,
+        )
+    )
+
+    if len(analysis_result.image_analyses) != len(pending):
+        print(
+            f"⚠️ Vision model returned {len(analysis_result.image_analyses)} "
+            f"analyses for {len(pending)} images"
+        )
+
+    analyses = {
+        saved["content_hash"]: img_analysis
+        for saved, img_analysis in zip(pending, analysis_result.image_analyses)
+    }
+    failed = [saved for saved in pending if saved["content_hash"] not in analyses]
+    return analysis_result.chat_message, analyses, preprocessed, failed
+
+
+def run_fanout_analysis(
+    create_analyzer,
+    pending: list,
+    chat_context: str,
+    preprocess_options: dict,
+    concurrency: int = 4,
+):
+    """Analyze each pending image in its own vision call on a bounded thread pool.
+
+    Results stay keyed by content hash, and one bad image only loses its own
+    analysis. Returns the same tuple as `run_batch_analysis`, with the
+    per-image replies merged into one chat message. Workers share nothing
+    mutable: each counts its statements into a counter of its own, which
+    this thread adds to the caller's once the future is done.
+    """
+
+    def analyze_one(saved, counter):
+        query_counter.set(counter)
+        preprocessed, instructor_images = _prepare_images([saved], preprocess_options)
+        # Agents keep conversation memory, so every thread gets its own
+        result = create_analyzer().run(
+            ImageAnalysisInput(
+                instruction_text=ANALYSIS_INSTRUCTION,
+                images=instructor_images,
+                chat_context=chat_context,
+            )
+        )
+        if not result.image_analyses:
+            raise ValueError("Vision model returned no analysis")
+        return preprocessed[0], result
+
+    analyses = {}
+    preprocessed = []
+    replies = []
+    failed = []
+
+    parent_counter = query_counter.get()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(pending)))) as pool:
+        # Each thread runs in a copy of this context, so its spans join the trace
+        futures = []
+        for saved in pending:
+            counter = {"queries": 0} if parent_counter is not None else None
+            future = pool.submit(contextvars.copy_context().run, analyze_one, saved, counter)
+            futures.append((saved, counter, future))
+
+        for saved, counter, future in futures:
+            try:
+                prepared, result = future.result()
+            except Exception as e:
+                print(f"❌ Could not analyze {saved['original_filename']}: {e}")
+                failed.append(saved)
+                continue
+            finally:
+                if counter is not None:
+                    parent_counter["queries"] += counter["queries"]
+
+            preprocessed.append(prepared)
+            analyses[saved["content_hash"]] = result.image_analyses[0]
+            if result.chat_message not in replies:
+                replies.append(result.chat_message)
+
+    if not analyses:
+        raise RuntimeError("None of the uploaded images could be analyzed")
+
+    for saved in failed:
+        replies.append(
+            f"Δεν μπορέσαμε να αναλύσουμε την εικόνα {saved['original_filename']}. "
+            "Μπορείτε να τη στείλετε ξανά;"
+        )
+
+    return "\n\n".join(replies), analyses, preprocessed, failed
+
+
+def analyze_uploaded_images(
+    db,
+    create_analyzer,
+    session_id: str,
+    saved_images: list,
+    chat_context: str,
+    preprocess_options: dict = None,
+    mode: str = "batch",
+    concurrency: int = 4,
+) -> dict:
+    """Analyze saved uploads and store the results on the session's case.
+
+    `saved_images` are the dicts returned by `images.storage.save_upload`,
+    `create_analyzer` builds a fresh image-analysis agent and `db` is a
+    ChatDatabase or a RequestLoader wrapping one. Images whose content
+    hash already has a cached analysis skip the vision call; the rest are sent
+    in one call (`mode="batch"`) or one call per image (`mode="fanout"`). The
+    assistant reply is added to the chat history and returned along with the
+    analyses and the preprocessing/dedupe reports.
+    """
+    preprocess_options = preprocess_options or {}
+
+    # Reuse the analysis of any image content we have already seen
+    analyses = {}
+    for saved in saved_images:
+        content_hash = saved["content_hash"]
+        if content_hash not in analyses:
+            cached = db.get_cached_image_analysis(content_hash)
+            if cached:
+                analyses[content_hash] = VehicleImageAnalysis(**cached)
+    cached_hashes = set(analyses)
+
+    # Only images with new content go to the vision model
+    pending = []
+    pending_hashes = set()
+    for saved in saved_images:
+        content_hash = saved["content_hash"]
+        if content_hash not in analyses and content_hash not in pending_hashes:
+            pending.append(saved)
+            pending_hashes.add(content_hash)
+
+    preprocessed = []
+    failed = []
+
+    if pending:
+        if mode == "fanout":
+            chat_message, new_analyses, preprocessed, failed = run_fanout_analysis(
+                create_analyzer, pending, chat_context, preprocess_options, concurrency
+            )
+        else:
+            chat_message, new_analyses, preprocessed, failed = run_batch_analysis(
+                create_analyzer, pending, chat_context, preprocess_options
+            )
+
+        for content_hash, img_analysis in new_analyses.items():
+            analyses[content_hash] = img_analysis
+            db.cache_image_analysis(content_hash, img_analysis.model_dump())
+    else:
+        chat_message = describe_cached_analyses(
+            [analyses[saved["content_hash"]] for saved in saved_images]
+        )
+
+    preprocessing = summarize_preprocessing(preprocessed)
+    # Per request only: the store-wide totals are a full scan (GET /admin/db/stats)
+    dedupe = summarize_dedupe(saved_images, cached_hashes)
+    print(
+        f"🖼️ {dedupe['uploaded']} images uploaded, "
+        f"{dedupe['cached_analyses']} served from analysis cache, "
+        f"{preprocessing['bytes_saved']} bytes saved by preprocessing"
+    )
+
+    # Store the analysis message in chat history
+    db.add_message(session_id, "assistant", chat_message)
+
+    # Store images and their analysis in database
+    stored_images = []
+    image_analyses = []
+    for saved in saved_images:
+        img_analysis = analyses.get(saved["content_hash"])
+        if img_analysis is None:
+            continue
+
+        image_data = {
+            "image_type": img_analysis.image_type,
+            "damage_description": img_analysis.damage_description,
+            "license_plate": img_analysis.license_plate_number,
+            "vehicle_make_model": img_analysis.vehicle_make_model,
+            "location_details": img_analysis.location_details,
+            "severity": img_analysis.severity_assessment,
+            "recommended_action": img_analysis.recommended_action,
+        }
+
+        db.store_case_image(
+            session_id=session_id,
+            filename=saved["filename"],
+            original_filename=saved["original_filename"],
+            image_type=img_analysis.image_type,
+            analysis_data=image_data,
+            content_hash=saved["content_hash"],
+        )
+        stored_images.append(saved["filename"])
+        image_analyses.append(img_analysis)
+
+    # What the images tell about the case, merged and written once: later
+    # images win, and the worst severity sets the flags
+    case_data = {}
+    severities = []
+    for img_analysis in image_analyses:
+        if img_analysis.license_plate_number:
+            case_data["registration_number"] = img_analysis.license_plate_number
+
+        if img_analysis.damage_description:
+            case_data["description"] = img_analysis.damage_description
+
+        if img_analysis.location_details:
+            case_data["location"] = img_analysis.location_details
+
+        if img_analysis.severity_assessment:
+            severities.append(img_analysis.severity_assessment)
+
+        if img_analysis.recommended_action:
+            case_data["recommended_action"] = img_analysis.recommended_action
+
+    severity = max(severities, key=lambda s: SEVERITY_RANK.get(s, -1), default=None)
+    if severity:
+        case_data["damage_severity"] = severity
+
+    # Update case if we have any new information
+    if case_data:
+        case_id = db.update_case_info(session_id=session_id, **case_data)
+
+        # Update case flags based on image analysis
+        if case_id:
+            db.update_case_flags(
+                case_id=case_id,
+                fast_track=severity == "minor",
+                sworn_declaration=severity == "severe",
+            )
+
+    return {
+        "reply": chat_message,
+        "image_analyses": [analysis.model_dump() for analysis in image_analyses],
+        "session_id": session_id,
+        "stored_images": stored_images,
+        "failed_images": [saved["original_filename"] for saved in failed],
+        "preprocessing": preprocessing,
+        "dedupe": dedupe,
+    }
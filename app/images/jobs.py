@@ -0,0 +1,134 @@
+import threading
+import traceback
+
+
+class ImageJobQueue:
+    """Background worker pool for image-analysis jobs.
+
+    Jobs live in the `image_analysis_jobs` table, so a job that was queued or
+    half-processed when the process stopped is picked up again on the next
+    start. `handler(job)` does the actual work and returns a JSON-serializable
+    result that is stored on the job for polling clients.
+
+    A claimed job is leased to its worker process for lease_seconds and the
+    lease is renewed while the job runs. A job whose worker died (killed on
+    timeout, recycled, stopped before it finished) is claimed again by any
+    worker once its lease has expired, up to max_attempts times.
+    """
+
+    def __init__(
+        self,
+        db,
+        handler,
+        workers: int = 2,
+        poll_interval: float = 2.0,
+        max_attempts: int = 3,
+        lease_seconds: float = 60.0,
+    ):
+        self.db = db
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._running = set()
+        self._running_lock = threading.Lock()
+
+    def start(self, requeue: bool = True):
+        """Requeue interrupted jobs and start the worker threads.
+
+        With several worker processes, requeue once before they start
+        (`requeue_interrupted`) and pass requeue=False here; jobs of workers
+        that die later are claimed again once their lease expires.
+        """
+        if self._threads:
+            return
+
+        if requeue:
+            self.requeue_interrupted()
+
+        # Threads a timed-out stop() left behind keep the set event they
+        # were started with, so they still exit after their current job
+        self._stopping = threading.Event()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, args=(self._stopping,), name=f"image-job-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        thread = threading.Thread(
+            target=self._renew_leases, args=(self._stopping,), name="image-job-leases", daemon=True
+        )
+        thread.start()
+        self._threads.append(thread)
+
+    def requeue_interrupted(self) -> int:
+        """Put jobs left 'running' by a stopped process back on the queue.
+
+        Jobs whose lease still holds are left alone: during a graceful reload
+        the old workers are still running them.
+        """
+        requeued = self.db.requeue_running_image_jobs(self.lease_seconds)
+        if requeued:
+            print(f"🔁 Requeued {requeued} interrupted image-analysis jobs")
+        return requeued
+
+    def stop(self, timeout: float = None):
+        """Ask the workers to exit once their current job is done"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, session_id: str, payload: dict) -> str:
+        """Persist a new job and wake a worker for it"""
+        job_id = self.db.create_image_job(session_id, payload)
+        self._wakeup.set()
+        return job_id
+
+    def _work(self, stopping: threading.Event):
+        while not stopping.is_set():
+            try:
+                job = self.db.claim_next_image_job(self.lease_seconds, self.max_attempts)
+            except Exception as e:
+                print(f"❌ Could not claim image-analysis job: {e}")
+                job = None
+
+            if not job:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._run(job)
+
+    def _renew_leases(self, stopping: threading.Event):
+        """Renew the leases of this process's running jobs well before they expire"""
+        while not stopping.wait(self.lease_seconds / 3):
+            with self._running_lock:
+                job_ids = list(self._running)
+            try:
+                self.db.renew_image_job_leases(job_ids)
+            except Exception as e:
+                print(f"❌ Could not renew image-analysis job leases: {e}")
+
+    def _run(self, job: dict):
+        job_id = job["job_id"]
+        with self._running_lock:
+            self._running.add(job_id)
+        try:
+            result = self.handler(job)
+            self.db.finish_image_job(job_id, "done", result=result)
+            print(f"✅ Image-analysis job {job_id[:8]}... done")
+        except Exception as e:
+            traceback.print_exc()
+            status = "failed" if job["attempts"] >= self.max_attempts else "queued"
+            self.db.finish_image_job(job_id, status, error=str(e))
+            print(f"❌ Image-analysis job {job_id[:8]}... {status}: {e}")
+        finally:
+            with self._running_lock:
+                self._running.discard(job_id)
@@ -0,0 +1,116 @@
+import os
+import tempfile
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it images are analyzed as uploaded
+    Image = None
+    ImageOps = None
+
+
+# Suffix of the derived copy that is sent to the vision model
+VISION_SUFFIX = ".vision"
+
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+# Appended to the copy's path for an empty marker: the copy was not smaller
+# and the original carries no metadata
+ORIGINAL_MARKER = ".original"
+
+# Image.info keys of metadata blocks (XMP, IPTC, comments) besides EXIF
+METADATA_KEYS = ("xmp", "XML:com.adobe.xmp", "photoshop", "comment")
+
+
+def preprocess_image(
+    path: str, max_dimension: int = 1568, image_format: str = "JPEG", quality: int = 85
+) -> dict:
+    """Create a downscaled, re-encoded, metadata-free copy of an image for vision analysis.
+
+    The original file is left untouched. The image is decoded once (JPEGs are
+    decoded directly at a reduced scale), rotated according to its EXIF
+    orientation and written next to the original without any EXIF/ICC data.
+    If Pillow is missing or the image cannot be decoded, the original path is
+    returned instead. So is it when the copy would not be smaller and the
+    original has no metadata to strip (GPS position, camera serial), which is
+    recorded with a marker file so the next upload of the same image skips
+    the work.
+    """
+    original_bytes = os.path.getsize(path)
+    result = {
+        "original_path": path,
+        "path": path,
+        "original_bytes": original_bytes,
+        "processed_bytes": original_bytes,
+    }
+
+    if Image is None:
+        return result
+
+    image_format = image_format.upper()
+    extension = FORMAT_EXTENSIONS.get(image_format, ".jpg")
+    output_path = f"{os.path.splitext(path)[0]}{VISION_SUFFIX}{extension}"
+
+    if os.path.exists(output_path):
+        # Content-addressed uploads: this exact image was already prepared
+        result["path"] = output_path
+        result["processed_bytes"] = os.path.getsize(output_path)
+        return result
+    if os.path.exists(output_path + ORIGINAL_MARKER):
+        return result
+
+    # Written aside and moved into place, so a crash never leaves a
+    # truncated copy that later uploads would pick up
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".part")
+    os.close(fd)
+    try:
+        with Image.open(path) as source:
+            has_metadata = bool(source.getexif()) or any(
+                key in source.info for key in METADATA_KEYS
+            )
+
+            # Let the JPEG decoder skip detail we are about to throw away
+            source.draft("RGB", (max_dimension, max_dimension))
+            image = ImageOps.exif_transpose(source)
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+
+            if image_format == "WEBP":
+                image.save(temp_path, format="WEBP", quality=quality, method=4)
+            else:
+                image.save(
+                    temp_path,
+                    format="JPEG",
+                    quality=quality,
+                    optimize=True,
+                    progressive=True,
+                )
+    except Exception as e:
+        os.remove(temp_path)
+        print(f"⚠️ Could not preprocess image {os.path.basename(path)}: {e}")
+        return result
+
+    processed_bytes = os.path.getsize(temp_path)
+    if processed_bytes >= original_bytes and not has_metadata:
+        # Already small and clean enough - analyze the upload itself
+        os.remove(temp_path)
+        open(output_path + ORIGINAL_MARKER, "w").close()
+        return result
+
+    os.replace(temp_path, output_path)
+    result["path"] = output_path
+    result["processed_bytes"] = processed_bytes
+    return result
+
+
+def summarize_preprocessing(results: list) -> dict:
+    """Aggregate byte counts of a batch of preprocessed images"""
+    original_bytes = sum(r["original_bytes"] for r in results)
+    processed_bytes = sum(r["processed_bytes"] for r in results)
+    return {
+        "images": len(results),
+        "original_bytes": original_bytes,
+        "processed_bytes": processed_bytes,
+        "bytes_saved": original_bytes - processed_bytes,
+    }
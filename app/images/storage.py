@@ -0,0 +1,85 @@
+import hashlib
+import os
+import tempfile
+
+
+CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of the image formats browsers upload, mapped to a file extension
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+    (b"BM", ".bmp"),
+]
+
+
+def sniff_extension(head: bytes, fallback: str = ".bin") -> str:
+    """Pick a file extension from the first bytes of an image"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return ".heic"
+    return fallback
+
+
+def save_upload(file, upload_folder: str) -> dict:
+    """Stream an upload to disk, hashing it on the way, and store it content-addressed.
+
+    The blob is named after the SHA-256 of its bytes (with an extension sniffed
+    from the content), so identical uploads share a single file on disk.
+    """
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=upload_folder, suffix=".part")
+    head = b""
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if not head:
+                    head = chunk[:16]
+                digest.update(chunk)
+                out.write(chunk)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+    fallback = os.path.splitext(file.filename or "")[1].lower() or ".bin"
+    content_hash = digest.hexdigest()
+    filename = f"{content_hash}{sniff_extension(head, fallback)}"
+    path = os.path.join(upload_folder, filename)
+
+    if os.path.exists(path):
+        os.remove(temp_path)
+        new_blob = False
+    else:
+        os.replace(temp_path, path)
+        new_blob = True
+
+    return {
+        "content_hash": content_hash,
+        "filename": filename,
+        "path": path,
+        "original_filename": file.filename,
+        "new_blob": new_blob,
+    }
+
+
+def summarize_dedupe(saved: list, cached_hashes: set) -> dict:
+    """Report how much of one upload batch was already known"""
+    uploaded = len(saved)
+    duplicate_blobs = sum(1 for s in saved if not s["new_blob"])
+    cached = sum(1 for s in saved if s["content_hash"] in cached_hashes)
+    return {
+        "uploaded": uploaded,
+        "duplicate_blobs": duplicate_blobs,
+        "cached_analyses": cached,
+        "dedupe_ratio": round(duplicate_blobs / uploaded, 4) if uploaded else 0.0,
+    }
@@ -0,0 +1,106 @@
+"""Cached, pre-parsed copies of the reference files in data/.
+
+Each source is parsed once into a JSON artifact in data/cache that records
+the mtime, size and SHA-256 of every file it was built from. mtime/size are
+checked first; a file is only re-hashed when they differ, and an artifact is
+only rebuilt when a hash actually changed (a touched file is not a change).
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+
+# name -> {"mode": "cold" | "warm", "ms": load time}, for the last load of each artifact
+LOAD_TIMES: Dict[str, Dict[str, Any]] = {}
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint_sources(paths: List[str], previous: Optional[Dict] = None) -> Dict[str, Dict]:
+    """mtime, size and SHA-256 per existing source, reusing unchanged hashes"""
+    previous = previous or {}
+    fingerprints = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        name = os.path.basename(path)
+        stat = os.stat(path)
+        known = previous.get(name) or {}
+        if known.get("mtime") == stat.st_mtime and known.get("size") == stat.st_size:
+            fingerprints[name] = known
+        else:
+            fingerprints[name] = {
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "sha256": file_sha256(path),
+            }
+    return fingerprints
+
+
+def same_content(stored: Optional[Dict], current: Dict) -> bool:
+    """Whether two fingerprint sets describe the same file contents"""
+    if not stored or set(stored) != set(current):
+        return False
+    return all(stored[name].get("sha256") == current[name]["sha256"] for name in current)
+
+
+def record_load(name: str, mode: str, started: float) -> None:
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    LOAD_TIMES[name] = {"mode": mode, "ms": elapsed_ms}
+    print(f"📦 Loaded {name} ({mode}, {elapsed_ms} ms)")
+
+
+def _write_json(path: str, artifact: Dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def load_cached(
+    name: str,
+    sources: List[str],
+    build: Callable[[], Any],
+    version: int = 1,
+    force: bool = False,
+) -> Any:
+    """Return build()'s result from data/cache/<name>.json, rebuilding if a source changed"""
+    started = time.perf_counter()
+    cache_path = os.path.join(CACHE_DIR, f"{name}.json")
+
+    artifact = None
+    if not force:
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                artifact = json.load(f)
+        except (OSError, ValueError):
+            artifact = None
+
+    stored = (artifact or {}).get("sources")
+    current = fingerprint_sources(sources, stored)
+
+    if artifact and artifact.get("version") == version and same_content(stored, current):
+        if stored != current:
+            # Touched but unchanged: remember the new mtimes to skip hashing next time
+            _write_json(cache_path, {**artifact, "sources": current})
+        record_load(name, "warm", started)
+        return artifact["data"]
+
+    data = build()
+    _write_json(cache_path, {"version": version, "sources": current, "data": data})
+    record_load(name, "cold", started)
+    return data
@@ -0,0 +1,170 @@
+"""Reference data from data/, parsed once and loaded from data/cache.
+
+Loading everything in the parent process before workers fork lets them share
+the parsed objects copy-on-write; otherwise each loader runs on first use.
+
+Report cold (parse from source) vs warm (load from cache) times with:
+
+    python -m reference.datasets
+"""
+
+import os
+import re
+import time
+from typing import Dict, List
+
+from reference.cache import DATA_DIR, LOAD_TIMES, load_cached
+from reference.docx import read_docx_paragraphs
+from reference.garages import build_garage_index, get_garage_index
+from reference.knowledge import build_knowledge_index, get_knowledge_index
+from reference.xlsx import read_xlsx_rows
+
+
+CALL_REASONS_XLSX = os.path.join(DATA_DIR, "CallReason.xlsx")
+DIALOG_DOCS = {
+    "AC": os.path.join(DATA_DIR, "Dialogs-AC.docx"),
+    "RA": os.path.join(DATA_DIR, "Dialogs-RA.docx"),
+}
+
+
+def parse_call_reasons(path: str = CALL_REASONS_XLSX) -> List[Dict[str, str]]:
+    """Labelled example cases from CallReason.xlsx, one dict per dialog row.
+
+    The first row holds field explanations, the second the column names.
+    """
+    rows = read_xlsx_rows(path)
+    header = [cell.strip() for cell in rows[1]]
+    return [
+        {name: (row[i].strip() if i < len(row) else "") for i, name in enumerate(header) if name}
+        for row in rows[2:]
+        if row and row[0].strip()
+    ]
+
+
+def parse_dialogs(paths: Dict[str, str] = DIALOG_DOCS) -> Dict[str, List[str]]:
+    """Paragraphs of the example dialog transcripts, per team"""
+    return {team: read_docx_paragraphs(path) for team, path in paths.items()}
+
+
+def load_call_reasons(force: bool = False) -> List[Dict[str, str]]:
+    return load_cached("call_reasons", [CALL_REASONS_XLSX], parse_call_reasons, force=force)
+
+
+def load_dialogs(force: bool = False) -> Dict[str, List[str]]:
+    return load_cached("dialogs", list(DIALOG_DOCS.values()), parse_dialogs, force=force)
+
+
+_call_reasons = None
+_dialogs = None
+
+
+def get_call_reasons() -> List[Dict[str, str]]:
+    """Process-wide CallReason.xlsx rows, loaded on first use"""
+    global _call_reasons
+    if _call_reasons is None:
+        _call_reasons = load_call_reasons()
+    return _call_reasons
+
+
+def get_dialogs() -> Dict[str, List[str]]:
+    """Process-wide dialog transcripts, loaded on first use"""
+    global _dialogs
+    if _dialogs is None:
+        _dialogs = load_dialogs()
+    return _dialogs
+
+
+# A dialog starts at "Case1:" (AC) or "RA 1. ..." (RA); a numbered section
+# such as "4. Υπεύθυνη Δήλωση" ends the dialogs
+DIALOG_START = re.compile(r"^(?:Dialog\s+)?(?:Case\s*(\d+):|RA\s*(\d+)\.)")
+SECTION_START = re.compile(r"^\d+\.\s")
+# "Α:"/"A:" is the agent, "Π:" the customer
+DIALOG_TURN = re.compile(r"^\s*([ΑAΠ])\s*:\s*(.+)$")
+
+
+def split_dialog_turns(text: str) -> List[Dict[str, str]]:
+    """Speaker-prefixed lines of a transcript as agent/customer turns"""
+    turns = []
+    for line in text.splitlines():
+        match = DIALOG_TURN.match(line)
+        if match:
+            speaker = "customer" if match.group(1) == "Π" else "agent"
+            turns.append({"speaker": speaker, "text": match.group(2).strip()})
+    return turns
+
+
+def extract_dialog_cases(dialogs: Dict[str, List[str]]) -> List[Dict]:
+    """Labelled transcripts from the dialog documents, one per example dialog"""
+    cases = []
+    for team, paragraphs in dialogs.items():
+        current = None
+        for paragraph in paragraphs:
+            text = paragraph.strip()
+            start = DIALOG_START.match(text)
+            if start:
+                current = {
+                    "id": f"{team} dialog {start.group(1) or start.group(2)}",
+                    "label": team,
+                    "source": "dialogs",
+                    "turns": [],
+                }
+                cases.append(current)
+            elif SECTION_START.match(text):
+                current = None
+            if current is not None:
+                current["turns"].extend(split_dialog_turns(text))
+    return [case for case in cases if case["turns"]]
+
+
+def extract_call_reason_cases(rows: List[Dict[str, str]]) -> List[Dict]:
+    """Labelled case descriptions from CallReason.xlsx ("AC 1", "RA 3", ...)"""
+    cases = []
+    for row in rows:
+        case_id = row.get("Dialog-T1", "")
+        description = row.get("Description of the Case", "")
+        label = case_id.split()[0] if case_id else ""
+        if label in DIALOG_DOCS and description:
+            cases.append(
+                {
+                    "id": f"{case_id} description",
+                    "label": label,
+                    "source": "call_reasons",
+                    "turns": [{"speaker": "customer", "text": " ".join(description.split())}],
+                }
+            )
+    return cases
+
+
+def get_labelled_cases() -> List[Dict]:
+    """Every labelled example in data/, for evaluating case classification"""
+    return extract_dialog_cases(get_dialogs()) + extract_call_reason_cases(get_call_reasons())
+
+
+# name -> (process-wide getter, loader that can force a rebuild)
+REFERENCE_LOADERS = {
+    "garages": (get_garage_index, lambda force: build_garage_index(force=force)),
+    "knowledge": (get_knowledge_index, lambda force: build_knowledge_index(force=force)),
+    "call_reasons": (get_call_reasons, load_call_reasons),
+    "dialogs": (get_dialogs, load_dialogs),
+}
+
+
+def preload_reference_data() -> Dict[str, Dict]:
+    """Load every reference dataset now, e.g. in the parent before forking"""
+    for name, (getter, _loader) in REFERENCE_LOADERS.items():
+        try:
+            getter()
+        except Exception as e:
+            print(f"⚠️ Could not load reference data '{name}': {e}")
+    return dict(LOAD_TIMES)
+
+
+if __name__ == "__main__":
+    print(f"{'dataset':<14}{'cold ms':>10}{'warm ms':>10}")
+    for name, (_getter, loader) in REFERENCE_LOADERS.items():
+        timings = []
+        for force in (True, False):
+            started = time.perf_counter()
+            loader(force)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{name:<14}{timings[0]:>10.2f}{timings[1]:>10.2f}")
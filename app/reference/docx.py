@@ -0,0 +1,33 @@
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import List
+
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def read_docx_paragraphs(path: str) -> List[str]:
+    """Read the non-empty paragraphs of a .docx file as plain text.
+
+    Only the main document body is read (no headers, footers or comments),
+    which is all the dialog transcripts in `data/` need, and avoids a
+    dependency on python-docx.
+    """
+    with zipfile.ZipFile(path) as archive:
+        document = ET.fromstring(archive.read("word/document.xml"))
+
+    paragraphs = []
+    for paragraph in document.iter(f"{{{W_NS}}}p"):
+        parts = []
+        for node in paragraph.iter():
+            if node.tag == f"{{{W_NS}}}t":
+                parts.append(node.text or "")
+            elif node.tag == f"{{{W_NS}}}tab":
+                parts.append("\t")
+            elif node.tag in (f"{{{W_NS}}}br", f"{{{W_NS}}}cr"):
+                parts.append("\n")
+        text = "".join(parts).strip()
+        if text:
+            paragraphs.append(text)
+
+    return paragraphs
@@ -0,0 +1,223 @@
+import math
+import os
+import re
+from typing import Dict, List, Optional
+
+from reference.cache import DATA_DIR, load_cached
+from reference.gazetteer import normalize_text, postal_code_prefecture
+from reference.prefectures import find_place, resolve_prefecture
+from reference.xlsx import read_xlsx_rows
+
+
+GARAGES_XLSX = os.path.join(DATA_DIR, "Garages.xlsx")
+
+# Bump when the artifact layout changes so stale caches are rebuilt
+INDEX_VERSION = 2
+
+# Spreadsheet "Type" column -> garage kind
+GARAGE_TYPES = {
+    "ΒΟΥΛΚΑΝΙΖΑΤΕΡ": "tyre",
+    "ΓΕΝΙΚΟ ΣΥΝΕΡΓΕΙΟ": "general",
+    "ΚΡΥΣΤΑΛΛΑΔΙΚΟ": "glass",
+}
+
+# Words in a case description that call for a specialist garage
+GARAGE_KEYWORDS = {
+    "glass": ("παρμπριζ", "τζαμι", "κρυσταλλ", "θραυση"),
+    "tyre": ("λαστιχ", "ελαστικ", "σκασμεν", "ρεζερβα", "κλαταρ"),
+}
+
+# Grid cell size in degrees (~10 km)
+GRID_CELL = 0.1
+
+# Garages further than this from the case are not worth recommending
+MAX_RECOMMEND_KM = 50.0
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _cell(lat: float, lon: float):
+    return (math.floor(lat / GRID_CELL), math.floor(lon / GRID_CELL))
+
+
+def parse_garages(path: str = GARAGES_XLSX) -> List[Dict]:
+    """Read Garages.xlsx and geocode each address through the gazetteer"""
+    rows = read_xlsx_rows(path)
+    header = [normalize_text(cell) for cell in rows[0]]
+    columns = {name: header.index(name) for name in ("type", "name", "location")}
+
+    garages = []
+    for row in rows[1:]:
+        row = row + [""] * (len(header) - len(row))
+        address = row[columns["location"]].strip()
+        if not row[columns["name"]].strip():
+            continue
+
+        place = find_place(address)
+        postal_code = re.search(r"\b(\d{3})\s?(\d{2})\b", address)
+        garages.append(
+            {
+                "kind": GARAGE_TYPES.get(row[columns["type"]].strip(), "general"),
+                "type": row[columns["type"]].strip(),
+                "name": row[columns["name"]].strip(),
+                "address": address,
+                "city": place["name"] if place else None,
+                "postal_code": "".join(postal_code.groups()) if postal_code else None,
+                "prefecture": (place["prefecture"] if place else None)
+                or postal_code_prefecture(address),
+                "lat": place["lat"] if place else None,
+                "lon": place["lon"] if place else None,
+            }
+        )
+
+    return garages
+
+
+class GarageIndex:
+    """In-memory garage index by prefecture, city and a lat/lon grid"""
+
+    def __init__(self, garages: List[Dict]):
+        self.garages = garages
+        self.by_prefecture: Dict[str, List[int]] = {}
+        self.by_city: Dict[str, List[int]] = {}
+        self.grid: Dict[tuple, List[int]] = {}
+
+        for i, garage in enumerate(garages):
+            if garage["prefecture"]:
+                self.by_prefecture.setdefault(garage["prefecture"], []).append(i)
+            if garage["city"]:
+                self.by_city.setdefault(garage["city"], []).append(i)
+            if garage["lat"] is not None:
+                self.grid.setdefault(_cell(garage["lat"], garage["lon"]), []).append(i)
+
+        rows = [cell[0] for cell in self.grid] or [0]
+        cols = [cell[1] for cell in self.grid] or [0]
+        self._bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    def in_prefecture(self, prefecture: str) -> List[Dict]:
+        return [self.garages[i] for i in self.by_prefecture.get(prefecture, [])]
+
+    def in_city(self, city: str) -> List[Dict]:
+        return [self.garages[i] for i in self.by_city.get(city, [])]
+
+    def nearest(self, lat: float, lon: float, kind: str = None) -> Optional[Dict]:
+        """Closest geocoded garage (optionally of one kind) to a point.
+
+        Grid rings are searched outwards from the point's cell; the search stops
+        once the best distance found is closer than anything a further ring
+        could hold.
+        """
+        origin = _cell(lat, lon)
+        best, best_km = None, math.inf
+
+        # Far enough to cover every occupied cell from the origin
+        min_row, max_row, min_col, max_col = self._bounds
+        max_ring = max(
+            abs(origin[0] - min_row),
+            abs(origin[0] - max_row),
+            abs(origin[1] - min_col),
+            abs(origin[1] - max_col),
+        )
+
+        for ring in range(max_ring + 1):
+            for d_row in range(-ring, ring + 1):
+                for d_col in range(-ring, ring + 1):
+                    if max(abs(d_row), abs(d_col)) != ring:
+                        continue
+                    for i in self.grid.get((origin[0] + d_row, origin[1] + d_col), ()):
+                        garage = self.garages[i]
+                        if kind and garage["kind"] != kind:
+                            continue
+                        km = haversine_km(lat, lon, garage["lat"], garage["lon"])
+                        if km < best_km:
+                            best, best_km = garage, km
+
+            # Anything in ring+1 is at least `ring` whole cells away
+            if best is not None and best_km <= ring * GRID_CELL * 111.0 * math.cos(
+                math.radians(abs(lat))
+            ):
+                break
+
+        if best is None:
+            return None
+        return {**best, "distance_km": round(best_km, 2)}
+
+    def nearest_to_text(self, text: str, kind: str = None) -> Optional[Dict]:
+        """Closest garage to a free-text location, falling back to its prefecture"""
+        place = find_place(text)
+        if place:
+            garage = self.nearest(place["lat"], place["lon"], kind)
+            if garage:
+                return garage
+
+        # Also places a bare prefecture name, a postal code or a misspelling
+        prefecture = (place or {}).get("prefecture") or resolve_prefecture(text)
+        candidates = [
+            g for g in self.in_prefecture(prefecture) if not kind or g["kind"] == kind
+        ]
+        return candidates[0] if candidates else None
+
+
+def build_garage_index(source: str = GARAGES_XLSX, force: bool = False) -> GarageIndex:
+    """Garage index from its cached artifact, re-geocoding only if the sheet changed"""
+    garages = load_cached(
+        "garages", [source], lambda: parse_garages(source), version=INDEX_VERSION, force=force
+    )
+    return GarageIndex(garages)
+
+
+_garage_index = None
+
+
+def get_garage_index() -> GarageIndex:
+    """Process-wide garage index, loaded on first use"""
+    global _garage_index
+    if _garage_index is None:
+        _garage_index = build_garage_index()
+    return _garage_index
+
+
+def garage_kind_for(description: str) -> str:
+    """Which kind of garage a case description calls for"""
+    text = normalize_text(description or "")
+    for kind, keywords in GARAGE_KEYWORDS.items():
+        if any(keyword in text for keyword in keywords):
+            return kind
+    return "general"
+
+
+def recommend_repair_shop(*locations: str, description: str = None) -> Optional[str]:
+    """Recommend the nearest suitable garage for the first location that resolves.
+
+    Locations are tried in order (e.g. final destination first, then the
+    incident location). Returns a display string for `case_analysis`, or None
+    when no location can be placed.
+    """
+    try:
+        index = get_garage_index()
+    except Exception as e:
+        print(f"⚠️ Garage index unavailable: {e}")
+        return None
+
+    kind = garage_kind_for(description)
+    for location in locations:
+        if not location:
+            continue
+        # A specialist too far away must not hide a general garage close by
+        for wanted in (kind, None):
+            garage = index.nearest_to_text(location, wanted)
+            distance = (garage or {}).get("distance_km")
+            if garage and (distance is None or distance <= MAX_RECOMMEND_KM):
+                suffix = f" (~{distance} km)" if distance is not None else ""
+                return f"{garage['name']} - {garage['type']}, {garage['address']}{suffix}"
+
+    return None
@@ -0,0 +1,193 @@
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+
+# (name, prefecture, latitude, longitude, aliases)
+# Municipality / town centroids, precise enough for "nearest garage" decisions.
+PLACES: List[Tuple[str, str, float, float, Tuple[str, ...]]] = [
+    # Αττική
+    ("Αθήνα", "Αττική", 37.984, 23.728, ("Αθήναι", "Athens", "Κέντρο Αθήνας")),
+    ("Παγκράτι", "Αττική", 37.968, 23.745, ()),
+    ("Κυψέλη", "Αττική", 37.999, 23.739, ()),
+    ("Κολωνάκι", "Αττική", 37.978, 23.742, ()),
+    ("Εξάρχεια", "Αττική", 37.986, 23.734, ()),
+    ("Πατήσια", "Αττική", 38.015, 23.732, ()),
+    ("Αμπελόκηποι", "Αττική", 37.987, 23.757, ()),
+    ("Κουκάκι", "Αττική", 37.964, 23.725, ()),
+    ("Σύνταγμα", "Αττική", 37.975, 23.735, ()),
+    ("Ομόνοια", "Αττική", 37.984, 23.728, ()),
+    ("Πειραιάς", "Αττική", 37.942, 23.647, ("Πειραιεύς", "Piraeus")),
+    ("Μαρούσι", "Αττική", 38.050, 23.806, ("Αμαρούσιο", "Marousi")),
+    ("Χαλάνδρι", "Αττική", 38.021, 23.798, ()),
+    ("Νέα Ιωνία", "Αττική", 38.036, 23.757, ()),
+    ("Καισαριανή", "Αττική", 37.967, 23.766, ()),
+    ("Μεταμόρφωση", "Αττική", 38.061, 23.760, ()),
+    ("Ελληνικό", "Αττική", 37.893, 23.745, ()),
+    ("Καλλιθέα", "Αττική", 37.955, 23.701, ()),
+    ("Πεύκη", "Αττική", 38.061, 23.790, ()),
+    ("Βύρωνας", "Αττική", 37.961, 23.753, ()),
+    ("Κηφισιά", "Αττική", 38.074, 23.811, ()),
+    ("Γλυφάδα", "Αττική", 37.865, 23.754, ()),
+    ("Περιστέρι", "Αττική", 38.015, 23.691, ()),
+    ("Αιγάλεω", "Αττική", 37.992, 23.678, ()),
+    ("Ζωγράφου", "Αττική", 37.977, 23.770, ()),
+    ("Νέα Σμύρνη", "Αττική", 37.945, 23.714, ()),
+    ("Παλαιό Φάληρο", "Αττική", 37.928, 23.701, ()),
+    ("Άλιμος", "Αττική", 37.911, 23.721, ()),
+    ("Αγία Παρασκευή", "Αττική", 38.005, 23.820, ()),
+    ("Χολαργός", "Αττική", 38.003, 23.801, ()),
+    ("Παπάγου", "Αττική", 37.989, 23.794, ()),
+    ("Ηλιούπολη", "Αττική", 37.932, 23.757, ()),
+    ("Βούλα", "Αττική", 37.845, 23.772, ()),
+    ("Βάρη", "Αττική", 37.830, 23.800, ()),
+    ("Βουλιαγμένη", "Αττική", 37.812, 23.780, ()),
+    ("Αχαρνές", "Αττική", 38.083, 23.733, ("Μενίδι",)),
+    ("Νίκαια", "Αττική", 37.967, 23.647, ()),
+    ("Κερατσίνι", "Αττική", 37.962, 23.620, ()),
+    ("Κορυδαλλός", "Αττική", 37.985, 23.650, ()),
+    ("Γαλάτσι", "Αττική", 38.018, 23.752, ()),
+    ("Ψυχικό", "Αττική", 38.012, 23.772, ()),
+    ("Ίλιον", "Αττική", 38.034, 23.701, ()),
+    ("Πετρούπολη", "Αττική", 38.041, 23.684, ()),
+    ("Μελίσσια", "Αττική", 38.050, 23.833, ()),
+    ("Βριλήσσια", "Αττική", 38.034, 23.830, ()),
+    ("Παλλήνη", "Αττική", 38.003, 23.880, ()),
+    ("Γέρακας", "Αττική", 38.017, 23.857, ()),
+    ("Κορωπί", "Αττική", 37.899, 23.872, ()),
+    ("Μαρκόπουλο", "Αττική", 37.887, 23.927, ()),
+    ("Ραφήνα", "Αττική", 38.022, 24.007, ()),
+    ("Μαραθώνας", "Αττική", 38.153, 23.963, ()),
+    ("Λαύριο", "Αττική", 37.714, 24.056, ()),
+    ("Ελευσίνα", "Αττική", 38.043, 23.543, ()),
+    ("Μέγαρα", "Αττική", 37.996, 23.344, ()),
+    ("Σαλαμίνα", "Αττική", 37.964, 23.497, ()),
+    # Θεσσαλονίκη
+    ("Θεσσαλονίκη", "Θεσσαλονίκη", 40.640, 22.944, ("Thessaloniki", "Σαλονίκη")),
+    ("Καλαμαριά", "Θεσσαλονίκη", 40.582, 22.950, ()),
+    ("Εύοσμος", "Θεσσαλονίκη", 40.667, 22.908, ()),
+    ("Θέρμη", "Θεσσαλονίκη", 40.547, 23.020, ()),
+    # Πελοπόννησος / Δυτική Ελλάδα
+    ("Πάτρα", "Αχαΐα", 38.246, 21.735, ("Patra",)),
+    ("Αίγιο", "Αχαΐα", 38.250, 22.081, ()),
+    ("Κόρινθος", "Κορινθία", 37.939, 22.932, ()),
+    ("Λουτράκι", "Κορινθία", 37.975, 22.977, ()),
+    ("Ναύπλιο", "Αργολίδα", 37.568, 22.806, ()),
+    ("Άργος", "Αργολίδα", 37.633, 22.729, ()),
+    ("Τρίπολη", "Αρκαδία", 37.510, 22.373, ()),
+    ("Σπάρτη", "Λακωνία", 37.074, 22.430, ()),
+    ("Καλαμάτα", "Μεσσηνία", 37.039, 22.114, ()),
+    ("Πύργος", "Ηλεία", 37.675, 21.441, ()),
+    ("Αγρίνιο", "Αιτωλοακαρνανία", 38.621, 21.408, ()),
+    ("Μεσολόγγι", "Αιτωλοακαρνανία", 38.371, 21.431, ()),
+    # Στερεά Ελλάδα
+    ("Λαμία", "Φθιώτιδα", 38.899, 22.434, ()),
+    ("Λιβαδειά", "Βοιωτία", 38.436, 22.876, ()),
+    ("Θήβα", "Βοιωτία", 38.321, 23.318, ()),
+    ("Χαλκίδα", "Εύβοια", 38.463, 23.594, ()),
+    ("Άμφισσα", "Φωκίδα", 38.528, 22.377, ()),
+    ("Καρπενήσι", "Ευρυτανία", 38.912, 21.793, ()),
+    # Θεσσαλία
+    ("Λάρισα", "Λάρισα", 39.639, 22.419, ()),
+    ("Βόλος", "Μαγνησία", 39.362, 22.942, ()),
+    ("Τρίκαλα", "Τρίκαλα", 39.555, 21.768, ()),
+    ("Καρδίτσα", "Καρδίτσα", 39.365, 21.922, ()),
+    # Ήπειρος / Ιόνιο
+    ("Ιωάννινα", "Ιωάννινα", 39.665, 20.853, ("Γιάννενα",)),
+    ("Άρτα", "Άρτα", 39.160, 20.985, ()),
+    ("Πρέβεζα", "Πρέβεζα", 38.959, 20.752, ()),
+    ("Ηγουμενίτσα", "Θεσπρωτία", 39.506, 20.265, ()),
+    ("Κέρκυρα", "Κέρκυρα", 39.624, 19.922, ("Corfu",)),
+    ("Λευκάδα", "Λευκάδα", 38.831, 20.703, ()),
+    ("Αργοστόλι", "Κεφαλληνία", 38.176, 20.489, ()),
+    ("Ζάκυνθος", "Ζάκυνθος", 37.787, 20.899, ()),
+    # Μακεδονία / Θράκη
+    ("Κοζάνη", "Κοζάνη", 40.301, 21.789, ()),
+    ("Φλώρινα", "Φλώρινα", 40.782, 21.409, ()),
+    ("Καστοριά", "Καστοριά", 40.521, 21.263, ()),
+    ("Γρεβενά", "Γρεβενά", 40.084, 21.427, ()),
+    ("Βέροια", "Ημαθία", 40.524, 22.202, ()),
+    ("Έδεσσα", "Πέλλα", 40.802, 22.047, ()),
+    ("Κατερίνη", "Πιερία", 40.271, 22.502, ()),
+    ("Κιλκίς", "Κιλκίς", 40.993, 22.875, ()),
+    ("Πολύγυρος", "Χαλκιδική", 40.378, 23.443, ()),
+    ("Σέρρες", "Σέρρες", 41.086, 23.548, ()),
+    ("Δράμα", "Δράμα", 41.151, 24.147, ()),
+    ("Καβάλα", "Καβάλα", 40.937, 24.412, ()),
+    ("Ξάνθη", "Ξάνθη", 41.135, 24.888, ()),
+    ("Κομοτηνή", "Ροδόπη", 41.119, 25.405, ()),
+    ("Αλεξανδρούπολη", "Έβρος", 40.847, 25.874, ()),
+    # Κρήτη
+    ("Ηράκλειο", "Ηράκλειο", 35.339, 25.144, ()),
+    ("Χανιά", "Χανιά", 35.514, 24.018, ()),
+    ("Ρέθυμνο", "Ρέθυμνο", 35.366, 24.482, ()),
+    ("Άγιος Νικόλαος", "Λασίθι", 35.190, 25.716, ()),
+    # Νησιά Αιγαίου
+    ("Μυτιλήνη", "Λέσβος", 39.107, 26.555, ()),
+    ("Χίος", "Χίος", 38.368, 26.136, ()),
+    ("Σάμος", "Σάμος", 37.757, 26.977, ()),
+    ("Ρόδος", "Δωδεκάνησα", 36.434, 28.217, ("Rhodes",)),
+    ("Κως", "Δωδεκάνησα", 36.893, 27.289, ()),
+    ("Ερμούπολη", "Κυκλάδες", 37.443, 24.943, ("Σύρος",)),
+    ("Νάξος", "Κυκλάδες", 37.105, 25.376, ()),
+    ("Μύκονος", "Κυκλάδες", 37.446, 25.329, ()),
+    ("Σαντορίνη", "Κυκλάδες", 36.417, 25.432, ("Θήρα",)),
+]
+
+# First two digits of a Greek postal code -> prefecture
+POSTAL_PREFECTURES: Dict[str, str] = {
+    **{str(prefix): "Αττική" for prefix in range(10, 20)},
+    "20": "Κορινθία", "21": "Αργολίδα", "22": "Αρκαδία", "23": "Λακωνία",
+    "24": "Μεσσηνία", "25": "Αχαΐα", "26": "Αχαΐα", "27": "Ηλεία",
+    "28": "Κεφαλληνία", "29": "Ζάκυνθος", "30": "Αιτωλοακαρνανία",
+    "31": "Λευκάδα", "32": "Βοιωτία", "33": "Φωκίδα", "34": "Εύβοια",
+    "35": "Φθιώτιδα", "36": "Ευρυτανία", "37": "Μαγνησία", "38": "Μαγνησία",
+    "40": "Λάρισα", "41": "Λάρισα", "42": "Τρίκαλα", "43": "Καρδίτσα",
+    "44": "Ιωάννινα", "45": "Ιωάννινα", "46": "Θεσπρωτία", "47": "Άρτα",
+    "48": "Πρέβεζα", "49": "Κέρκυρα", "50": "Κοζάνη", "51": "Γρεβενά",
+    "52": "Καστοριά", "53": "Φλώρινα", "54": "Θεσσαλονίκη", "55": "Θεσσαλονίκη",
+    "56": "Θεσσαλονίκη", "57": "Θεσσαλονίκη", "58": "Πέλλα", "59": "Ημαθία",
+    "60": "Πιερία", "61": "Κιλκίς", "62": "Σέρρες", "63": "Χαλκιδική",
+    "64": "Καβάλα", "65": "Καβάλα", "66": "Δράμα", "67": "Ξάνθη", "68": "Έβρος",
+    "69": "Ροδόπη", "70": "Ηράκλειο", "71": "Ηράκλειο", "72": "Λασίθι",
+    "73": "Χανιά", "74": "Ρέθυμνο", "81": "Λέσβος", "82": "Χίος", "83": "Σάμος",
+    "84": "Κυκλάδες", "85": "Δωδεκάνησα",
+}
+
+# Inflection endings stripped before matching ("Πάτρας" and "Πάτρα" both -> "πατρ")
+# (normalize_text has already turned final ς into σ)
+_ENDINGS = ("ιου", "ιων", "ουσ", "εωσ", "ησ", "ασ", "οσ", "ου", "ων", "εσ", "α", "η", "ι", "ο", "ε", "υ")
+
+_POSTAL_CODE = re.compile(r"\b(\d{3})\s?(\d{2})\b")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents/diaeresis and punctuation, collapse whitespace"""
+    decomposed = unicodedata.normalize("NFD", text or "")
+    stripped = "".join(c for c in decomposed if unicodedata.category(c) != "Mn")
+    lowered = stripped.lower().replace("ς", "σ")
+    return " ".join(re.sub(r"[^\w]+", " ", lowered).split())
+
+
+def stem(word: str) -> str:
+    """Drop common Greek inflection endings from a normalized word.
+
+    Repeated until nothing more comes off, so that e.g. "ηρακλειο" and
+    "ηρακλειου" meet at "ηρακλ".
+    """
+    while True:
+        for ending in _ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= 2:
+                word = word[: -len(ending)]
+                break
+        else:
+            break
+    return word
+
+
+def postal_code_prefecture(text: str) -> Optional[str]:
+    """Prefecture of the first Greek postal code found in the text"""
+    match = _POSTAL_CODE.search(text or "")
+    if not match:
+        return None
+    return POSTAL_PREFECTURES.get(match.group(1)[:2])
@@ -0,0 +1,329 @@
+"""BM25 retrieval over the policy documents in data/.
+
+The instructions, the project notes and the traffic code (KOK) are chunked
+offline into a single binary artifact in data/cache that is memory-mapped at
+runtime, so only the few chunks relevant to a turn end up in the prompt.
+
+Build (or rebuild) the index from the app directory with:
+
+    python -m reference.knowledge
+    python -m reference.knowledge "σκασμένο λάστιχο ρεζέρβα"
+"""
+
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from reference.cache import CACHE_DIR, DATA_DIR, fingerprint_sources, record_load, same_content
+from reference.gazetteer import normalize_text, stem
+from tracing import traced
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # the traffic code is skipped without pypdf
+    PdfReader = None
+
+
+KNOWLEDGE_SOURCES = [
+    os.path.join(DATA_DIR, "Instructions_ RA.txt"),
+    os.path.join(DATA_DIR, "important_info.txt"),
+    os.path.join(DATA_DIR, "KOK_pdf.pdf"),
+]
+KNOWLEDGE_CACHE = os.path.join(CACHE_DIR, "knowledge.idx")
+
+# Bump when the artifact layout or tokenization changes
+INDEX_VERSION = 1
+MAGIC = b"HDKIDX01"
+
+# Chunk size in words, and how many words consecutive windows share
+CHUNK_WORDS = 120
+CHUNK_OVERLAP = 20
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Chunks scoring below this are not worth putting in front of the model
+MIN_SCORE = 2.0
+
+STOPWORDS = frozenset(
+    normalize_text(word)
+    for word in (
+        "και", "να", "το", "τα", "τη", "την", "της", "τον", "του", "των", "τους",
+        "ο", "η", "οι", "ένα", "μια", "μία", "ένας", "σε", "στο", "στη", "στην",
+        "στα", "στον", "στις", "στους", "με", "για", "από", "ως", "που", "πως",
+        "ότι", "θα", "δεν", "μη", "μην", "είναι", "ή", "αν", "αλλά", "όταν",
+        "κατά", "μετά", "προς", "έχει", "έχουν", "αυτό", "αυτή", "αυτά", "οποίο",
+        "οποία", "εάν", "επί", "δε", "τις", "ότι", "πιο", "ήδη", "κάθε",
+    )
+)
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalized, stemmed terms of a text, without stopwords"""
+    return [
+        stem(word)
+        for word in normalize_text(text).split()
+        if len(word) > 1 and word not in STOPWORDS
+    ]
+
+
+def extract_pages(path: str) -> List[str]:
+    """Text of a source document, one entry per page (a text file is one page)"""
+    if path.lower().endswith(".pdf"):
+        if PdfReader is None:
+            print(f"⚠️ pypdf is not installed, skipping {os.path.basename(path)}")
+            return []
+        return [page.extract_text() or "" for page in PdfReader(path).pages]
+
+    with open(path, encoding="utf-8") as f:
+        return [f.read()]
+
+
+def chunk_text(text: str) -> List[str]:
+    """Split text into ~CHUNK_WORDS word chunks along paragraph boundaries"""
+    chunks = []
+    current = []
+
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        words = paragraph.split()
+        if not words:
+            continue
+
+        if current and len(current) + len(words) > CHUNK_WORDS:
+            chunks.append(" ".join(current))
+            current = []
+
+        # Long paragraphs become overlapping windows of their own
+        while len(words) > CHUNK_WORDS:
+            chunks.append(" ".join(words[:CHUNK_WORDS]))
+            words = words[CHUNK_WORDS - CHUNK_OVERLAP :]
+        current.extend(words)
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def collect_chunks(sources: List[str] = KNOWLEDGE_SOURCES) -> List[Dict]:
+    """Chunk every available source document"""
+    chunks = []
+    for path in sources:
+        if not os.path.exists(path):
+            continue
+        source = os.path.basename(path)
+        for page_number, page in enumerate(extract_pages(path), start=1):
+            for text in chunk_text(page):
+                chunks.append({"source": source, "page": page_number, "text": text})
+    return chunks
+
+
+def _build_settings() -> Dict:
+    """Anything besides the sources that changes what gets built"""
+    return {"pdf_reader": PdfReader is not None, "byteorder": sys.byteorder}
+
+
+def write_index(chunks: List[Dict], path: str, source_key: Dict) -> None:
+    """Write chunks and their BM25 postings to a memory-mappable file.
+
+    Layout: MAGIC, header length (u64), JSON header, then - from a 4-byte
+    aligned data offset - the posting doc ids (u32), the posting weights
+    (f32, full BM25 term score per chunk) and the UTF-8 chunk texts.
+    """
+    doc_terms = []
+    for chunk in chunks:
+        counts = {}
+        for term in tokenize(chunk["text"]):
+            counts[term] = counts.get(term, 0) + 1
+        doc_terms.append(counts)
+
+    doc_count = len(chunks)
+    lengths = [sum(counts.values()) for counts in doc_terms]
+    avgdl = (sum(lengths) / doc_count) if doc_count else 0.0
+
+    postings = {}
+    for doc_id, counts in enumerate(doc_terms):
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((doc_id, tf))
+
+    doc_ids = array("I")
+    weights = array("f")
+    terms = {}
+    for term in sorted(postings):
+        entries = postings[term]
+        idf = math.log(1 + (doc_count - len(entries) + 0.5) / (len(entries) + 0.5))
+        terms[term] = [len(doc_ids), len(entries)]
+        for doc_id, tf in entries:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / avgdl)
+            doc_ids.append(doc_id)
+            weights.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+
+    texts = bytearray()
+    chunk_meta = []
+    for chunk in chunks:
+        encoded = chunk["text"].encode("utf-8")
+        chunk_meta.append([chunk["source"], chunk["page"], len(texts), len(encoded)])
+        texts.extend(encoded)
+
+    header = json.dumps(
+        {
+            "version": INDEX_VERSION,
+            "source": source_key,
+            "terms": terms,
+            "chunks": chunk_meta,
+            "postings": len(doc_ids),
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(b"\0" * (-f.tell() % 4))
+        doc_ids.tofile(f)
+        weights.tofile(f)
+        f.write(texts)
+    os.replace(temp_path, path)
+
+
+class KnowledgeIndex:
+    """Memory-mapped BM25 index; postings and texts stay on disk until read"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a knowledge index")
+        offset = len(MAGIC)
+        (header_length,) = struct.unpack_from("<Q", self._mmap, offset)
+        offset += 8
+        header = json.loads(self._mmap[offset : offset + header_length].decode("utf-8"))
+        offset += header_length
+        offset += -offset % 4
+
+        self.version = header["version"]
+        self.source = header["source"]
+        self.terms = header["terms"]
+        self.chunks = header["chunks"]
+
+        count = header["postings"]
+        view = memoryview(self._mmap)
+        self._doc_ids = view[offset : offset + 4 * count].cast("I")
+        offset += 4 * count
+        self._weights = view[offset : offset + 4 * count].cast("f")
+        self._texts_offset = offset + 4 * count
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def chunk(self, doc_id: int) -> Dict:
+        source, page, start, length = self.chunks[doc_id]
+        start += self._texts_offset
+        text = self._mmap[start : start + length].decode("utf-8")
+        return {"source": source, "page": page, "text": text}
+
+    def search(self, query: str, k: int = 3, min_score: float = MIN_SCORE) -> List[Dict]:
+        """Top-k chunks for a query, best first"""
+        scores = {}
+        for term in set(tokenize(query)):
+            entry = self.terms.get(term)
+            if not entry:
+                continue
+            start, count = entry
+            for doc_id, weight in zip(
+                self._doc_ids[start : start + count], self._weights[start : start + count]
+            ):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [
+            {**self.chunk(doc_id), "score": round(score, 3)}
+            for doc_id, score in best
+            if score >= min_score
+        ]
+
+
+def build_knowledge_index(
+    sources: List[str] = KNOWLEDGE_SOURCES, cache_path: str = KNOWLEDGE_CACHE, force: bool = False
+) -> KnowledgeIndex:
+    """Open the knowledge index, rebuilding it if any source document changed"""
+    started = time.perf_counter()
+    settings = _build_settings()
+
+    if not force:
+        try:
+            index = KnowledgeIndex(cache_path)
+            stored = index.source.get("files")
+            if (
+                index.version == INDEX_VERSION
+                and index.source.get("settings") == settings
+                and same_content(stored, fingerprint_sources(sources, stored))
+            ):
+                record_load("knowledge", "warm", started)
+                return index
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    chunks = collect_chunks(sources)
+    source_key = {"settings": settings, "files": fingerprint_sources(sources)}
+    write_index(chunks, cache_path, source_key)
+
+    index = KnowledgeIndex(cache_path)
+    record_load("knowledge", "cold", started)
+    return index
+
+
+_knowledge_index = None
+
+
+def get_knowledge_index() -> KnowledgeIndex:
+    """Process-wide knowledge index, opened on first use"""
+    global _knowledge_index
+    if _knowledge_index is None:
+        _knowledge_index = build_knowledge_index()
+    return _knowledge_index
+
+
+@traced("knowledge.retrieve_guidance")
+def retrieve_guidance(query: str, k: int = 3) -> List[Dict]:
+    """Policy chunks relevant to a chat turn; empty if the index is unavailable"""
+    if not query or not query.strip() or k <= 0:
+        return []
+    try:
+        return get_knowledge_index().search(query, k)
+    except Exception as e:
+        print(f"⚠️ Knowledge index unavailable: {e}")
+        return []
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    index = build_knowledge_index(force=True)
+    size_kb = os.path.getsize(KNOWLEDGE_CACHE) / 1024
+    print(
+        f"📚 {len(index)} chunks, {len(index.terms)} terms, {size_kb:.1f} KB "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+
+    query: Optional[str] = " ".join(sys.argv[1:]) or None
+    if query:
+        started = time.perf_counter()
+        results = index.search(query)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"🔎 {elapsed_ms:.3f} ms")
+        for result in results:
+            print(f"  [{result['score']}] {result['source']} p.{result['page']}: {result['text'][:160]}")
@@ -0,0 +1,280 @@
+"""Resolve free-text Greek place names to places and prefectures without the LLM.
+
+Every gazetteer name, alias and prefecture name is reduced to a phonetic
+skeleton that Greek, Greeklish and common misspellings share ("Ηράκλειο",
+"Irakleiou" and "Ηρακλιο" all become "irakl") and indexed. Lookups match
+whole keys first and only fall back to a bounded edit-distance search
+("Hrakleiou" is "xrakl", one edit away), over the last few words of the text
+and the names sharing a deletion skeleton with them, when nothing in the
+text matched.
+
+Short stems ("var" for Βάρη) would also match ordinary words ("βαριά"), so
+those names are only matched by their whole folded word.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from reference.gazetteer import PLACES, POSTAL_PREFECTURES, normalize_text, postal_code_prefecture
+
+
+# Greek letters -> Latin skeleton, digraphs first
+_GREEK_DIGRAPHS = (
+    ("ου", "u"), ("αυ", "av"), ("ευ", "ev"), ("αι", "e"), ("ει", "i"),
+    ("οι", "i"), ("υι", "i"), ("μπ", "v"), ("ντ", "d"), ("γκ", "g"), ("γγ", "g"),
+)
+_GREEK_LETTERS = str.maketrans(
+    {
+        "α": "a", "β": "v", "γ": "g", "δ": "d", "ε": "e", "ζ": "z", "η": "i",
+        "θ": "q", "ι": "i", "κ": "k", "λ": "l", "μ": "m", "ν": "n", "ξ": "x",
+        "ο": "o", "π": "p", "ρ": "r", "σ": "s", "τ": "t", "υ": "i", "φ": "f",
+        "χ": "x", "ψ": "ps", "ω": "o",
+    }
+)
+
+# Greeklish spellings -> the same skeleton (χ/ξ share "x", θ is "q")
+_LATIN_DIGRAPHS = (
+    ("th", "q"), ("ch", "x"), ("kh", "x"), ("ks", "x"), ("ph", "f"),
+    ("rh", "r"), ("ou", "u"), ("au", "av"), ("eu", "ev"), ("ai", "e"),
+    ("ei", "i"), ("oi", "i"), ("mp", "v"), ("nt", "d"), ("gk", "g"),
+    ("gg", "g"), ("gh", "g"),
+)
+_LATIN_LETTERS = str.maketrans(
+    {"h": "x", "8": "q", "b": "v", "y": "i", "w": "o", "c": "k", "j": "g"}
+)
+
+_DOUBLE_LETTER = re.compile(r"(.)\1+")
+_TRAILING_VOWELS = re.compile(r"[aeiou]+$")
+
+# Words that are part of addresses, never place names
+_IGNORED_WORDS = frozenset(
+    normalize_text(word)
+    for word in (
+        "οδός", "οδό", "οδου", "λεωφόρος", "λεωφόρο", "λεωφ", "δρόμος", "δρόμο",
+        "εθνική", "εθνικής", "πλατεία", "κοντά", "περιοχή", "νομός", "νομό",
+        "νομού", "στο", "στη", "στην", "στον", "από", "προς", "και", "odos",
+        "leoforos", "street", "near",
+    )
+)
+
+# Stemmed keys shorter than this are not indexed (whole words still are)
+MIN_STEM_LENGTH = 4
+
+# Skeletons shorter than this only match exactly
+MIN_FUZZY_LENGTH = 5
+
+# Words of a text tried against the fuzzy search, counted from the end
+MAX_FUZZY_WORDS = 3
+
+
+def fold(word: str) -> str:
+    """Greek and Greeklish spellings of one normalized word, folded together"""
+    for digraph, replacement in _GREEK_DIGRAPHS:
+        word = word.replace(digraph, replacement)
+    word = word.translate(_GREEK_LETTERS)
+    for digraph, replacement in _LATIN_DIGRAPHS:
+        word = word.replace(digraph, replacement)
+    word = _DOUBLE_LETTER.sub(r"\1", word.translate(_LATIN_LETTERS))
+    return word[:-1] if word.endswith("s") and len(word) > 2 else word
+
+
+def skeleton(word: str) -> str:
+    """Folded word without its inflection ending"""
+    word = fold(word)
+
+    # "patras"/"patra", "irakliou"/"iraklio", "xanion"/"xania" meet
+    base = word[:-1] if word.endswith("n") and len(word) > 3 else word
+    stripped = _TRAILING_VOWELS.sub("", base)
+    return stripped if len(stripped) >= 2 else base
+
+
+def phrase_skeleton(text: str) -> str:
+    return " ".join(skeleton(word) for word in normalize_text(text).split())
+
+
+def _edit_limit(length: int) -> int:
+    if length < MIN_FUZZY_LENGTH:
+        return 0
+    return 1 if length < 8 else 2
+
+
+def _deletions(word: str, depth: int) -> Set[str]:
+    """word with up to depth characters deleted, word itself included"""
+    found = {word}
+    layer = {word}
+    for _ in range(depth):
+        layer = {variant[:i] + variant[i + 1 :] for variant in layer for i in range(len(variant))}
+        found |= layer
+    return found
+
+
+def _distance(a: str, b: str) -> int:
+    """Levenshtein distance"""
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        row = [i]
+        for j, other in enumerate(b, 1):
+            row.append(min(row[j - 1] + 1, previous[j] + 1, previous[j - 1] + (char != other)))
+        previous = row
+    return previous[-1]
+
+
+class PlaceIndex:
+    """Place-name skeletons, each mapped to its place.
+
+    Whole keys are looked up in a dict. For the edit-distance search every
+    single-word key is also indexed by its deletions of up to MAX_EDITS
+    characters: two words within k edits share a deletion of at most k
+    characters each, so only the few keys found that way are compared.
+    """
+
+    MAX_EDITS = 2
+
+    def __init__(self, entries: List[Tuple[str, dict]]):
+        self.keys: Dict[str, dict] = {}
+        self.rank: Dict[str, int] = {}
+        self.deletions: Dict[str, List[str]] = {}
+        self.max_words = 1
+        for name, place in entries:
+            words = normalize_text(name).split()
+            if not words:
+                continue
+            self.insert(" ".join(fold(word) for word in words), place)
+            stems = " ".join(skeleton(word) for word in words)
+            if len(stems.replace(" ", "")) >= MIN_STEM_LENGTH:
+                self.insert(stems, place)
+            self.max_words = max(self.max_words, len(words))
+
+    def insert(self, key: str, place: dict) -> None:
+        if key in self.keys:
+            return
+        self.rank[key] = len(self.keys)
+        self.keys[key] = place
+        if " " not in key:
+            for variant in _deletions(key, self.MAX_EDITS):
+                self.deletions.setdefault(variant, []).append(key)
+
+    def exact(self, key: str) -> Optional[dict]:
+        return self.keys.get(key)
+
+    def fuzzy(self, key: str, max_distance: int) -> Optional[dict]:
+        """Closest single-word entry within max_distance edits"""
+        max_distance = min(max_distance, self.MAX_EDITS)
+        candidates = {
+            candidate
+            for variant in _deletions(key, max_distance)
+            for candidate in self.deletions.get(variant, ())
+            if abs(len(candidate) - len(key)) <= max_distance
+        }
+        best, best_distance = None, max_distance + 1
+        # The earlier entry wins a tie, as in the exact lookups
+        for candidate in sorted(candidates, key=self.rank.get):
+            distance = _distance(key, candidate)
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+        return self.keys[best] if best is not None else None
+
+
+def _index_entries() -> List[Tuple[str, dict]]:
+    """Gazetteer places first, then prefectures not already named by one"""
+    entries = []
+    for name, prefecture, lat, lon, aliases in PLACES:
+        place = {"name": name, "prefecture": prefecture, "lat": lat, "lon": lon}
+        for variant in (name, *aliases):
+            entries.append((variant, place))
+    for prefecture in sorted({place[1] for place in PLACES} | set(POSTAL_PREFECTURES.values())):
+        # A bare prefecture has no coordinates to measure distances from
+        entries.append((prefecture, {"name": prefecture, "prefecture": prefecture, "lat": None, "lon": None}))
+    return entries
+
+
+_INDEX = PlaceIndex(_index_entries())
+
+
+@lru_cache(maxsize=4096)
+def _match(text: str) -> Tuple[Tuple[dict, ...], Optional[dict]]:
+    """Exact matches in the text, in order, and the closest fuzzy match.
+
+    The fuzzy search only runs when nothing matched exactly and the text
+    has no postal code, which places it better than a guessed name.
+    """
+    normalized = [
+        word
+        for word in normalize_text(text).split()
+        if word not in _IGNORED_WORDS and not word.isdigit()
+    ]
+    folded = [fold(word) for word in normalized]
+    words = [skeleton(word) for word in normalized]
+
+    found = []
+    i = 0
+    while i < len(words):
+        for size in range(min(_INDEX.max_words, len(words) - i), 0, -1):
+            place = _INDEX.exact(" ".join(folded[i : i + size])) or _INDEX.exact(
+                " ".join(words[i : i + size])
+            )
+            if place:
+                found.append(place)
+                i += size - 1
+                break
+        i += 1
+    if found or postal_code_prefecture(text):
+        return tuple(found), None
+
+    # Only words long enough to be misspelt names, each tried once; towns
+    # come last, so the last few suffice
+    candidates = []
+    for word in reversed(words):
+        if len(word) >= MIN_FUZZY_LENGTH and word not in candidates:
+            candidates.append(word)
+            if len(candidates) == MAX_FUZZY_WORDS:
+                break
+    for word in candidates:
+        place = _INDEX.fuzzy(word, _edit_limit(len(word)))
+        if place:
+            return (), place
+    return (), None
+
+
+def resolve_prefecture(text: str) -> Optional[str]:
+    """Prefecture of a free-text location, or None if it cannot be placed.
+
+    Exact skeleton matches win (the last one in the text, as towns follow
+    streets in addresses), then a postal code, then the closest fuzzy match.
+    """
+    found, guess = _match(text)
+    if found:
+        return found[-1]["prefecture"]
+    prefecture = postal_code_prefecture(text)
+    if prefecture:
+        return prefecture
+    return guess["prefecture"] if guess else None
+
+
+def find_place(text: str) -> Optional[dict]:
+    """Gazetteer place ({"name", "prefecture", "lat", "lon"}) in a free-text location.
+
+    Matched like resolve_prefecture, so Greeklish and misspelt names are
+    found too, but only places with coordinates count: in "Γλυφάδα, Αττική"
+    it is Γλυφάδα. None if no place is named; callers fall back to the
+    postal code.
+    """
+    found, guess = _match(text)
+    located = [place for place in found if place["lat"] is not None]
+    if located:
+        return located[-1]
+    if found or guess is None or guess["lat"] is None:
+        return None
+    return guess
+
+
+def same_prefecture(location: str, destination: str) -> Optional[bool]:
+    """Whether two places are in the same prefecture; None if either is unknown"""
+    if not location or not destination:
+        return None
+    origin = resolve_prefecture(location)
+    target = resolve_prefecture(destination)
+    if origin is None or target is None:
+        return None
+    return origin == target
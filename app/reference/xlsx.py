@@ -0,0 +1,76 @@
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import List
+
+
+NS = {
+    "m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+}
+
+
+def _column_index(cell_ref: str) -> int:
+    """Convert the column part of a cell reference ('C12') to a 0-based index"""
+    letters = re.match(r"[A-Z]+", cell_ref).group()
+    index = 0
+    for letter in letters:
+        index = index * 26 + (ord(letter) - ord("A") + 1)
+    return index - 1
+
+
+def _text(element) -> str:
+    return "".join(t.text or "" for t in element.iter(f"{{{NS['m']}}}t"))
+
+
+def _first_sheet_path(archive: zipfile.ZipFile) -> str:
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    sheet = workbook.find("m:sheets/m:sheet", NS)
+    rel_id = sheet.get(f"{{{NS['r']}}}id")
+
+    rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.findall("rel:Relationship", NS):
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", target))
+
+    return "xl/worksheets/sheet1.xml"
+
+
+def read_xlsx_rows(path: str) -> List[List[str]]:
+    """Read the first worksheet of an .xlsx file as rows of cell strings.
+
+    Only cell values are read (no formulas, styles or dates), which is all the
+    reference spreadsheets in `data/` need, and avoids a dependency on openpyxl.
+    """
+    with zipfile.ZipFile(path) as archive:
+        shared_strings = []
+        if "xl/sharedStrings.xml" in archive.namelist():
+            root = ET.fromstring(archive.read("xl/sharedStrings.xml"))
+            shared_strings = [_text(si) for si in root.findall("m:si", NS)]
+
+        sheet = ET.fromstring(archive.read(_first_sheet_path(archive)))
+
+    rows = []
+    for row in sheet.iter(f"{{{NS['m']}}}row"):
+        values = {}
+        for cell in row.findall("m:c", NS):
+            cell_type = cell.get("t")
+            if cell_type == "inlineStr":
+                inline = cell.find("m:is", NS)
+                value = _text(inline) if inline is not None else ""
+            else:
+                raw = cell.find("m:v", NS)
+                if raw is None:
+                    continue
+                value = shared_strings[int(raw.text)] if cell_type == "s" else raw.text
+            values[_column_index(cell.get("r"))] = value
+
+        if values:
+            rows.append([values.get(i, "") for i in range(max(values) + 1)])
+
+    return rows
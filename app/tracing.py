@@ -0,0 +1,315 @@
+"""Lightweight span tracing for requests, image jobs, DB calls and agent runs.
+
+A trace is started per request (and per background image job) and carried in
+a context variable; `span()` blocks, `@traced` functions, ChatDatabase methods
+and agent runs inside it record spans with their parent. Outside a trace they
+cost one context-variable lookup. Finished traces are appended to a JSON lines
+file, one span per line.
+
+Print the slowest traces as indented flame-style trees with:
+
+    python -m tracing
+    python -m tracing --top 3 --name "POST /chat"
+    python -m tracing --trace 4f2a...
+"""
+
+import argparse
+import functools
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TRACE_FILE = os.path.join(PROJECT_ROOT, "traces", "spans.jsonl")
+
+_current_span: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_span", default=None)
+
+
+class JsonlExporter:
+    """Append finished traces to a JSON lines file, rotating it at max_bytes"""
+
+    def __init__(self, path: str = DEFAULT_TRACE_FILE, max_bytes: int = 50 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(s, ensure_ascii=False, default=str) + "\n" for s in spans)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            try:
+                if os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, f"{self.path}.1")
+            except OSError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+
+# Set by configure(); None disables tracing entirely
+_exporter: Optional[JsonlExporter] = None
+_sample_rate = 1.0
+
+
+def configure(exporter: Optional[JsonlExporter], sample_rate: float = 1.0) -> None:
+    global _exporter, _sample_rate
+    _exporter = exporter
+    _sample_rate = sample_rate
+
+
+def _new_span(name: str, parent: Optional[Dict[str, Any]], attrs: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "trace_id": parent["trace_id"] if parent else uuid.uuid4().hex,
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": parent["span_id"] if parent else None,
+        "name": name,
+        "start": time.time(),
+        "duration_ms": None,
+        "thread": threading.current_thread().name,
+        "attrs": attrs,
+        # Every span of a trace shares its root's list of finished spans
+        "_spans": parent["_spans"] if parent else [],
+        "_started": time.perf_counter(),
+    }
+
+
+def _finish(record: Dict[str, Any], error: BaseException = None) -> None:
+    record["duration_ms"] = round((time.perf_counter() - record["_started"]) * 1000, 3)
+    if error is not None:
+        record["error"] = f"{type(error).__name__}: {error}"
+    record["_spans"].append(record)
+
+
+def start_trace(name: str, **attrs) -> Optional[Dict[str, Any]]:
+    """Open a root span in the current context (None if not traced/sampled)"""
+    if _exporter is None or random.random() >= _sample_rate:
+        return None
+    root = _new_span(name, None, attrs)
+    _current_span.set(root)
+    return root
+
+
+def end_trace(root: Optional[Dict[str, Any]], error: BaseException = None) -> None:
+    """Close a root span and export its trace"""
+    if root is None:
+        return
+    _finish(root, error)
+    _current_span.set(None)
+    exporter = _exporter
+    if exporter is None:
+        return
+    try:
+        exporter.export(
+            [{k: v for k, v in s.items() if not k.startswith("_")} for s in root["_spans"]]
+        )
+    except OSError as e:
+        print(f"⚠️ Could not export trace {root['trace_id'][:8]}: {e}")
+
+
+@contextmanager
+def trace(name: str, **attrs):
+    """Run a block as its own trace, e.g. a background job"""
+    root = start_trace(name, **attrs)
+    try:
+        yield root
+    except BaseException as e:
+        end_trace(root, e)
+        raise
+    end_trace(root)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Record a child span of the current span; a no-op outside a trace"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    record = _new_span(name, parent, attrs)
+    token = _current_span.set(record)
+    try:
+        yield record
+    except BaseException as e:
+        _finish(record, e)
+        raise
+    else:
+        _finish(record)
+    finally:
+        _current_span.reset(token)
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current["trace_id"] if current else None
+
+
+def traced(name: str = None):
+    """Decorator recording each call of a function as a span"""
+
+    def decorate(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def trace_methods(prefix: str):
+    """Class decorator recording every public method call as `<prefix>.<method>`"""
+
+    def decorate(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_") or not callable(value):
+                continue
+            setattr(cls, attr, traced(f"{prefix}.{attr}")(value))
+        return cls
+
+    return decorate
+
+
+def trace_agent(agent, name: str):
+    """Record each run of an agent instance as `agent.<name>`"""
+    agent.run = traced(f"agent.{name}")(agent.run)
+    return agent
+
+
+def init_tracing(app) -> None:
+    """Trace every request (except static files and event streams) when TRACING is on"""
+    from flask import g, request
+
+    if not app.config["TRACING"]:
+        return
+    configure(
+        JsonlExporter(app.config["TRACE_FILE"], app.config["TRACE_MAX_BYTES"]),
+        app.config["TRACE_SAMPLE_RATE"],
+    )
+
+    untraced = {"static", "admin_events"}
+
+    @app.before_request
+    def start_request_trace():
+        if request.endpoint in untraced:
+            return
+        rule = request.url_rule.rule if request.url_rule else request.path
+        g.trace = start_trace(f"{request.method} {rule}", path=request.path)
+
+    @app.after_request
+    def add_trace_header(response):
+        root = g.get("trace")
+        if root is not None:
+            root["attrs"]["status"] = response.status_code
+            response.headers["X-Trace-Id"] = root["trace_id"]
+        return response
+
+    @app.teardown_request
+    def end_request_trace(error=None):
+        end_trace(g.pop("trace", None), error)
+
+    print(f"🔭 Tracing requests to {app.config['TRACE_FILE']}")
+
+
+def load_traces(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    traces = defaultdict(list)
+    for candidate in (f"{path}.1", path):
+        if not os.path.exists(candidate):
+            continue
+        with open(candidate, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    traces[record["trace_id"]].append(record)
+    return traces
+
+
+def print_trace(spans: List[Dict[str, Any]], width: int = 40) -> None:
+    """Indented span tree with bars placed on the root's timeline"""
+    root = next(s for s in spans if s["parent_id"] is None)
+    children = defaultdict(list)
+    for s in spans:
+        if s["parent_id"]:
+            children[s["parent_id"]].append(s)
+
+    total = root["duration_ms"] or 1e-9
+    print(f"\n{root['name']}  {total:.1f} ms  trace {root['trace_id']}  {root.get('attrs', {})}")
+
+    def walk(s, depth):
+        offset = int((s["start"] - root["start"]) * 1000 / total * width)
+        length = max(1, int(s["duration_ms"] / total * width))
+        bar = " " * min(offset, width - 1) + "█" * min(length, width - min(offset, width - 1))
+        label = ("  " * depth + s["name"])[:48]
+        error = f"  ❌ {s['error']}" if s.get("error") else ""
+        print(f"  {bar:<{width}} {s['duration_ms']:>9.1f} ms {s['duration_ms'] / total:>5.0%}  {label}{error}")
+        for child in sorted(children[s["span_id"]], key=lambda c: c["start"]):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+
+
+def print_breakdown(traces: List[List[Dict[str, Any]]]) -> None:
+    """Where the time of the given traces went, by span name (self time)"""
+    self_ms = defaultdict(float)
+    calls = defaultdict(int)
+    for spans in traces:
+        child_ms = defaultdict(float)
+        for s in spans:
+            if s["parent_id"]:
+                child_ms[s["parent_id"]] += s["duration_ms"]
+        for s in spans:
+            self_ms[s["name"]] += max(s["duration_ms"] - child_ms[s["span_id"]], 0.0)
+            calls[s["name"]] += 1
+
+    total = sum(self_ms.values()) or 1e-9
+    print(f"\nSelf time across {len(traces)} traces:")
+    for name, ms in sorted(self_ms.items(), key=lambda item: -item[1])[:15]:
+        print(f"  {ms:>10.1f} ms {ms / total:>5.0%} {calls[name]:>6}x  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the slowest traced requests")
+    parser.add_argument("--file", default=os.getenv("TRACE_FILE", DEFAULT_TRACE_FILE))
+    parser.add_argument("--top", type=int, default=5, help="how many of the slowest traces")
+    parser.add_argument("--name", help="only traces whose root has this name, e.g. 'POST /chat'")
+    parser.add_argument("--trace", help="show a single trace by id (or id prefix)")
+    args = parser.parse_args()
+
+    traces = [
+        spans
+        for spans in load_traces(args.file).values()
+        if any(s["parent_id"] is None for s in spans)
+    ]
+
+    def root_of(spans):
+        return next(s for s in spans if s["parent_id"] is None)
+
+    if args.trace:
+        traces = [spans for spans in traces if spans[0]["trace_id"].startswith(args.trace)]
+    if args.name:
+        traces = [spans for spans in traces if root_of(spans)["name"] == args.name]
+    if not traces:
+        print(f"No matching traces in {args.file}")
+        return
+
+    slowest = sorted(traces, key=lambda spans: -root_of(spans)["duration_ms"])[: args.top]
+    for spans in slowest:
+        print_trace(spans)
+    print_breakdown(slowest)
+
+
+if __name__ == "__main__":
+    main()
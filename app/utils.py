@@ -1,18 +1,48 @@
-from flask import session
-from atomic_agents.lib.components.agent_memory import AgentMemory
-from atomic_agents.agents.base_agent import BaseAgentInputSchema
-from agents.schemas import CustomOutputSchema, CaseDecisionInputSchema
-from database.database import ChatDatabase
-
-# Initialize database
-db = ChatDatabase()
-
-
+import os
+from typing import TYPE_CHECKING
+
+from flask import g, has_app_context, session
+from agents.classification import classify_by_keywords, get_case_type_code
+from database.loader import RequestLoader
+from database.plates import (
+    REPEAT_CLAIM_THRESHOLD,
+    REPEAT_CLAIM_WINDOW_DAYS,
+    format_plate,
+)
+from database.sharding import open_database
+from reference.garages import recommend_repair_shop
+from reference.prefectures import resolve_prefecture, same_prefecture
+from tracing import traced
+
+if TYPE_CHECKING:
+    from agents.schemas import CustomOutputSchema
+
+# Initialize database (its schema is created on first use, not at import);
+# DB_SHARDS > 1 spreads sessions over that many files
+db = open_database(
+    os.getenv("DATABASE_PATH", "chat_database.db"),
+    shards=int(os.getenv("DB_SHARDS", "1")),
+    lazy_schema=True,
+)
+
+
+def get_db():
+    """The current request's RequestLoader, or the database outside a request"""
+    if not has_app_context():
+        return db
+    if "loader" not in g:
+        g.loader = RequestLoader(db)
+    return g.loader
+
+
+@traced()
 def get_or_create_session():
     """Get existing session or create a new one"""
+    from atomic_agents.lib.components.agent_memory import AgentMemory
+
     if "session_id" not in session:
         # Create new chat session in database
-        session_id = db.create_chat_session()
+        session_id = get_db().create_chat_session()
         session["session_id"] = session_id
 
         # Create empty memory for new session
@@ -22,9 +52,12 @@ def get_or_create_session():
     else:
         session_id = session["session_id"]
 
+        from atomic_agents.agents.base_agent import BaseAgentInputSchema
+        from agents.schemas import CustomOutputSchema
+
         # Recreate memory from database history
         memory = AgentMemory()
-        chat_history = db.get_chat_history(session_id)
+        chat_history = get_db().get_chat_history(session_id)
 
         for msg in chat_history:
             if msg["sender"] == "assistant":
@@ -39,17 +72,13 @@ def get_or_create_session():
         return session_id, memory
 
 
+@traced()
 def get_session_context(session_id: str) -> str:
     """Generate context string with previously collected information"""
     try:
-        # Get session info
-        sessions = db.get_all_sessions()
-        session_info = next(
-            (s for s in sessions if s["session_id"] == session_id), None
-        )
-
-        # Get case info
-        case_info = db.get_case_by_session(session_id)
+        # Get session and case info
+        session_info = get_db().get_session(session_id)
+        case_info = get_db().get_case_by_session(session_id)
 
         context_parts = []
 
@@ -82,6 +111,11 @@ def get_session_context(session_id: str) -> str:
                 context_parts.append(f"Location: {case_info['location']}")
             if case_info.get("final_destination"):
                 context_parts.append(f"Destination: {case_info['final_destination']}")
+            prefectures = describe_prefectures(
+                case_info.get("location"), case_info.get("final_destination")
+            )
+            if prefectures:
+                context_parts.append(f"Prefectures: {prefectures}")
             if case_info.get("description"):
                 context_parts.append(f"Description: {case_info['description']}")
 
@@ -98,14 +132,27 @@ def get_session_context(session_id: str) -> str:
         return ""
 
 
+def describe_prefectures(location: str, destination: str) -> str:
+    """Resolved prefectures of a case, for the chat agent's context"""
+    origin = resolve_prefecture(location) if location else None
+    target = resolve_prefecture(destination) if destination else None
+    if not origin and not target:
+        return ""
+    if origin and target:
+        verdict = "εντός νομού" if origin == target else "εκτός νομού"
+        return f"{origin} -> {target} ({verdict})"
+    return f"{origin or '?'} -> {target or '?'}"
+
+
+@traced()
 def classify_case_with_decision_agent(user_message: str, chat_context: str = None):
     """Use the decision agent to classify if case is AC, RA, or OTHER"""
     try:
-        from agents.agents import setup_openai_client, create_case_decision_agent
+        from agents.agents import get_openai_client, create_case_decision_agent
+        from agents.schemas import CaseDecisionInputSchema
 
         # Setup client and agent
-        client = setup_openai_client()
-        decision_agent = create_case_decision_agent(client)
+        decision_agent = create_case_decision_agent(get_openai_client())
 
         # Run decision agent
         decision_input = CaseDecisionInputSchema(
@@ -138,30 +185,13 @@ def classify_case_with_decision_agent(user_message: str, chat_context: str = Non
     except Exception as e:
         print(f"❌ Error in decision agent: {str(e)}")
         # Fallback to basic classification
-        user_lower = user_message.lower()
-        if any(
-            word in user_lower
-            for word in ["τράκαρα", "χτύπησα", "ατύχημα", "χτύπημα", "ζημιά"]
-        ):
+        case_type, _ = classify_by_keywords(user_message)
+        if case_type != "OTHER":
             return type(
                 "obj",
                 (object,),
                 {
-                    "case_type": "AC",
-                    "confidence_level": "MEDIUM",
-                    "reasoning": "Fallback classification based on keywords",
-                    "key_indicators": ["keyword-based"],
-                },
-            )()
-        elif any(
-            word in user_lower
-            for word in ["βλάβη", "λάστιχο", "βενζίνη", "μπαταρία", "κινητήρας"]
-        ):
-            return type(
-                "obj",
-                (object,),
-                {
-                    "case_type": "RA",
+                    "case_type": case_type,
                     "confidence_level": "MEDIUM",
                     "reasoning": "Fallback classification based on keywords",
                     "key_indicators": ["keyword-based"],
@@ -180,26 +210,56 @@ def classify_case_with_decision_agent(user_message: str, chat_context: str = Non
             )()
 
 
-def get_case_type_code(case_type: str) -> str:
-    """Map Greek case types to database codes"""
-    if not case_type:
-        return None
-
-    case_type = case_type.lower().strip()
-    mapping = {
-        "ατύχημα": "AC",
-        "οδική βοήθεια": "RA",
-        "άλλο": "OTHER",
-        # Keep English codes for backward compatibility
-        "ac": "AC",
-        "ra": "RA",
-        "other": "OTHER",
+def diff_case_fields(current: dict, desired: dict) -> dict:
+    """Return the entries of `desired` that differ from `current`.
+
+    `None` in `desired` means "no new information" and never produces a change.
+    SQLite hands booleans back as 0/1, so they are compared as booleans.
+    """
+    current = current or {}
+    changes = {}
+    for key, value in desired.items():
+        if value is None:
+            continue
+        existing = current.get(key)
+        if isinstance(value, bool) and existing is not None:
+            existing = bool(existing)
+        if existing != value:
+            changes[key] = value
+    return changes
+
+
+def find_repeat_claims(session_id: str, registration_number: str) -> list:
+    """Other cases on the same vehicle within the repeat-claim window"""
+    if not registration_number:
+        return []
+    return get_db().get_cases_by_plate(
+        registration_number,
+        since_days=REPEAT_CLAIM_WINDOW_DAYS,
+        exclude_session_id=session_id,
+    )
+
+
+def new_write_counters() -> dict:
+    """Per-turn counters of the rows written by each case table"""
+    return {
+        "chat_sessions": 0,
+        "cases": 0,
+        "case_analysis": 0,
+        "case_flags": 0,
+        "case_summary": 0,
     }
-    return mapping.get(case_type, "OTHER")
 
 
-def update_case_from_ai_response(session_id: str, ai_response: CustomOutputSchema):
-    """Update case information based on AI analysis from the latest response"""
+@traced()
+def update_case_from_ai_response(session_id: str, ai_response: "CustomOutputSchema"):
+    """Update case information based on AI analysis from the latest response.
+
+    Only tables and columns whose values actually changed are written. Returns
+    the number of rows written per table for this turn.
+    """
+    writes = new_write_counters()
+    db = get_db()
     try:
         # Check if we have any meaningful case information from AI
         has_case_info = any(
@@ -222,33 +282,38 @@ def update_case_from_ai_response(session_id: str, ai_response: CustomOutputSchem
         )
 
         if not has_case_info:
-            return
-
-        # Update session-level information if provided
-        if (
-            ai_response.extracted_customer_name
-            or ai_response.extracted_registration_number
-        ):
-            db.update_session_info(
-                session_id=session_id,
-                customer_name=ai_response.extracted_customer_name,
-                registration_number=ai_response.extracted_registration_number,
+            return writes
+
+        # Plates are compared and stored in their canonical form
+        registration_number = format_plate(ai_response.extracted_registration_number)
+
+        # Update session-level information if it changed
+        session_changes = diff_case_fields(
+            db.get_session(session_id),
+            {
+                "customer_name": ai_response.extracted_customer_name,
+                "registration_number": registration_number,
+            },
+        )
+        if session_changes:
+            writes["chat_sessions"] += db.update_session_info(
+                session_id=session_id, **session_changes
             )
 
         # Get existing case to avoid overwriting data
         existing_case = db.get_case_by_session(session_id)
+        case_code = (
+            get_case_type_code(ai_response.case_type) if ai_response.case_type else None
+        )
 
         # Prepare case update data, preserving existing values
-        case_data = {}
-
-        if ai_response.case_type:
-            case_data["case_type"] = get_case_type_code(ai_response.case_type)
-
-        if ai_response.extracted_registration_number:
-            case_data["registration_number"] = ai_response.extracted_registration_number
-
-        if ai_response.extracted_customer_name:
-            case_data["customer_name"] = ai_response.extracted_customer_name
+        case_data = {
+            "case_type": case_code,
+            "registration_number": registration_number,
+            "customer_name": ai_response.extracted_customer_name,
+            "location": ai_response.extracted_location,
+            "final_destination": ai_response.extracted_destination,
+        }
 
         if ai_response.case_description:
             # Append to existing description if it exists and is different
@@ -261,61 +326,115 @@ def update_case_from_ai_response(session_id: str, ai_response: CustomOutputSchem
             else:
                 case_data["description"] = ai_response.case_description
 
-        if ai_response.extracted_location:
-            case_data["location"] = ai_response.extracted_location
-
-        if ai_response.extracted_destination:
-            case_data["final_destination"] = ai_response.extracted_destination
+        case_changes = diff_case_fields(existing_case, case_data)
 
         # Update case information if we have new data
-        if case_data:
-            case_id = db.update_case_info(session_id=session_id, **case_data)
+        if case_changes:
+            case_id = db.update_case_info(
+                session_id=session_id, existing_case=existing_case, writes=writes, **case_changes
+            )
         else:
             case_id = existing_case["id"] if existing_case else None
 
         if not case_id:
-            return
-
-        # Update case analysis with AI insights
-        analysis_data = {
-            "malfunction": ai_response.case_description
-            if get_case_type_code(ai_response.case_type) == "RA"
-            else None,
-            "resolution": ai_response.recommended_action,
-            "repair_shop": "Nearest authorized repair facility"
-            if get_case_type_code(ai_response.case_type) == "AC"
-            else None,
-            "within_prefecture": not ai_response.out_of_prefecture
-            if ai_response.out_of_prefecture is not None
-            else True,
-        }
+            return writes
+
+        existing_analysis = (existing_case or {}).get("analysis") or {}
+        existing_flags = (existing_case or {}).get("flags") or {}
+        existing_summary = (existing_case or {}).get("summary") or {}
+
+        # Recommend the nearest suitable garage from data/Garages.xlsx, looking
+        # at where the vehicle is going first and where it is now second
+        current_case = {**(existing_case or {}), **case_changes}
+        effective_case_type = case_code or current_case.get("case_type")
+        repair_shop = None
+        if effective_case_type in ("AC", "RA"):
+            repair_shop = recommend_repair_shop(
+                current_case.get("final_destination"),
+                current_case.get("location"),
+                description=current_case.get("description"),
+            )
+        if repair_shop is None and effective_case_type == "AC":
+            repair_shop = "Nearest authorized repair facility"
 
-        # Only update analysis if we have new information
-        if any(v is not None for v in analysis_data.values()):
-            db.update_case_analysis(case_id=case_id, **analysis_data)
+        # Same prefecture or not is decided locally; the LLM's judgement is
+        # only used for places the gazetteer cannot resolve
+        within_prefecture = same_prefecture(
+            current_case.get("location"), current_case.get("final_destination")
+        )
+        if within_prefecture is None:
+            if ai_response.out_of_prefecture is not None:
+                within_prefecture = not ai_response.out_of_prefecture
+            elif not any(v is not None for v in existing_analysis.values()):
+                within_prefecture = True
+
+        analysis_changes = diff_case_fields(
+            {
+                "malfunction": existing_analysis.get("possible_vehicle_malfunction"),
+                "resolution": existing_analysis.get("possible_problem_resolution"),
+                "repair_shop": existing_analysis.get("recommended_auto_repair_shop"),
+                "within_prefecture": existing_analysis.get(
+                    "is_destination_within_prefecture"
+                ),
+            },
+            {
+                "malfunction": ai_response.case_description
+                if case_code == "RA"
+                else None,
+                "resolution": ai_response.recommended_action,
+                "repair_shop": repair_shop,
+                "within_prefecture": within_prefecture,
+            },
+        )
+
+        if analysis_changes:
+            writes["case_analysis"] += db.update_case_analysis(
+                case_id=case_id, **analysis_changes
+            )
+
+        # Several recent claims on the same vehicle are a fraud signal
+        repeat_claims = find_repeat_claims(
+            session_id, current_case.get("registration_number")
+        )
+        fraud = (
+            True
+            if len(repeat_claims) >= REPEAT_CLAIM_THRESHOLD
+            else ai_response.fraud_risk
+        )
 
         # Update case flags with AI decisions
-        flags_data = {
-            "delay_voucher": ai_response.delay_compensation,
-            "geolocation_sent": ai_response.needs_geolocation,
-            "sworn_declaration": ai_response.needs_sworn_declaration,
-            "fast_track": ai_response.is_fast_track,
-            "fraud": ai_response.fraud_risk,
-        }
+        flags_changes = diff_case_fields(
+            {
+                "delay_voucher": existing_flags.get("delay_voucher_used"),
+                "geolocation_sent": existing_flags.get("geolocation_link_sent"),
+                "sworn_declaration": existing_flags.get("sworn_declaration_needed"),
+                "fast_track": existing_flags.get("is_fast_track"),
+                "fraud": existing_flags.get("is_fraud"),
+            },
+            {
+                "delay_voucher": ai_response.delay_compensation,
+                "geolocation_sent": ai_response.needs_geolocation,
+                "sworn_declaration": ai_response.needs_sworn_declaration,
+                "fast_track": ai_response.is_fast_track,
+                "fraud": fraud,
+            },
+        )
 
-        # Only update flags if we have new information
-        if any(v is not None for v in flags_data.values()):
-            db.update_case_flags(case_id=case_id, **flags_data)
+        if flags_changes:
+            writes["case_flags"] += db.update_case_flags(
+                case_id=case_id, **flags_changes
+            )
 
         # Generate case summary
         tags = []
-        if ai_response.case_type:
-            case_code = get_case_type_code(ai_response.case_type)
+        if case_code:
             tags.append(case_code.lower())
         if ai_response.is_fast_track:
             tags.append("fast-track")
-        if ai_response.fraud_risk:
+        if fraud:
             tags.append("fraud-risk")
+        if repeat_claims:
+            tags.append("repeat-vehicle")
         if ai_response.extracted_location:
             tags.append("location-provided")
         if ai_response.damage_severity:
@@ -326,14 +445,11 @@ def update_case_from_ai_response(session_id: str, ai_response: CustomOutputSchem
             tags.append("needs-declaration")
         if ai_response.delay_compensation:
             tags.append("delay-compensation")
-        if ai_response.out_of_prefecture:
+        if within_prefecture is False:
             tags.append("out-of-prefecture")
 
         # Generate summary from AI understanding
         summary_parts = []
-        case_code = (
-            get_case_type_code(ai_response.case_type) if ai_response.case_type else None
-        )
         if case_code == "AC":
             summary_parts.append("Accident case")
         elif case_code == "RA":
@@ -359,18 +475,34 @@ def update_case_from_ai_response(session_id: str, ai_response: CustomOutputSchem
             else "Case information being gathered"
         )
 
-        communication_quality = (
-            "Good - AI analyzed" if has_case_info else "Pending - gathering information"
+        summary_changes = diff_case_fields(
+            {
+                "communication_quality": existing_summary.get("communication_quality"),
+                "tags": existing_summary.get("tags"),
+                "summary": existing_summary.get("short_summary"),
+            },
+            {
+                "communication_quality": "Good - AI analyzed",
+                "tags": tags,
+                "summary": summary,
+            },
         )
 
-        db.update_case_summary(
-            case_id=case_id,
-            communication_quality=communication_quality,
-            tags=tags,
-            summary=summary,
-        )
+        if summary_changes:
+            writes["case_summary"] += db.update_case_summary(
+                case_id=case_id, **summary_changes
+            )
 
-        print(f"✅ Case updated from AI analysis for session {session_id[:8]}...")
+        rows_written = sum(writes.values())
+        if rows_written:
+            print(
+                f"✅ Case updated from AI analysis for session {session_id[:8]}... "
+                f"({rows_written} rows written)"
+            )
+        else:
+            print(f"ℹ️ No case changes for session {session_id[:8]}...")
 
     except Exception as e:
         print(f"❌ Error updating case from AI: {str(e)}")
+
+    return writes
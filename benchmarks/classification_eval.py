@@ -0,0 +1,289 @@
+"""Measure AC/RA case classification against the labelled dialogs in data/.
+
+The examples are the transcripts in Dialogs-AC.docx and Dialogs-RA.docx and
+the case descriptions in CallReason.xlsx. A transcript is classified the way
+/chat does it: after the customer's N-th message (--turns), with the last
+three messages so far as chat context.
+
+Backends:
+    keywords  the keyword fallback used when the decision agent fails
+    agent     the decision agent, live; every answer is recorded in --cassette
+    replay    the decision agent's recorded answers, with their recorded
+              latency and token use, so reruns cost nothing
+
+A local model behind an OpenAI-compatible API (Ollama, vLLM, llama.cpp) is
+the agent backend with --base-url and --model.
+
+Usage:
+    python benchmarks/classification_eval.py
+    python benchmarks/classification_eval.py --backend agent --turns 1 2 3
+    python benchmarks/classification_eval.py --backend replay --turns 1 2 3
+    python benchmarks/classification_eval.py --backend agent --base-url http://localhost:11434/v1 --model qwen2.5:7b
+    python benchmarks/classification_eval.py --output keywords.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "app"))
+
+from agents.classification import classify_by_keywords  # noqa: E402
+from reference.datasets import get_labelled_cases  # noqa: E402
+
+
+DEFAULT_CASSETTE = os.path.join(os.path.dirname(__file__), ".data", "classification_cassette.json")
+LABELS = ["AC", "RA", "OTHER"]
+
+
+def build_inputs(cases: list, turns: list) -> list:
+    """One classifier call per case and customer turn, as /chat would make it"""
+    inputs = []
+    for case in cases:
+        customer_turns = [i for i, turn in enumerate(case["turns"]) if turn["speaker"] == "customer"]
+        for n in turns:
+            if n > len(customer_turns):
+                continue
+            position = customer_turns[n - 1]
+            so_far = case["turns"][: position + 1]
+            inputs.append(
+                {
+                    "id": f"{case['id']} @{n}",
+                    "label": case["label"],
+                    "source": case["source"],
+                    "turn": n,
+                    "user_message": so_far[-1]["text"],
+                    "chat_context": " ".join(turn["text"] for turn in so_far[-3:]),
+                }
+            )
+    return inputs
+
+
+def keyword_backend(user_message: str, chat_context: str) -> dict:
+    case_type, _ = classify_by_keywords(user_message)
+    return {"case_type": case_type}
+
+
+class Cassette:
+    """Recorded agent answers, keyed by model and input"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def key(model: str, user_message: str, chat_context: str) -> str:
+        raw = json.dumps([model, user_message, chat_context], ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+
+
+def make_agent_backend(args, cassette: Cassette):
+    """The decision agent as /chat creates it, recording every answer"""
+    import instructor
+    import openai
+
+    from agents.agents import create_case_decision_agent
+    from agents.classification import get_case_type_code
+    from agents.schemas import CaseDecisionInputSchema
+
+    # Local servers usually ignore the key, but the client insists on one
+    client = instructor.from_openai(
+        openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY", "unused"), base_url=args.base_url)
+    )
+
+    def classify(user_message: str, chat_context: str) -> dict:
+        # A fresh agent per call, like classify_case_with_decision_agent
+        agent = create_case_decision_agent(client, model=args.model)
+        started = time.perf_counter()
+        result = agent.run(
+            CaseDecisionInputSchema(user_message=user_message, chat_context=chat_context)
+        )
+        usage = getattr(getattr(result, "_raw_response", None), "usage", None)
+        answer = {
+            "case_type": get_case_type_code(result.case_type),
+            "confidence": result.confidence_level,
+            "latency_ms": (time.perf_counter() - started) * 1000,
+            "input_tokens": getattr(usage, "prompt_tokens", None),
+            "output_tokens": getattr(usage, "completion_tokens", None),
+        }
+        cassette.entries[cassette.key(args.model, user_message, chat_context)] = answer
+        return answer
+
+    return classify
+
+
+def make_replay_backend(args, cassette: Cassette):
+    def classify(user_message: str, chat_context: str) -> dict:
+        key = cassette.key(args.model, user_message, chat_context)
+        if key not in cassette.entries:
+            raise KeyError("not recorded; run with --backend agent first")
+        return cassette.entries[key]
+
+    return classify
+
+
+def evaluate(inputs: list, classify) -> list:
+    results = []
+    for item in inputs:
+        started = time.perf_counter()
+        try:
+            answer = dict(classify(item["user_message"], item["chat_context"]))
+            error = None
+        except Exception as e:
+            answer, error = {"case_type": "ERROR"}, f"{type(e).__name__}: {e}"
+        # Recorded answers carry the latency of the call that recorded them
+        answer.setdefault("latency_ms", (time.perf_counter() - started) * 1000)
+        results.append({**item, **answer, "error": error})
+    return results
+
+
+def summarize(results: list, input_price: float, output_price: float) -> dict:
+    """Accuracy, confusion matrix, latency and cost of one backend's results"""
+    scored = [r for r in results if r["error"] is None]
+    correct = [r for r in scored if r["case_type"] == r["label"]]
+    # Answers other than OTHER are the ones that could skip the LLM
+    answered = [r for r in scored if r["case_type"] != "OTHER"]
+
+    confusion = {label: {predicted: 0 for predicted in LABELS} for label in LABELS}
+    for r in scored:
+        confusion[r["label"]][r["case_type"]] += 1
+
+    by_group = defaultdict(list)
+    for r in scored:
+        by_group[f"{r['source']} @{r['turn']}"].append(r["case_type"] == r["label"])
+
+    latencies = sorted(r["latency_ms"] for r in scored)
+    input_tokens = sum(r.get("input_tokens") or 0 for r in scored)
+    output_tokens = sum(r.get("output_tokens") or 0 for r in scored)
+    cost = (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else None
+
+    return {
+        "examples": len(results),
+        "errors": len(results) - len(scored),
+        "accuracy": len(correct) / len(scored) if scored else None,
+        "answered": len(answered) / len(scored) if scored else None,
+        "accuracy_when_answered": (
+            sum(r["case_type"] == r["label"] for r in answered) / len(answered) if answered else None
+        ),
+        "accuracy_by_group": {group: sum(hits) / len(hits) for group, hits in sorted(by_group.items())},
+        "confusion": confusion,
+        "latency_ms": {
+            "mean": statistics.fmean(latencies) if latencies else None,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "max": latencies[-1] if latencies else None,
+        },
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cost_usd": cost,
+        "cost_per_call_usd": cost / len(scored) if scored else None,
+        "misclassified": [f"{r['id']}: {r['label']} -> {r['case_type']}" for r in scored if r["case_type"] != r["label"]],
+        "error_messages": dict(Counter(r["error"] for r in results if r["error"])),
+    }
+
+
+def print_summary(backend: str, summary: dict) -> None:
+    def pct(value):
+        return "n/a" if value is None else f"{value:.1%}"
+
+    print(f"\n{backend}: {summary['examples']} examples, {summary['errors']} errors")
+    print(
+        f"  accuracy {pct(summary['accuracy'])}, answered {pct(summary['answered'])} "
+        f"(accuracy when answered {pct(summary['accuracy_when_answered'])})"
+    )
+    for group, accuracy in summary["accuracy_by_group"].items():
+        print(f"    {group:<20} {pct(accuracy):>7}")
+
+    print("\n  " + "label / predicted".ljust(18) + "".join(f"{label:>7}" for label in LABELS))
+    for label in LABELS:
+        row = summary["confusion"][label]
+        print(f"  {label:<18}" + "".join(f"{row[predicted]:>7}" for predicted in LABELS))
+
+    latency = summary["latency_ms"]
+    if latency["mean"] is not None:
+        print(
+            f"\n  latency ms: mean {latency['mean']:.2f}, p50 {latency['p50']:.2f}, "
+            f"p95 {latency['p95']:.2f}, max {latency['max']:.2f}"
+        )
+    if summary["input_tokens"] or summary["output_tokens"]:
+        print(
+            f"  tokens: {summary['input_tokens']} in, {summary['output_tokens']} out; "
+            f"cost ${summary['cost_usd']:.4f} (${summary['cost_per_call_usd']:.5f} per call)"
+        )
+    for line in summary["misclassified"]:
+        print(f"  ✗ {line}")
+    for message, count in summary["error_messages"].items():
+        print(f"  ❌ {count}x {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["keywords", "agent", "replay"], nargs="+", default=["keywords"])
+    parser.add_argument("--turns", type=int, nargs="+", default=[1], help="classify after these customer turns")
+    parser.add_argument("--source", choices=["dialogs", "call_reasons"], help="only examples from one corpus")
+    parser.add_argument("--model", default="gpt-4.1", help="decision agent model")
+    parser.add_argument("--base-url", help="OpenAI-compatible API, e.g. a local model server")
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE, help="recorded agent answers")
+    parser.add_argument("--input-price", type=float, default=2.0, help="USD per million input tokens")
+    parser.add_argument("--output-price", type=float, default=8.0, help="USD per million output tokens")
+    parser.add_argument("--output", help="write summaries and per-example results as JSON to this file")
+    args = parser.parse_args()
+
+    cases = get_labelled_cases()
+    if args.source:
+        cases = [case for case in cases if case["source"] == args.source]
+    inputs = build_inputs(cases, args.turns)
+    print(f"{len(inputs)} classifier calls over {len(cases)} labelled cases")
+
+    cassette = Cassette(args.cassette)
+    backends = {
+        "keywords": lambda: keyword_backend,
+        "agent": lambda: make_agent_backend(args, cassette),
+        "replay": lambda: make_replay_backend(args, cassette),
+    }
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "turns": args.turns,
+            "model": args.model,
+            "base_url": args.base_url,
+        },
+        "backends": {},
+    }
+    try:
+        for backend in args.backend:
+            results = evaluate(inputs, backends[backend]())
+            summary = summarize(results, args.input_price, args.output_price)
+            print_summary(backend, summary)
+            report["backends"][backend] = {"summary": summary, "results": results}
+    finally:
+        if "agent" in args.backend:
+            cassette.save()
+            print(f"\nAgent answers recorded in {args.cassette}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
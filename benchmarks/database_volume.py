@@ -0,0 +1,494 @@
+"""Measure ChatDatabase latency and throughput at production data volumes.
+
+Synthetic datasets of N sessions (Greek transcripts, cases with analysis,
+flags and summary rows, and images) are generated once per size and seed and
+kept in --data-dir; every run works on a fresh copy, so results do not drift
+as the benchmark writes. Each operation is timed single-threaded and with
+--writers concurrent threads: write operations run on every thread, read
+operations run while the other threads keep adding messages.
+
+Usage:
+    python benchmarks/database_volume.py
+    python benchmarks/database_volume.py --sessions 10000 100000 1000000
+    python benchmarks/database_volume.py --ops 500 --writers 8 --output db.json
+    python benchmarks/database_volume.py --compare before.json --output after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "app"))
+
+from database.database import ChatDatabase  # noqa: E402
+from database.plates import format_plate, normalize_plate  # noqa: E402
+
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(__file__), ".data")
+
+# Bump when the generated data changes shape, so stale datasets are rebuilt
+DATASET_VERSION = 1
+
+INSERT_BATCH = 5000
+
+NAMES = [
+    "Γιώργος Παπαδόπουλος", "Μαρία Κωνσταντίνου", "Νίκος Γεωργίου", "Ελένη Δημητρίου",
+    "Κώστας Ιωάννου", "Αθηνά Νικολάου", "Δημήτρης Αλεξίου", "Σοφία Παναγιώτου",
+    "Γιάννης Βασιλείου", "Κατερίνα Μιχαήλ", "Παναγιώτης Σταύρου", "Δέσποινα Χριστοδούλου",
+]
+PLACES = [
+    "Αθήνα", "Πειραιάς", "Θεσσαλονίκη", "Πάτρα", "Ηράκλειο", "Λάρισα", "Βόλος",
+    "Ιωάννινα", "Χανιά", "Καλαμάτα", "Κόρινθος", "Ναύπλιο", "Λαμία", "Σέρρες",
+    "Κομοτηνή", "Ρόδος", "Κέρκυρα", "Τρίπολη", "Χαλκίδα", "Καβάλα",
+]
+STREETS = ["Λεωφόρος Κηφισίας", "Εθνική Οδός Αθηνών-Λαμίας", "Αττική Οδός", "οδός Ερμού", "Εγνατία Οδός"]
+PLATE_LETTERS = "ΑΒΕΖΗΙΚΜΝΟΡΤΥΧ"
+PROBLEMS = {
+    "RA": [
+        "έμεινα από μπαταρία και το αυτοκίνητο δεν παίρνει μπρος",
+        "έσκασε το λάστιχο και δεν έχω ρεζέρβα",
+        "τελείωσε η βενζίνη στη μέση του δρόμου",
+        "ανάβει η λυχνία του κινητήρα και βγάζει καπνό",
+    ],
+    "AC": [
+        "με χτύπησε άλλο όχημα από πίσω στο φανάρι",
+        "τράκαρα σε κολώνα ενώ παρκάριζα",
+        "έσπασε το παρμπρίζ από πέτρα στην εθνική",
+        "συγκρούστηκα με μηχανή σε διασταύρωση",
+    ],
+}
+ASSISTANT_LINES = [
+    "Λυπάμαι για την ταλαιπωρία. Μπορείτε να μου πείτε τον αριθμό κυκλοφορίας του οχήματος;",
+    "Ευχαριστώ. Πού ακριβώς βρίσκεστε αυτή τη στιγμή;",
+    "Σας στέλνουμε οδική βοήθεια, ο χρόνος άφιξης είναι περίπου 40 λεπτά.",
+    "Χρειάζομαι μερικές φωτογραφίες από τις ζημιές για να προχωρήσουμε τη δήλωση.",
+    "Θέλετε το όχημα να μεταφερθεί στο πλησιέστερο συνεργαζόμενο συνεργείο;",
+]
+
+
+def random_plate(rng: random.Random) -> str:
+    letters = "".join(rng.choice(PLATE_LETTERS) for _ in range(3))
+    return f"{letters}-{rng.randint(1000, 9999)}"
+
+
+def generate_session(rng: random.Random, started: datetime, messages: int) -> dict:
+    """One synthetic session with its transcript, case and images"""
+    case_type = rng.choice(["RA", "RA", "AC", "AC", "OTHER"])
+    problem = rng.choice(PROBLEMS["AC" if case_type == "AC" else "RA"])
+    place, destination = rng.choice(PLACES), rng.choice(PLACES)
+    plate = random_plate(rng)
+    name = rng.choice(NAMES)
+
+    transcript = [("user", f"Γεια σας, {problem} στην {rng.choice(STREETS)}, {place}.")]
+    while len(transcript) < messages:
+        if transcript[-1][0] == "user":
+            transcript.append(("assistant", rng.choice(ASSISTANT_LINES)))
+        else:
+            transcript.append(("user", rng.choice([
+                f"Ο αριθμός είναι {plate}.",
+                f"Είμαι {name}.",
+                f"Βρίσκομαι στην έξοδο για {destination}.",
+                "Ναι, παρακαλώ, όσο πιο γρήγορα γίνεται.",
+                f"Θα ήθελα να πάει σε συνεργείο στην {destination}.",
+            ])))
+
+    return {
+        "session_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "name": name,
+        "plate": plate,
+        "case_type": case_type,
+        "description": problem,
+        "location": f"{rng.choice(STREETS)}, {place}",
+        "destination": destination,
+        "started": started,
+        "ended": rng.random() < 0.8,
+        "transcript": transcript,
+        "images": rng.choice([0, 0, 0, 1, 2, 3]) if case_type == "AC" else 0,
+        "fraud": rng.random() < 0.03,
+    }
+
+
+def stamp(session: dict, offset: int = 0) -> str:
+    """SQLite timestamp `offset` seconds into a generated session"""
+    return (session["started"] + timedelta(seconds=offset)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def generate_dataset(path: str, sessions: int, messages: int, seed: int) -> None:
+    """Bulk-load a dataset straight through SQL (ChatDatabase creates the schema)"""
+    rng = random.Random(seed)
+    ChatDatabase(path)  # schema, indexes and WAL mode
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous = OFF")
+    cursor = conn.cursor()
+    now = datetime(2025, 6, 1)
+    started_at = time.perf_counter()
+
+    for batch_start in range(0, sessions, INSERT_BATCH):
+        batch = [
+            generate_session(
+                rng, now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600)), messages
+            )
+            for _ in range(min(INSERT_BATCH, sessions - batch_start))
+        ]
+
+        cursor.executemany(
+            """
+            INSERT INTO chat_sessions
+            (session_id, customer_name, registration_number, started_at, ended_at, status)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """,
+            [
+                (s["session_id"], s["name"], s["plate"], stamp(s),
+                 stamp(s, 900) if s["ended"] else None, "ended" if s["ended"] else "active")
+                for s in batch
+            ],
+        )
+        cursor.executemany(
+            "INSERT INTO chat_messages (session_id, sender, message, timestamp) VALUES (?, ?, ?, ?)",
+            [
+                (s["session_id"], sender, text, stamp(s, 30 * i))
+                for s in batch
+                for i, (sender, text) in enumerate(s["transcript"])
+            ],
+        )
+
+        for s in batch:
+            cursor.execute(
+                """
+                INSERT INTO cases
+                (session_id, case_type, registration_number, customer_name, description,
+                 location, final_destination, created_at, updated_at, plate_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (s["session_id"], s["case_type"], format_plate(s["plate"]), s["name"],
+                 s["description"], s["location"], s["destination"], stamp(s, 60), stamp(s, 900),
+                 normalize_plate(s["plate"])),
+            )
+            s["case_id"] = cursor.lastrowid
+
+        cursor.executemany(
+            """
+            INSERT INTO case_analysis (case_id, possible_vehicle_malfunction,
+                possible_problem_resolution, recommended_auto_repair_shop,
+                is_destination_within_prefecture)
+            VALUES (?, ?, ?, ?, ?)
+        """,
+            [
+                (s["case_id"], s["description"], "Αποστολή οδικής βοήθειας",
+                 f"Συνεργείο {s['destination']}", s["location"].endswith(s["destination"]))
+                for s in batch
+            ],
+        )
+        cursor.executemany(
+            "INSERT INTO case_flags (case_id, is_fast_track, is_fraud) VALUES (?, ?, ?)",
+            [(s["case_id"], s["case_type"] == "RA", s["fraud"]) for s in batch],
+        )
+        cursor.executemany(
+            "INSERT INTO case_summary (case_id, communication_quality, tags, short_summary) VALUES (?, ?, ?, ?)",
+            [
+                (s["case_id"], "Good - AI analyzed",
+                 json.dumps([s["case_type"].lower()] + (["fraud-risk"] if s["fraud"] else [])),
+                 f"{s['description']}. Location: {s['location']}")
+                for s in batch
+            ],
+        )
+        cursor.executemany(
+            """
+            INSERT INTO case_images (case_id, session_id, filename, original_filename,
+                image_type, analysis_data, upload_timestamp, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+            [
+                (s["case_id"], s["session_id"], f"{digest}.jpg", f"IMG_{i:04d}.jpg", "damage",
+                 json.dumps({"damage_description": s["description"], "severity": "moderate"},
+                            ensure_ascii=False),
+                 stamp(s, 300 + i), digest)
+                for s in batch
+                for i in range(s["images"])
+                for digest in [f"{rng.getrandbits(256):064x}"]
+            ],
+        )
+        conn.commit()
+
+        done = batch_start + len(batch)
+        if done % (INSERT_BATCH * 20) == 0 or done == sessions:
+            print(f"  generated {done:,}/{sessions:,} sessions ({time.perf_counter() - started_at:.0f}s)")
+
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+
+def dataset_path(data_dir: str, sessions: int, messages: int, seed: int) -> str:
+    name = f"sessions-{sessions}-m{messages}-s{seed}-v{DATASET_VERSION}.db"
+    path = os.path.join(data_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"Generating {sessions:,} sessions into {path}")
+        temp_path = f"{path}.tmp"
+        for leftover in (temp_path, f"{temp_path}-wal", f"{temp_path}-shm"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        generate_dataset(temp_path, sessions, messages, seed)
+        os.replace(temp_path, path)
+    return path
+
+
+def sample_session_ids(path: str, count: int, rng: random.Random) -> list:
+    """Random existing session ids, picked by rowid"""
+    conn = sqlite3.connect(path)
+    (total,) = conn.execute("SELECT MAX(rowid) FROM chat_sessions").fetchone()
+    ids = [
+        conn.execute("SELECT session_id FROM chat_sessions WHERE rowid = ?", (rng.randint(1, total),)).fetchone()[0]
+        for _ in range(count)
+    ]
+    conn.close()
+    return ids
+
+
+def summarize(samples: list, errors: int, wall: float) -> dict:
+    if not samples:
+        return {"ops": 0, "errors": errors}
+    ordered = sorted(samples)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return {
+        "ops": len(samples),
+        "errors": errors,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000,
+        "ops_per_sec": len(samples) / wall if wall else 0.0,
+    }
+
+
+def operations(db: ChatDatabase, rng: random.Random) -> dict:
+    """name -> (callable taking a session id, is_write)"""
+    return {
+        "add_message": (lambda sid: db.add_message(sid, "user", rng.choice(ASSISTANT_LINES)), True),
+        "get_chat_history": (db.get_chat_history, False),
+        "get_case_by_session": (db.get_case_by_session, False),
+        "update_case_info": (
+            lambda sid: db.update_case_info(sid, location=f"{rng.choice(STREETS)}, {rng.choice(PLACES)}"),
+            True,
+        ),
+        "get_all_sessions": (lambda sid: db.get_all_sessions(), False),
+        "end_session": (db.end_session, True),
+    }
+
+
+def run_single(fn, session_ids: list) -> dict:
+    samples = []
+    errors = 0
+    wall_start = time.perf_counter()
+    for sid in session_ids:
+        start = time.perf_counter()
+        try:
+            fn(sid)
+            samples.append(time.perf_counter() - start)
+        except sqlite3.Error:
+            errors += 1
+    return summarize(samples, errors, time.perf_counter() - wall_start)
+
+
+def run_concurrent(
+    fn, is_write: bool, db: ChatDatabase, session_ids: list, writers: int, writer_ids: list = None
+) -> dict:
+    """Writes run on every thread; reads run on one while the others add messages
+    (to writer_ids, by default the sessions read)"""
+    samples = []
+    errors = [0]
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def measured(ids):
+        local, failed = [], 0
+        for sid in ids:
+            start = time.perf_counter()
+            try:
+                fn(sid)
+                local.append(time.perf_counter() - start)
+            except sqlite3.Error:
+                failed += 1
+        with lock:
+            samples.extend(local)
+            errors[0] += failed
+
+    def background_writer(ids):
+        i = 0
+        while not stop.is_set():
+            try:
+                db.add_message(ids[i % len(ids)], "assistant", "Σας ευχαριστούμε για την αναμονή.")
+            except sqlite3.Error:
+                pass
+            i += 1
+
+    if is_write:
+        threads = [
+            threading.Thread(target=measured, args=(session_ids[i::writers],))
+            for i in range(writers)
+        ]
+        background = []
+    else:
+        threads = [threading.Thread(target=measured, args=(session_ids,))]
+        writer_ids = writer_ids or session_ids
+        background = [
+            threading.Thread(target=background_writer, args=(writer_ids[i::writers] or writer_ids,))
+            for i in range(max(writers - 1, 1))
+        ]
+
+    for thread in background:
+        thread.start()
+    wall_start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+    stop.set()
+    for thread in background:
+        thread.join()
+
+    return summarize(samples, errors[0], wall)
+
+
+def benchmark_size(args, sessions: int) -> list:
+    template = dataset_path(args.data_dir, sessions, args.messages, args.seed)
+    rng = random.Random(args.seed + sessions)
+    results = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in ("single", "concurrent"):
+            # A fresh copy per mode, so writes of one run never affect the next
+            path = os.path.join(workdir, f"{mode}.db")
+            shutil.copyfile(template, path)
+            db = ChatDatabase(path)
+
+            for name, (fn, is_write) in operations(db, rng).items():
+                sampled = sample_session_ids(path, args.ops, rng)
+                # Reads every session; a few runs are plenty
+                ids = [None] * args.scan_ops if name == "get_all_sessions" else sampled
+
+                if mode == "single":
+                    stats = run_single(fn, ids)
+                else:
+                    stats = run_concurrent(fn, is_write, db, ids, args.writers, writer_ids=sampled)
+
+                result = {
+                    "sessions": sessions,
+                    "operation": name,
+                    "mode": mode,
+                    "threads": 1 if mode == "single" else args.writers,
+                    **stats,
+                }
+                results.append(result)
+                print(
+                    f"{sessions:>9,} {name:<20} {mode:<10} {stats.get('p50_ms', 0):>9.3f} "
+                    f"{stats.get('p95_ms', 0):>9.3f} {stats.get('p99_ms', 0):>9.3f} "
+                    f"{stats.get('ops_per_sec', 0):>10.1f} {stats['errors']:>6}"
+                )
+
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path: str, results: list, threshold: float) -> None:
+    """Print p50 and throughput changes against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {
+        (r["sessions"], r["operation"], r["mode"]): r for r in baseline["results"]
+    }
+
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('commit')})")
+    print(f"{'sessions':>9} {'operation':<20} {'mode':<10} {'p50 change':>11} {'ops/s change':>13}")
+    for r in results:
+        old = previous.get((r["sessions"], r["operation"], r["mode"]))
+        if not old or not old.get("p50_ms") or not r.get("p50_ms"):
+            continue
+        p50 = (r["p50_ms"] / old["p50_ms"] - 1) * 100
+        ops = (r["ops_per_sec"] / old["ops_per_sec"] - 1) * 100
+        flag = "  <- slower" if p50 > threshold else ""
+        print(f"{r['sessions']:>9,} {r['operation']:<20} {r['mode']:<10} {p50:>+10.1f}% {ops:>+12.1f}%{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--messages", type=int, default=6, help="messages per generated session")
+    parser.add_argument("--ops", type=int, default=1000, help="timed calls per operation")
+    parser.add_argument("--scan-ops", type=int, default=3, help="timed get_all_sessions calls")
+    parser.add_argument("--writers", type=int, default=4, help="threads in the concurrent runs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="where generated datasets are kept")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="p50 %% increase flagged by --compare")
+    args = parser.parse_args()
+
+    print(
+        f"{'sessions':>9} {'operation':<20} {'mode':<10} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'p99 ms':>9} {'ops/s':>10} {'errors':>6}"
+    )
+    results = []
+    for sessions in args.sessions:
+        results.extend(benchmark_size(args, sessions))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "messages_per_session": args.messages,
+            "ops": args.ops,
+            "writers": args.writers,
+            "seed": args.seed,
+            "dataset_version": DATASET_VERSION,
+        },
+        "results": results,
+    }
+
+    if args.compare:
+        compare(args.compare, results, args.threshold)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
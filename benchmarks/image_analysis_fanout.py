@@ -0,0 +1,189 @@
+"""Compare batch and fan-out image analysis latency for 1 to N images.
+
+By default the vision model is replaced by a fake analyzer whose latency
+follows a simple model of a multimodal call: a fixed request overhead, plus
+input processing per image, plus output generation per image (which is
+sequential within a single call). Use --live to call the real model.
+
+Usage:
+    python benchmarks/image_analysis_fanout.py
+    python benchmarks/image_analysis_fanout.py --max-images 6 --concurrency 3
+    python benchmarks/image_analysis_fanout.py --live --images path/to/photos
+    python benchmarks/image_analysis_fanout.py --output fanout.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "app"))
+
+from images.analysis import run_batch_analysis, run_fanout_analysis  # noqa: E402
+
+
+class FakeImageAnalyzer:
+    """Stand-in for the vision agent with a configurable latency model"""
+
+    def __init__(self, overhead: float, per_image_input: float, per_image_output: float):
+        self.overhead = overhead
+        self.per_image_input = per_image_input
+        self.per_image_output = per_image_output
+
+    def run(self, request):
+        count = len(request.images)
+        time.sleep(
+            self.overhead + count * (self.per_image_input + self.per_image_output)
+        )
+        return SimpleNamespace(
+            chat_message=f"Αναλύθηκαν {count} εικόνες.",
+            image_analyses=[
+                SimpleNamespace(image_type="damage", model_dump=lambda: {})
+                for _ in range(count)
+            ],
+        )
+
+
+def write_png(path: str, width: int = 64, height: int = 64, seed: int = 0):
+    """Write a small synthetic RGB PNG without needing Pillow"""
+    rows = b"".join(
+        b"\x00" + bytes((x * 4 + seed) % 256 for x in range(width * 3))
+        for _ in range(height)
+    )
+
+    def chunk(tag, data):
+        return (
+            struct.pack(">I", len(data))
+            + tag
+            + data
+            + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+        )
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(rows)))
+        f.write(chunk(b"IEND", b""))
+
+
+def load_images(directory: str, count: int, workdir: str) -> list:
+    """Build upload records for `count` images (real ones if a directory is given)"""
+    if directory:
+        paths = sorted(
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.lower().endswith((".jpg", ".jpeg", ".png", ".webp"))
+        )
+        if not paths:
+            raise SystemExit(f"No images found in {directory}")
+        paths = [paths[i % len(paths)] for i in range(count)]
+    else:
+        paths = []
+        for i in range(count):
+            path = os.path.join(workdir, f"synthetic_{i}.png")
+            if not os.path.exists(path):
+                write_png(path, seed=i)
+            paths.append(path)
+
+    return [
+        {
+            "content_hash": f"bench-{i}",
+            "path": path,
+            "filename": os.path.basename(path),
+            "original_filename": os.path.basename(path),
+        }
+        for i, path in enumerate(paths)
+    ]
+
+
+def time_call(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-images", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--overhead", type=float, default=0.8, help="fake: seconds per call")
+    parser.add_argument("--input-cost", type=float, default=0.15, help="fake: seconds per image read")
+    parser.add_argument("--output-cost", type=float, default=0.6, help="fake: seconds per image answered")
+    parser.add_argument("--live", action="store_true", help="call the real vision model")
+    parser.add_argument("--images", help="directory of real photos to use")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.live:
+        from agents.agents import setup_openai_client, create_image_analyzer
+
+        client = setup_openai_client()
+
+        def create_analyzer():
+            return create_image_analyzer(client)
+    else:
+
+        def create_analyzer():
+            return FakeImageAnalyzer(args.overhead, args.input_cost, args.output_cost)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{'images':>6} {'batch (s)':>10} {'fanout (s)':>11} {'speedup':>8}")
+        for count in range(1, args.max_images + 1):
+            pending = load_images(args.images, count, workdir)
+
+            batch = time_call(
+                lambda: run_batch_analysis(create_analyzer, pending, "", {}),
+                args.repeat,
+            )
+            fanout = time_call(
+                lambda: run_fanout_analysis(
+                    create_analyzer, pending, "", {}, args.concurrency
+                ),
+                args.repeat,
+            )
+
+            batch_median = statistics.median(batch)
+            fanout_median = statistics.median(fanout)
+            results.append(
+                {
+                    "images": count,
+                    "batch_seconds": batch,
+                    "fanout_seconds": fanout,
+                    "batch_median": batch_median,
+                    "fanout_median": fanout_median,
+                    "speedup": batch_median / fanout_median,
+                }
+            )
+            print(
+                f"{count:>6} {batch_median:>10.3f} {fanout_median:>11.3f} "
+                f"{batch_median / fanout_median:>7.2f}x"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "live": args.live,
+                    "concurrency": args.concurrency,
+                    "repeat": args.repeat,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Check how long importing the app takes, using `python -X importtime`.
+
+Imports the app module (by default `app`, which creates the Flask app and
+registers its routes) in fresh interpreters the way a pre-fork master does,
+and reports the median cumulative time and the imports that cost the most.
+Exits non-zero when the median is over --budget-ms, or when a module that
+should load lazily (the agent stack) is imported at startup, so it can run
+as a regression check.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-ms 500 --repeat 9
+    python benchmarks/import_time.py --output imports.json
+    python benchmarks/import_time.py --compare imports.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from datetime import datetime
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+
+# Loaded on first use or by the post-fork warm-up, never while importing the app
+DEFERRED_MODULES = (
+    "openai",
+    "instructor",
+    "atomic_agents",
+    "agents.agents",
+    "agents.schemas",
+    "images.analysis",
+)
+
+
+def parse_importtime(stderr: str, module: str) -> dict:
+    """Cumulative time of `module` and the self time of everything it imported.
+
+    -X importtime prints a module after the modules it imported, indented by
+    depth, so the lines before `module`'s own top-level line are its imports.
+    """
+    pending = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        self_us, cumulative_us, raw_name = int(fields[0]), int(fields[1]), fields[2]
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        name = raw_name.strip()
+        if depth == 0:
+            if name == module:
+                return {
+                    "cumulative_ms": cumulative_us / 1000,
+                    "imports": {entry: us / 1000 for entry, us in pending + [(name, self_us)]},
+                }
+            pending = []
+        else:
+            pending.append((name, self_us))
+    raise RuntimeError(f"{module} does not appear in the -X importtime output")
+
+
+def measure(module: str, env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr, module)
+
+
+def compare(path: str, report: dict, threshold: float) -> bool:
+    """Print the change against an earlier run; True if it got slower than threshold %"""
+    with open(path) as f:
+        before = json.load(f)
+    old, new = before["median_ms"], report["median_ms"]
+    change = (new - old) / old * 100 if old else 0.0
+    flag = "  ⚠️ regression" if change > threshold else ""
+    print(f"\nvs {path}: {old:.1f} ms -> {new:.1f} ms ({change:+.1f}%){flag}")
+
+    added = sorted(set(report["imports"]) - set(before.get("imports", {})))
+    if added:
+        print(f"  newly imported at startup: {', '.join(added[:20])}")
+    return change > threshold
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app", help="module to import, relative to app/")
+    parser.add_argument("--repeat", type=int, default=5, help="timed interpreter runs")
+    parser.add_argument("--budget-ms", type=float, default=750.0, help="allowed median import time")
+    parser.add_argument("--top", type=int, default=15, help="how many of the costliest imports to list")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="slowdown %% flagged by --compare")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # Import the way the pre-fork master does: no worker threads, scratch database
+    env["SERVER_PREFORK"] = "1"
+    env["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="import-time-"), "chat.db")
+
+    measure(args.module, env)  # byte-compiles, so the timed runs do not
+    runs = [measure(args.module, env) for _ in range(args.repeat)]
+
+    median_ms = statistics.median(run["cumulative_ms"] for run in runs)
+    imports = defaultdict(list)
+    for run in runs:
+        for name, ms in run["imports"].items():
+            imports[name].append(ms)
+    self_ms = {name: statistics.median(times) for name, times in imports.items()}
+    deferred = sorted(
+        name for name in self_ms if any(name == m or name.startswith(f"{m}.") for m in DEFERRED_MODULES)
+    )
+
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.repeat} runs (budget {args.budget_ms:.0f} ms)")
+    print(f"{len(self_ms)} modules imported; costliest by self time:")
+    for name, ms in sorted(self_ms.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {ms:>8.2f} ms  {name}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "module": args.module,
+            "repeat": args.repeat,
+        },
+        "median_ms": median_ms,
+        "runs_ms": [run["cumulative_ms"] for run in runs],
+        "imports": self_ms,
+        "deferred_imported": deferred,
+    }
+
+    failed = False
+    if median_ms > args.budget_ms:
+        print(f"❌ Over budget by {median_ms - args.budget_ms:.1f} ms")
+        failed = True
+    if deferred:
+        print(f"❌ Imported at startup but meant to load lazily: {', '.join(deferred)}")
+        failed = True
+    if args.compare and compare(args.compare, report, args.threshold):
+        failed = True
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
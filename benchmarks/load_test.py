@@ -0,0 +1,514 @@
+"""Drive the real app with concurrent simulated customers to find its saturation point.
+
+Each simulated customer keeps its own cookie jar and runs whole conversations
+through the public endpoints: /start_chat, several /chat turns, optionally
+/upload_images (polling /upload_jobs until the analysis is done) and
+/end_session. The model is replaced by a local OpenAI-compatible fake that
+answers every structured-output call from the requested JSON schema after a
+configurable delay, so runs cost nothing and are repeatable.
+
+By default the app is started here against a throwaway database and upload
+folder, with the development server (--server flask) or the production one
+(--server gunicorn). To load an existing deployment instead, start the fake
+with --llm-only, point the deployment's OPENAI_BASE_URL at it and pass --url.
+
+Usage:
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --customers 5 10 20 40 --duration 60
+    python benchmarks/load_test.py --server gunicorn --llm-latency 3 --output load.json
+    python benchmarks/load_test.py --llm-only --llm-port 8900
+    python benchmarks/load_test.py --url http://staging:8080 --customers 10 50
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Real PNGs to upload; each upload gets random trailing bytes (ignored by
+# decoders) so content-addressed dedupe does not turn it into a cache hit
+PHOTOS = [
+    os.path.join(PROJECT_ROOT, "static", "images", name)
+    for name in ("hd-logo.png", "hellas_direct.png", "images.png")
+]
+
+# Canned values for schema fields the app acts on, so turns exercise the
+# same case-update paths a real conversation does
+FIELD_VALUES = {
+    "chat_message": "Κατανοητό. Σας στέλνουμε βοήθεια, θα σας ενημερώσουμε για τον χρόνο άφιξης.",
+    "extracted_registration_number": lambda: f"ΙΚΥ-{random.randint(1000, 9999)}",
+    "extracted_customer_name": "Μαρία Κωνσταντίνου",
+    "extracted_location": "Λεωφόρος Κηφισίας 100, Αθήνα",
+    "extracted_destination": "Πειραιάς",
+    "case_type": lambda: random.choice(["Οδική βοήθεια", "Ατύχημα"]),
+    "case_description": "Το όχημα δεν παίρνει μπρος, πιθανόν μπαταρία.",
+    "damage_severity": "moderate",
+    "severity_assessment": "moderate",
+    "recommended_action": "Αποστολή οδικής βοήθειας",
+    "reasoning": "Ο πελάτης περιγράφει μηχανική βλάβη.",
+    "confidence_level": "HIGH",
+    "image_type": "damage",
+    "license_plate_number": lambda: f"ΙΚΥ-{random.randint(1000, 9999)}",
+}
+
+CUSTOMER_MESSAGES = [
+    "Γεια σας, το αυτοκίνητο δεν παίρνει μπρος στην Κηφισίας.",
+    "Ο αριθμός κυκλοφορίας είναι ΙΚΥ-1234.",
+    "Λέγομαι Μαρία Κωνσταντίνου.",
+    "Θα ήθελα να μεταφερθεί σε συνεργείο στον Πειραιά.",
+    "Ναι, είμαι σε ασφαλές σημείο.",
+    "Πόση ώρα θα κάνει να έρθει το γερανό;",
+]
+
+
+def example_value(schema: dict, defs: dict, name: str = "", items: int = 1):
+    """A value that validates against a (pydantic-generated) JSON schema"""
+    if "$ref" in schema:
+        return example_value(defs[schema["$ref"].split("/")[-1]], defs, name, items)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return example_value(options[0], defs, name, items)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+
+    if kind == "object":
+        return {
+            key: example_value(prop, defs, key, items)
+            for key, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        count = max(schema.get("minItems", 0), items)
+        return [example_value(schema.get("items", {}), defs, name, items) for _ in range(count)]
+    if kind == "string":
+        value = FIELD_VALUES.get(name, "Δοκιμαστική τιμή")
+        return value() if callable(value) else value
+    if kind == "integer":
+        return schema.get("minimum", 1)
+    if kind == "number":
+        return schema.get("minimum", 0.5)
+    if kind == "boolean":
+        return False
+    return None
+
+
+def count_images(messages: list) -> int:
+    return sum(
+        1
+        for message in messages
+        if isinstance(message.get("content"), list)
+        for part in message["content"]
+        if part.get("type") == "image_url"
+    )
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """OpenAI chat-completions endpoint answering from the request's tool schema"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        images = count_images(body.get("messages", []))
+        server = self.server
+
+        delay = (server.vision_latency if images else server.latency) + random.uniform(
+            -server.jitter, server.jitter
+        )
+        time.sleep(max(delay, 0))
+        with server.lock:
+            server.calls += 1
+
+        message = {"role": "assistant", "content": None}
+        tools = body.get("tools") or []
+        if tools:
+            function = tools[0]["function"]
+            parameters = function.get("parameters", {})
+            arguments = example_value(parameters, parameters.get("$defs", {}), items=max(images, 1))
+            message["tool_calls"] = [
+                {
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": function["name"], "arguments": json.dumps(arguments, ensure_ascii=False)},
+                }
+            ]
+            finish_reason = "tool_calls"
+        else:
+            schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("schema")
+            message["content"] = (
+                json.dumps(example_value(schema, schema.get("$defs", {})), ensure_ascii=False)
+                if schema
+                else FIELD_VALUES["chat_message"]
+            )
+            finish_reason = "stop"
+
+        self._send_json(
+            {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": {"prompt_tokens": 500, "completion_tokens": 100, "total_tokens": 600},
+            }
+        )
+
+    def do_GET(self):
+        self._send_json({"object": "list", "data": [{"id": "fake", "object": "model"}]})
+
+    def _send_json(self, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_llm(port: int, latency: float, vision_latency: float, jitter: float):
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeLLMHandler)
+    server.daemon_threads = True
+    server.latency, server.vision_latency, server.jitter = latency, vision_latency, jitter
+    server.lock = threading.Lock()
+    server.calls = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_app(kind: str, port: int, llm_url: str, workdir: str, log_path: str):
+    """Start the app against a throwaway database and upload folder"""
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "load-test",
+        "OPENAI_BASE_URL": llm_url,
+        "DATABASE_PATH": os.path.join(workdir, "load_test.db"),
+        "UPLOAD_FOLDER": os.path.join(workdir, "uploads"),
+        "LOG_QUERY_COUNTS": "0",
+        "PYTHONUNBUFFERED": "1",
+    }
+    if kind == "gunicorn":
+        command = ["gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}"]
+        cwd = PROJECT_ROOT
+    else:
+        command = [
+            sys.executable,
+            "-c",
+            f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)",
+        ]
+        cwd = os.path.join(PROJECT_ROOT, "app")
+
+    log = open(log_path, "w")
+    process = subprocess.Popen(command, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"The app exited during startup, see {log_path}")
+        try:
+            urllib.request.urlopen(base_url + "/", timeout=2).read()
+            return process, base_url
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.5)
+    process.terminate()
+    raise SystemExit(f"The app did not start within 60s, see {log_path}")
+
+
+class Recorder:
+    """Latency samples and failures per endpoint, shared by the customers"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.lock_errors = 0
+        self.conversations = 0
+
+    def record(self, endpoint: str, seconds: float, error: str = None):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append(seconds)
+            if error:
+                self.errors.setdefault(endpoint, []).append(error)
+                if "locked" in error or "busy" in error:
+                    self.lock_errors += 1
+
+
+class Customer:
+    """One simulated customer with its own cookie-based session"""
+
+    def __init__(self, base_url: str, recorder: Recorder, args, rng: random.Random):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.args = args
+        self.rng = rng
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def call(self, endpoint: str, path: str, data: bytes = None, headers: dict = None):
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers or {})
+        start = time.perf_counter()
+        error = None
+        payload = None
+        try:
+            with self.opener.open(request, timeout=self.args.timeout) as response:
+                payload = json.loads(response.read() or b"{}")
+        except urllib.error.HTTPError as e:
+            try:
+                payload = json.loads(e.read() or b"{}")
+            except ValueError:
+                payload = {}
+            error = f"HTTP {e.code}: {payload.get('error', '')}"
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            error = f"{type(e).__name__}: {e}"
+        self.recorder.record(endpoint, time.perf_counter() - start, error)
+        return payload if error is None else None
+
+    def post_json(self, endpoint: str, path: str, body: dict):
+        return self.call(
+            endpoint, path, json.dumps(body).encode("utf-8"), {"Content-Type": "application/json"}
+        )
+
+    def upload(self, paths: list):
+        boundary = uuid.uuid4().hex
+        parts = []
+        for path in paths:
+            with open(path, "rb") as f:
+                content = f.read() + os.urandom(16)
+            parts.append(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="images"; '
+                f'filename="{os.path.basename(path)}"\r\nContent-Type: image/png\r\n\r\n'.encode()
+                + content
+                + b"\r\n"
+            )
+        body = b"".join(parts) + f"--{boundary}--\r\n".encode()
+        return self.call(
+            "upload_images",
+            "/upload_images",
+            body,
+            {"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        )
+
+    def wait_for_job(self, poll_url: str):
+        """Poll an image job; the time to completion is recorded as image_analysis"""
+        start = time.perf_counter()
+        deadline = start + self.args.timeout
+        while time.perf_counter() < deadline:
+            job = self.call("upload_jobs", poll_url)
+            if job and job.get("status") in ("done", "failed"):
+                error = job.get("error") if job["status"] == "failed" else None
+                self.recorder.record("image_analysis", time.perf_counter() - start, error)
+                return
+            time.sleep(0.25)
+        self.recorder.record("image_analysis", time.perf_counter() - start, "timed out")
+
+    def think(self):
+        time.sleep(self.rng.uniform(0, 2 * self.args.think))
+
+    def conversation(self, images: list):
+        if self.call("start_chat", "/start_chat") is None:
+            return
+        for turn in range(self.args.turns):
+            self.think()
+            self.post_json("chat", "/chat", {"message": CUSTOMER_MESSAGES[turn % len(CUSTOMER_MESSAGES)]})
+
+        if images and self.rng.random() < self.args.upload_ratio:
+            self.think()
+            job = self.upload(self.rng.sample(images, self.rng.randint(1, len(images))))
+            if job and job.get("poll_url"):
+                self.wait_for_job(job["poll_url"])
+
+        self.post_json("end_session", "/end_session", {})
+        with self.recorder.lock:
+            self.recorder.conversations += 1
+
+
+def summarize(recorder: Recorder, wall: float) -> dict:
+    endpoints = {}
+    total = failed = 0
+    for endpoint, samples in sorted(recorder.samples.items()):
+        ordered = sorted(samples)
+        errors = recorder.errors.get(endpoint, [])
+        total += len(samples)
+        failed += len(errors)
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+        endpoints[endpoint] = {
+            "requests": len(samples),
+            "errors": len(errors),
+            "error_rate": len(errors) / len(samples),
+            "mean_ms": statistics.fmean(samples) * 1000,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "sample_errors": sorted(set(errors))[:3],
+        }
+
+    return {
+        "endpoints": endpoints,
+        "requests": total,
+        "errors": failed,
+        "error_rate": failed / total if total else 0.0,
+        "lock_errors": recorder.lock_errors,
+        "requests_per_sec": total / wall if wall else 0.0,
+        "conversations": recorder.conversations,
+        "conversations_per_min": recorder.conversations / wall * 60 if wall else 0.0,
+    }
+
+
+def run_level(base_url: str, customers: int, args, images: list) -> dict:
+    recorder = Recorder()
+    stop_at = time.time() + args.duration
+
+    def customer_loop(index):
+        rng = random.Random(args.seed * 1000 + index)
+        while time.time() < stop_at:
+            Customer(base_url, recorder, args, rng).conversation(images)
+
+    threads = [threading.Thread(target=customer_loop, args=(i,)) for i in range(customers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Conversations still running at the deadline finish, so measure the real wall time
+    return summarize(recorder, time.perf_counter() - start)
+
+
+def find_saturation(levels: list) -> int:
+    """First concurrency level that added <10% throughput while /chat p95 rose >50%"""
+    for previous, current in zip(levels, levels[1:]):
+        gained = current["requests_per_sec"] / max(previous["requests_per_sec"], 1e-9) - 1
+        chat_before = previous["endpoints"].get("chat", {}).get("p95_ms")
+        chat_now = current["endpoints"].get("chat", {}).get("p95_ms")
+        if chat_before and chat_now and gained < 0.10 and chat_now > 1.5 * chat_before:
+            return current["customers"]
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--duration", type=float, default=30, help="seconds per concurrency level")
+    parser.add_argument("--turns", type=int, default=4, help="/chat turns per conversation")
+    parser.add_argument("--think", type=float, default=0.5, help="mean customer pause between calls (s)")
+    parser.add_argument("--upload-ratio", type=float, default=0.3, help="conversations that upload photos")
+    parser.add_argument("--images", type=int, default=2, help=f"max photos per upload (up to {len(PHOTOS)})")
+    parser.add_argument("--timeout", type=float, default=120, help="per-request and per-job timeout (s)")
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="fake model: seconds per text call")
+    parser.add_argument("--vision-latency", type=float, default=4.0, help="fake model: seconds per vision call")
+    parser.add_argument("--llm-jitter", type=float, default=0.3, help="fake model: +/- seconds of jitter")
+    parser.add_argument("--llm-port", type=int, default=8900)
+    parser.add_argument("--llm-only", action="store_true", help="only run the fake model server")
+    parser.add_argument("--server", choices=["flask", "gunicorn"], default="flask")
+    parser.add_argument("--port", type=int, default=8901, help="port for the app started here")
+    parser.add_argument("--url", help="load an already running deployment instead")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    llm = start_fake_llm(args.llm_port, args.llm_latency, args.vision_latency, args.llm_jitter)
+    llm_url = f"http://127.0.0.1:{args.llm_port}/v1"
+    print(f"Fake model listening on {llm_url}")
+    if args.llm_only:
+        print("Set OPENAI_BASE_URL to this address on the deployment; Ctrl-C to stop")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        process = None
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            log_path = os.path.join(workdir, "app.log")
+            process, base_url = start_app(args.server, args.port, llm_url, workdir, log_path)
+            print(f"Started the app ({args.server}) on {base_url}")
+
+        images = PHOTOS[: args.images]
+
+        levels = []
+        try:
+            print(
+                f"{'customers':>9} {'req/s':>8} {'conv/min':>9} {'errors':>7} {'locks':>6} "
+                f"{'chat p50':>9} {'chat p95':>9} {'chat p99':>9}"
+            )
+            for customers in args.customers:
+                result = {"customers": customers, **run_level(base_url, customers, args, images)}
+                levels.append(result)
+                chat = result["endpoints"].get("chat", {})
+                print(
+                    f"{customers:>9} {result['requests_per_sec']:>8.2f} "
+                    f"{result['conversations_per_min']:>9.1f} {result['error_rate']:>6.1%} "
+                    f"{result['lock_errors']:>6} {chat.get('p50_ms', 0):>8.0f}ms "
+                    f"{chat.get('p95_ms', 0):>7.0f}ms {chat.get('p99_ms', 0):>7.0f}ms"
+                )
+        finally:
+            if process:
+                process.terminate()
+                process.wait(timeout=30)
+
+        for result in levels:
+            print(f"\n{result['customers']} customers:")
+            print(f"  {'endpoint':<16} {'requests':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+            for endpoint, stats in result["endpoints"].items():
+                print(
+                    f"  {endpoint:<16} {stats['requests']:>8} {stats['errors']:>7} "
+                    f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}"
+                )
+                for error in stats["sample_errors"]:
+                    print(f"      {error[:120]}")
+
+        saturation = find_saturation(levels)
+        if saturation:
+            print(f"\nSaturated at about {saturation} concurrent customers")
+        print(f"Fake model calls: {llm.calls}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "server": args.url or args.server,
+                    "duration": args.duration,
+                    "turns": args.turns,
+                    "think": args.think,
+                    "llm_latency": args.llm_latency,
+                    "vision_latency": args.vision_latency,
+                    "saturation_customers": saturation,
+                    "levels": levels,
+                },
+                f,
+                indent=2,
+            )
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
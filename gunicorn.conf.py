@@ -0,0 +1,81 @@
+"""Production server configuration.
+
+Run from the project root:
+
+    gunicorn -c gunicorn.conf.py
+
+The app (and the reference data in data/) is loaded once in the master and
+shared copy-on-write by the forked workers. Each worker then starts its own
+image-analysis threads in `post_fork` and imports the agent libraries and
+creates its OpenAI client in the background, so it accepts requests as soon
+as it is forked. The master never imports the agent libraries, which keeps
+its boot (and a USR2 upgrade) short; each worker loads them once, off the
+request path.
+
+Requests spend most of their time waiting on the LLM API, so each worker runs
+many threads rather than there being many processes; a few processes are
+still useful for the CPU-bound parts (image preprocessing, JSON). Every open
+admin dashboard holds one thread for its event stream.
+
+Graceful reload:
+    kill -HUP <master pid>    restart workers with the new configuration;
+                              application code is preloaded, so it is NOT
+                              reloaded this way
+    kill -USR2 <master pid>   start a new master with the new code next to
+                              the old one, then `kill -QUIT <old master pid>`
+                              once it is serving
+
+Admin events (/admin/events) go through an event log next to the database
+(chat_database.events.db, a file of its own so logging never holds the
+database's write lock), so a dashboard sees the changes of every worker
+whichever one its stream is connected to (those of other workers within
+ADMIN_EVENTS_POLL seconds).
+"""
+
+import gc
+import multiprocessing
+import os
+
+# Tells create_app to leave per-process services to post_fork
+os.environ["SERVER_PREFORK"] = "1"
+
+wsgi_app = "app:app"
+pythonpath = "app"
+bind = os.getenv("BIND", "0.0.0.0:8080")
+
+preload_app = True
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count(), 4))))
+threads = int(os.getenv("WORKER_THREADS", "16"))
+
+# A chat turn can wait well over a minute on the model
+timeout = int(os.getenv("WORKER_TIMEOUT", "180"))
+# Longer than IMAGE_JOB_STOP_TIMEOUT, so running image jobs can finish
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Recycle workers now and then, staggered so they do not restart together
+max_requests = int(os.getenv("MAX_REQUESTS", "2000"))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+
+
+def when_ready(server):
+    # Objects loaded so far are never freed; keeping the collector from
+    # touching them keeps their pages shared with the workers
+    gc.freeze()
+    server.log.info("Preloaded app, %d objects frozen", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    flask_app = worker.app.wsgi()
+    # The master requeued interrupted jobs once; jobs of workers that die
+    # later are reclaimed when their lease expires (IMAGE_JOB_LEASE)
+    flask_app.extensions["start_worker_services"](requeue=False)
+    server.log.info("Worker %s started its services", worker.pid)
+
+
+def worker_exit(server, worker):
+    flask_app = worker.app.wsgi()
+    flask_app.extensions["stop_worker_services"]()
@@ -242,20 +242,16 @@ function handleImageUpload() {
       });
       
       try {
-        const response = await fetch("/upload_images", {
-          method: "POST",
-          body: formData,
-        });
-        
-        const data = await response.json();
+        const data = await uploadImagesAndWait(formData);
         
         // Remove typing indicator before showing response
         removeTypingIndicator();
         
-        appendMessage("bot", data.reply);
+        const reply = data.reply || "Συγγνώμη, υπήρξε πρόβλημα με την ανάλυση των εικόνων.";
+        appendMessage("bot", reply);
         
         if (ttsEnabled) {
-          speakText(data.reply);
+          speakText(reply);
         }
       } catch (error) {
         console.error("Error uploading images:", error);
@@ -270,6 +266,49 @@ function handleImageUpload() {
   }
 }
 
+// Image analysis runs as a background job: upload, then poll until it finishes
+const JOB_POLL_INTERVAL_MS = 1000;
+// Longer than a job that is retried after its worker died (see IMAGE_JOB_LEASE)
+const JOB_MAX_WAIT_MS = 5 * 60 * 1000;
+const JOB_TIMEOUT_REPLY = "Η ανάλυση των εικόνων καθυστερεί περισσότερο από το αναμενόμενο. Παρακαλώ δοκιμάστε να τις στείλετε ξανά.";
+const JOB_STATUS_LABELS = {
+  queued: "Οι εικόνες σας είναι σε αναμονή...",
+  running: "Αναλύουμε τις εικόνες σας...",
+};
+
+async function uploadImagesAndWait(formData) {
+  const response = await fetch("/upload_images", {
+    method: "POST",
+    body: formData,
+  });
+
+  const job = await response.json();
+  if (!response.ok || !job.job_id) {
+    return job;
+  }
+
+  return waitForImageJob(job.poll_url);
+}
+
+async function waitForImageJob(pollUrl) {
+  // Give up eventually rather than keep the chat waiting on a stuck job
+  const deadline = Date.now() + JOB_MAX_WAIT_MS;
+  while (Date.now() < deadline) {
+    await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+
+    const response = await fetch(pollUrl);
+    const data = await response.json();
+
+    if (!response.ok || data.status === "done" || data.status === "failed") {
+      return data;
+    }
+
+    updateTypingStatus(JOB_STATUS_LABELS[data.status]);
+  }
+
+  return { status: "timeout", reply: JOB_TIMEOUT_REPLY };
+}
+
 // Theme and Lottie animation functionality
 let lottieAnim;
 
@@ -455,17 +494,12 @@ async function sendImages() {
   showTypingIndicator();
   
   try {
-    const response = await fetch("/upload_images", {
-      method: "POST",
-      body: formData,
-    });
-    
-    const data = await response.json();
+    const data = await uploadImagesAndWait(formData);
     
     // Remove typing indicator before showing response
     removeTypingIndicator();
     
-    if (response.ok) {
+    if (data.status === "done") {
       appendMessage("bot", data.reply);
       if (ttsEnabled) {
         speakText(data.reply);
@@ -522,6 +556,19 @@ function showTypingIndicator() {
   scrollToBottom();
 }
 
+function updateTypingStatus(text) {
+  const indicator = document.querySelector(".typing-indicator");
+  if (!indicator || !text) return;
+
+  let status = indicator.querySelector(".typing-status");
+  if (!status) {
+    status = document.createElement("div");
+    status.classList.add("typing-status");
+    indicator.querySelector(".message-content").appendChild(status);
+  }
+  status.textContent = text;
+}
+
 function removeTypingIndicator() {
   const indicator = document.querySelector(".typing-indicator");
   if (indicator) {
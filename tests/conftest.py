@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+# The app is run from app/ and imports its packages top-level
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Path of a database file that does not exist yet"""
+    return str(tmp_path / "chat_database.db")
+
+
+@pytest.fixture
+def chat_db(db_path):
+    """A database with an event bus of its own"""
+    from database.database import ChatDatabase
+    from database.events import EventBus
+
+    return ChatDatabase(db_path, event_bus=EventBus())
+
+
+@pytest.fixture
+def app(chat_db, tmp_path, monkeypatch):
+    """The Flask app on chat_db, without image workers or agent warm-up"""
+    pytest.importorskip("flask")
+    monkeypatch.setenv("DATABASE_PATH", chat_db.db_path)
+    monkeypatch.setenv("SERVER_PREFORK", "1")
+    monkeypatch.setenv("LOG_QUERY_COUNTS", "0")
+    monkeypatch.setenv("UPLOAD_FOLDER", str(tmp_path / "uploads"))
+
+    import utils
+    from api import routes
+    from api.assets import init_static_fingerprints
+    from api.compression import init_compression
+    from config import create_app
+
+    monkeypatch.setattr(utils, "db", chat_db)
+    monkeypatch.setattr(routes, "db", chat_db)
+
+    app = create_app()
+    routes.register_routes(app)
+    init_static_fingerprints(app)
+    init_compression(app)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,66 @@
+import pytest
+
+
+def get_view(client, session_id, etag=None, **params):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get(f"/admin/session/{session_id}", headers=headers, query_string=params)
+
+
+@pytest.fixture
+def session_id(chat_db):
+    session_id = chat_db.create_chat_session()
+    chat_db.add_message(session_id, "user", "Έμεινα από μπαταρία στην Πάτρα")
+    return session_id
+
+
+def test_repeat_get_is_not_modified(client, session_id):
+    first = get_view(client, session_id)
+    etag = first.headers["ETag"]
+
+    again = get_view(client, session_id, etag)
+
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.data == b""
+
+
+def test_weak_etag_of_a_compressed_view_is_not_modified(client, session_id):
+    etag = get_view(client, session_id).headers["ETag"]
+
+    assert get_view(client, session_id, f"W/{etag}").status_code == 304
+
+
+def test_etag_covers_the_page(client, session_id):
+    etag = get_view(client, session_id).headers["ETag"]
+
+    other_page = get_view(client, session_id, etag, limit=10)
+
+    assert other_page.status_code == 200
+    assert other_page.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize(
+    "write",
+    [
+        lambda db, sid: db.add_message(sid, "assistant", "Στέλνουμε οδική βοήθεια"),
+        lambda db, sid: db.update_case_info(sid, location="Πάτρα"),
+        lambda db, sid: db.store_case_image(sid, "a.jpg", "a.jpg", content_hash="a" * 64),
+        lambda db, sid: db.end_session(sid),
+    ],
+    ids=["message", "case update", "image", "end session"],
+)
+def test_every_write_path_changes_the_etag(client, chat_db, session_id, write):
+    etag = get_view(client, session_id).headers["ETag"]
+
+    write(chat_db, session_id)
+    changed = get_view(client, session_id, etag)
+
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.get_json()["version"] > int(etag.strip('"').split("-")[0][1:])
+
+
+def test_unknown_session_is_not_found(client):
+    assert get_view(client, "no-such-session").status_code == 404
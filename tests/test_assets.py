@@ -0,0 +1,39 @@
+import hashlib
+import os
+
+import pytest
+
+flask = pytest.importorskip("flask")
+
+from api.assets import FINGERPRINT_LENGTH, IMMUTABLE_MAX_AGE
+
+
+def fingerprint(app, filename):
+    with open(os.path.join(app.static_folder, filename), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:FINGERPRINT_LENGTH]
+
+
+def test_static_urls_carry_the_content_hash(app):
+    with app.test_request_context():
+        url = flask.url_for("static", filename="script.js")
+
+    assert url == f"/static/script.js?v={fingerprint(app, 'script.js')}"
+
+
+def test_current_fingerprint_is_cached_as_immutable(app, client):
+    response = client.get(f"/static/script.js?v={fingerprint(app, 'script.js')}")
+
+    assert response.status_code == 200
+    assert response.cache_control.public
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == IMMUTABLE_MAX_AGE
+    response.close()
+
+
+def test_stale_or_missing_fingerprint_is_revalidated(client):
+    for url in ("/static/script.js?v=000000000000", "/static/script.js"):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert not response.cache_control.immutable
+        assert response.cache_control.max_age != IMMUTABLE_MAX_AGE
+        response.close()
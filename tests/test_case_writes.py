@@ -0,0 +1,50 @@
+from database.database import ChatDatabase
+
+
+def test_case_writes_are_counted_only_when_something_changes(db_path):
+    db = ChatDatabase(db_path)
+    session_id = db.create_chat_session()
+    writes = {"cases": 0}
+
+    db.update_case_info(session_id, writes=writes, location="Πάτρα")
+    assert writes["cases"] == 1
+
+    case = db.get_case_by_session(session_id)
+    db.update_case_info(session_id, existing_case=case, writes=writes, location="Πάτρα")
+    assert writes["cases"] == 1
+
+    db.update_case_info(session_id, existing_case=case, writes=writes, location="Αίγιο")
+    assert writes["cases"] == 2
+    assert db.get_case_by_session(session_id)["location"] == "Αίγιο"
+
+
+def test_detail_columns_are_left_alone_unless_given(db_path):
+    db = ChatDatabase(db_path)
+    session_id = db.create_chat_session()
+    case_id = db.update_case_info(session_id, case_type="RA")
+
+    assert db.update_case_analysis(case_id, malfunction="Μπαταρία", repair_shop="Garage") == 1
+    assert db.update_case_analysis(case_id, resolution="Ρυμούλκηση") == 1
+    analysis = db.get_case_by_session(session_id)["analysis"]
+    assert analysis["possible_vehicle_malfunction"] == "Μπαταρία"
+    assert analysis["recommended_auto_repair_shop"] == "Garage"
+    assert analysis["possible_problem_resolution"] == "Ρυμούλκηση"
+    assert db.update_case_analysis(case_id) == 0
+
+
+def test_none_clears_a_detail_column(db_path):
+    db = ChatDatabase(db_path)
+    session_id = db.create_chat_session()
+    case_id = db.update_case_info(session_id, case_type="AC")
+    db.update_case_analysis(case_id, repair_shop="Garage", within_prefecture=True)
+    db.update_case_summary(case_id, tags=["ac", "fraud-risk"], summary="Ατύχημα")
+
+    db.update_case_analysis(case_id, repair_shop=None)
+    db.update_case_summary(case_id, tags=None)
+
+    case = db.get_case_by_session(session_id)
+    assert case["analysis"]["recommended_auto_repair_shop"] is None
+    assert case["analysis"]["is_destination_within_prefecture"]
+    assert case["summary"]["tags"] == []
+    assert case["summary"]["short_summary"] == "Ατύχημα"
+    assert db.get_cases_by_tags(["fraud-risk"])["total"] == 0
@@ -0,0 +1,97 @@
+import gzip
+import io
+
+import pytest
+
+pytest.importorskip("flask")
+
+from api import compression
+
+
+@pytest.fixture
+def session_id(chat_db):
+    session_id = chat_db.create_chat_session()
+    for i in range(20):
+        chat_db.add_message(session_id, "user", f"Μήνυμα {i}: έμεινα από μπαταρία στην Πάτρα")
+    return session_id
+
+
+@pytest.fixture
+def no_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+
+def get_view(client, session_id, **headers):
+    return client.get(f"/admin/session/{session_id}", headers=headers)
+
+
+def test_json_is_gzipped_for_clients_that_accept_it(client, session_id, no_brotli):
+    plain = get_view(client, session_id)
+    compressed = get_view(client, session_id, **{"Accept-Encoding": "gzip, deflate"})
+
+    assert "Content-Encoding" not in plain.headers
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.data) == plain.data
+    assert len(compressed.data) < len(plain.data)
+
+
+def test_unsupported_encoding_is_sent_as_is(client, session_id, no_brotli):
+    response = get_view(client, session_id, **{"Accept-Encoding": "br"})
+
+    assert "Content-Encoding" not in response.headers
+
+
+def test_brotli_is_preferred_when_available(client, session_id):
+    brotli = pytest.importorskip("brotli")
+
+    response = get_view(client, session_id, **{"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.data) == get_view(client, session_id).data
+
+
+def test_responses_vary_on_accept_encoding(client, session_id):
+    for response in (get_view(client, session_id), get_view(client, "no-such-session")):
+        assert "Accept-Encoding" in response.vary
+
+
+def test_bodies_below_the_threshold_are_not_compressed(app, client, session_id):
+    app.config["COMPRESS_MIN_SIZE"] = 1024 * 1024
+
+    response = get_view(client, session_id, **{"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+
+
+def test_compressed_response_has_a_weak_etag(client, session_id, no_brotli):
+    strong = get_view(client, session_id).headers["ETag"]
+
+    response = get_view(client, session_id, **{"Accept-Encoding": "gzip"})
+
+    assert response.headers["ETag"] == f"W/{strong}"
+    revalidated = get_view(
+        client, session_id, **{"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]}
+    )
+    assert revalidated.status_code == 304
+    assert "Content-Encoding" not in revalidated.headers
+    assert revalidated.data == b""
+
+
+def test_file_and_streamed_responses_pass_through(app, no_brotli):
+    from flask import Response, send_file
+
+    body = b'{"padding": "' + b"x" * 4096 + b'"}'
+
+    @app.route("/test/file")
+    def json_file():
+        return send_file(io.BytesIO(body), mimetype="application/json")
+
+    @app.route("/test/stream")
+    def json_stream():
+        return Response(iter([body]), mimetype="application/json")
+
+    client = app.test_client()
+    for path in ("/test/file", "/test/stream"):
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+        assert response.data == body
@@ -0,0 +1,65 @@
+import os
+import sqlite3
+
+from database.events import EventBus, event_log_path, format_sse
+from database.sharding import ShardedChatDatabase
+
+
+def shared_buses(db_path, count=2):
+    """Event buses of several worker processes sharing one log"""
+    buses = [EventBus() for _ in range(count)]
+    for bus in buses:
+        bus.persist_to(event_log_path(db_path))
+    return buses
+
+
+def test_events_are_shared_through_the_log(db_path):
+    first, second = shared_buses(db_path)
+    event = first.publish("session-created", {"session_id": "s1"})
+
+    assert second.latest_id() == event["id"]
+    assert second.events_since(0) == [event]
+    assert second.events_since(event["id"]) == []
+
+
+def test_log_is_a_file_of_its_own(db_path):
+    bus = EventBus()
+    bus.persist_to(event_log_path(db_path))
+    db = ShardedChatDatabase(db_path, 2, event_bus=bus)
+
+    # Logging does not need the write lock of the database it reports on
+    conn = sqlite3.connect(db_path)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        db.create_chat_session()
+    finally:
+        conn.rollback()
+        conn.close()
+
+    assert os.path.exists(event_log_path(db_path))
+    tables = sqlite3.connect(db_path).execute("SELECT name FROM sqlite_master").fetchall()
+    assert ("event_log",) not in tables
+    assert [event["type"] for event in bus.events_since(0)] == ["session-created"]
+
+
+def test_trimmed_log_asks_for_a_resync(db_path):
+    bus = EventBus()
+    bus.persist_to(event_log_path(db_path), retention=50)
+    for i in range(200):
+        bus.publish("message-added", {"i": i})
+
+    assert bus.events_since(0) is None
+    assert bus.events_since(bus.latest_id() + 1) is None
+    assert len(bus.events_since(bus.latest_id() - 10)) == 10
+
+
+def test_unlogged_event_has_no_id(tmp_path):
+    bus = EventBus()
+    bus.persist_to(str(tmp_path / "missing" / "events.db"))
+    subscriber = bus.subscribe()
+
+    event = bus.publish("case-updated", {"case_id": 1})
+
+    assert event["id"] is None
+    assert subscriber.get_nowait() == event
+    assert not format_sse(event).startswith("id:")
@@ -0,0 +1,97 @@
+import pytest
+
+from reference import garages
+from reference.garages import GarageIndex, garage_kind_for, haversine_km, recommend_repair_shop
+from reference.gazetteer import postal_code_prefecture
+from reference.prefectures import find_place
+
+
+def garage(name, address, kind="general"):
+    """A garage row geocoded the way parse_garages does it"""
+    place = find_place(address)
+    return {
+        "kind": kind,
+        "type": {"general": "ΓΕΝΙΚΟ ΣΥΝΕΡΓΕΙΟ", "tyre": "ΒΟΥΛΚΑΝΙΖΑΤΕΡ", "glass": "ΚΡΥΣΤΑΛΛΑΔΙΚΟ"}[kind],
+        "name": name,
+        "address": address,
+        "city": place["name"] if place else None,
+        "postal_code": None,
+        "prefecture": (place["prefecture"] if place else None) or postal_code_prefecture(address),
+        "lat": place["lat"] if place else None,
+        "lon": place["lon"] if place else None,
+    }
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = GarageIndex(
+        [
+            garage("Glyfada Motors", "Λεωφόρος Βουλιαγμένης 10, Γλυφάδα"),
+            garage("Marousi Service", "Κηφισίας 200, Μαρούσι"),
+            garage("Marousi Tyres", "Βασ. Σοφίας 5, Μαρούσι", kind="tyre"),
+            garage("Kriti Auto", "Λεωφόρος Κνωσού 3, Ηράκλειο"),
+            garage("Patras Garage", "Ακτή Δυμαίων 1, 26222"),
+        ]
+    )
+    monkeypatch.setattr(garages, "_garage_index", index)
+    return index
+
+
+def test_garages_are_geocoded_from_their_address(index):
+    assert index.garages[0]["city"] == "Γλυφάδα"
+    assert index.garages[3]["prefecture"] == "Ηράκλειο"
+    # Only a postal code: placed in its prefecture, without coordinates
+    assert index.garages[4]["prefecture"] == "Αχαΐα"
+    assert index.garages[4]["lat"] is None
+
+
+def test_nearest_garage_to_a_point(index):
+    place = find_place("Κηφισιά")
+    garage = index.nearest(place["lat"], place["lon"])
+    assert garage["name"] == "Marousi Service"
+    expected = haversine_km(place["lat"], place["lon"], garage["lat"], garage["lon"])
+    assert garage["distance_km"] == pytest.approx(expected, abs=0.01)
+
+
+def test_nearest_garage_of_a_kind(index):
+    place = find_place("Γλυφάδα")
+    assert index.nearest(place["lat"], place["lon"], kind="tyre")["name"] == "Marousi Tyres"
+    assert index.nearest(place["lat"], place["lon"], kind="glass") is None
+
+
+def test_nearest_to_greeklish_text(index):
+    assert index.nearest_to_text("Irakleio")["name"] == "Kriti Auto"
+    assert index.nearest_to_text("Glyfada")["name"] == "Glyfada Motors"
+
+
+def test_nearest_to_text_falls_back_to_the_prefecture(index):
+    assert index.nearest_to_text("Αχαΐα")["name"] == "Patras Garage"
+    assert index.nearest_to_text("οδός Ερμού, 26221")["name"] == "Patras Garage"
+    assert index.nearest_to_text("κάπου στο δρόμο") is None
+
+
+def test_garage_kind_from_the_description():
+    assert garage_kind_for("Έσπασε το παρμπρίζ") == "glass"
+    assert garage_kind_for("σκασμένο λάστιχο") == "tyre"
+    assert garage_kind_for("δεν παίρνει μπροστά") == "general"
+    assert garage_kind_for(None) == "general"
+
+
+def test_recommend_repair_shop_tries_locations_in_order(index):
+    assert recommend_repair_shop("Irakleio", "Γλυφάδα").startswith("Kriti Auto")
+    assert recommend_repair_shop(None, "Γλυφάδα").startswith("Glyfada Motors")
+    assert recommend_repair_shop("Glyfada", description="σκασμένο λάστιχο").startswith(
+        "Marousi Tyres"
+    )
+
+
+def test_far_away_garages_are_not_recommended(index):
+    # Nearest garage to Ioannina is hundreds of kilometres away
+    assert recommend_repair_shop("Ιωάννινα") is None
+
+
+def test_far_away_specialist_falls_back_to_a_general_garage(index):
+    # The only tyre shop is in Athens; Heraklion has a general garage
+    assert recommend_repair_shop("Ηράκλειο", description="σκασμένο λάστιχο").startswith(
+        "Kriti Auto"
+    )
@@ -0,0 +1,163 @@
+import sqlite3
+import threading
+import time
+
+from database.database import ChatDatabase
+from images.jobs import ImageJobQueue
+
+
+def expire_lease(db_path, job_id):
+    """What a worker killed mid-job leaves behind once its lease runs out"""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "UPDATE image_analysis_jobs SET claimed_at = datetime('now', '-5 minutes') WHERE job_id = ?",
+            (job_id,),
+        )
+
+
+def wait_for_status(db, job_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = db.get_image_job(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} is {db.get_image_job(job_id)['status']}, not {status}")
+
+
+def test_claim_leases_the_oldest_queued_job(db_path):
+    db = ChatDatabase(db_path)
+    first = db.create_image_job("s1", {"images": []})
+    db.create_image_job("s2", {"images": []})
+
+    job = db.claim_next_image_job(lease_seconds=60)
+
+    assert job["job_id"] == first
+    assert job["attempts"] == 1
+    assert db.get_image_job(first)["status"] == "running"
+
+
+def test_running_job_is_not_reclaimed_while_its_lease_holds(db_path):
+    db = ChatDatabase(db_path)
+    job_id = db.create_image_job("s1", {"images": []})
+    db.claim_next_image_job(lease_seconds=60)
+
+    assert db.claim_next_image_job(lease_seconds=60) is None
+    assert db.get_image_job(job_id)["status"] == "running"
+
+
+def test_expired_job_is_reclaimed(db_path):
+    db = ChatDatabase(db_path)
+    job_id = db.create_image_job("s1", {"images": []})
+    db.claim_next_image_job(lease_seconds=60)
+    expire_lease(db_path, job_id)
+
+    job = db.claim_next_image_job(lease_seconds=60)
+
+    assert job["job_id"] == job_id
+    assert job["attempts"] == 2
+
+
+def test_renewed_lease_is_not_reclaimed(db_path):
+    db = ChatDatabase(db_path)
+    job_id = db.create_image_job("s1", {"images": []})
+    db.claim_next_image_job(lease_seconds=60)
+    expire_lease(db_path, job_id)
+
+    assert db.renew_image_job_leases([job_id]) == 1
+    assert db.claim_next_image_job(lease_seconds=60) is None
+
+
+def test_expired_job_out_of_attempts_fails(db_path):
+    db = ChatDatabase(db_path)
+    job_id = db.create_image_job("s1", {"images": []})
+    for _ in range(2):
+        db.claim_next_image_job(lease_seconds=60, max_attempts=2)
+        expire_lease(db_path, job_id)
+
+    assert db.claim_next_image_job(lease_seconds=60, max_attempts=2) is None
+    job = db.get_image_job(job_id)
+    assert job["status"] == "failed"
+    assert job["attempts"] == 2
+
+
+def test_queue_finishes_a_job_left_running_by_a_stopped_worker(db_path):
+    db = ChatDatabase(db_path)
+    job_id = db.create_image_job("s1", {"images": ["a.jpg"]})
+    # The first worker claimed it and died without finishing
+    db.claim_next_image_job(lease_seconds=60)
+    expire_lease(db_path, job_id)
+
+    handled = []
+    queue = ImageJobQueue(
+        db, lambda job: handled.append(job) or {"reply": "ok"}, workers=1, poll_interval=0.05
+    )
+    queue.start(requeue=False)
+    try:
+        job = wait_for_status(db, job_id, "done")
+    finally:
+        queue.stop(timeout=5)
+
+    assert job["result"] == {"reply": "ok"}
+    assert job["attempts"] == 2
+    assert [job["payload"] for job in handled] == [{"images": ["a.jpg"]}]
+
+
+def test_failing_job_is_retried_until_max_attempts(db_path):
+    db = ChatDatabase(db_path)
+    calls = threading.Semaphore(0)
+
+    def handler(job):
+        calls.release()
+        raise RuntimeError("vision model unavailable")
+
+    queue = ImageJobQueue(db, handler, workers=1, poll_interval=0.05, max_attempts=2)
+    queue.start()
+    try:
+        job_id = queue.submit("s1", {"images": []})
+        job = wait_for_status(db, job_id, "failed")
+    finally:
+        queue.stop(timeout=5)
+
+    assert job["attempts"] == 2
+    assert job["error"] == "vision model unavailable"
+
+
+def test_requeue_leaves_jobs_with_a_live_lease_alone(db_path):
+    db = ChatDatabase(db_path)
+    live = db.create_image_job("s1", {"images": []})
+    dead = db.create_image_job("s2", {"images": []})
+    db.claim_next_image_job(lease_seconds=60)
+    db.claim_next_image_job(lease_seconds=60)
+    # The worker running `dead` was killed; the one running `live` still
+    # runs it, e.g. an old worker finishing its job during a reload
+    expire_lease(db_path, dead)
+
+    queue = ImageJobQueue(db, lambda job: {}, lease_seconds=60)
+
+    assert queue.requeue_interrupted() == 1
+    assert db.get_image_job(live)["status"] == "running"
+    assert db.get_image_job(dead)["status"] == "queued"
+
+
+def test_worker_outliving_a_timed_out_stop_still_exits(db_path):
+    db = ChatDatabase(db_path)
+    started, release = threading.Event(), threading.Event()
+
+    def handler(job):
+        started.set()
+        release.wait(5)
+        return {}
+
+    queue = ImageJobQueue(db, handler, workers=1, poll_interval=0.05)
+    queue.start()
+    queue.submit("s1", {"images": []})
+    assert started.wait(5)
+    worker = next(t for t in threading.enumerate() if t.name == "image-job-worker-0")
+
+    queue.stop(timeout=0.05)
+    assert worker.is_alive()
+    release.set()
+    worker.join(5)
+
+    assert not worker.is_alive()
@@ -0,0 +1,60 @@
+import math
+
+import pytest
+
+from reference.knowledge import BM25_B, BM25_K1, KnowledgeIndex, tokenize, write_index
+
+CHUNKS = [
+    {"source": "policy.docx", "page": 1, "text": "Η οδική βοήθεια καλύπτει τη ρυμούλκηση του οχήματος έως το συνεργείο."},
+    {"source": "policy.docx", "page": 2, "text": "Σε τροχαίο ατύχημα συμπληρώνεται δήλωση ατυχήματος από τους οδηγούς."},
+    {"source": "faq.pdf", "page": 7, "text": "Το ελαστικό αντικαθίσταται με τη ρεζέρβα του οχήματος επί τόπου."},
+    {"source": "faq.pdf", "page": 8, "text": "Κλειδιά κλειδωμένα μέσα στο όχημα: αποστέλλεται κλειδαράς."},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = str(tmp_path / "knowledge.idx")
+    write_index(CHUNKS, path, {"files": []})
+    return KnowledgeIndex(path)
+
+
+def test_tokenize_drops_stopwords_and_inflection():
+    assert tokenize("Το όχημα και τα οχήματα") == tokenize("όχημα οχήματα")
+    assert tokenize("ΑΤΥΧΗΜΑ") == tokenize("ατύχημα")
+
+
+def test_chunks_round_trip(index):
+    assert len(index) == len(CHUNKS)
+    for doc_id, chunk in enumerate(CHUNKS):
+        assert index.chunk(doc_id) == chunk
+
+
+def test_best_matching_chunk_comes_first(index):
+    results = index.search("ρυμούλκηση στο συνεργείο", k=3, min_score=0)
+    assert results[0]["page"] == 1
+    assert results[0]["text"] == CHUNKS[0]["text"]
+    assert [r["score"] for r in results] == sorted((r["score"] for r in results), reverse=True)
+
+
+def test_inflected_query_matches(index):
+    assert index.search("ατυχήματος", k=1, min_score=0)[0]["page"] == 2
+
+
+def test_results_are_capped_and_filtered(index):
+    assert len(index.search("οχήματος", k=1, min_score=0)) == 1
+    assert index.search("οχήματος", k=3, min_score=1000) == []
+    assert index.search("άγνωστη λέξη", min_score=0) == []
+
+
+def test_single_term_score_is_bm25(index):
+    # The term occurs once, in one chunk
+    [term] = tokenize("κλειδαράς")
+    assert tokenize(CHUNKS[3]["text"]).count(term) == 1
+    lengths = [len(tokenize(chunk["text"])) for chunk in CHUNKS]
+    idf = math.log(1 + (len(CHUNKS) - 1 + 0.5) / (1 + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[3] / (sum(lengths) / len(lengths)))
+    expected = idf * (BM25_K1 + 1) / (1 + norm)
+
+    [result] = index.search("κλειδαράς", k=1, min_score=0)
+    assert result["score"] == pytest.approx(expected, abs=0.001)
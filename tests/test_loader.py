@@ -0,0 +1,78 @@
+import pytest
+
+from database.loader import RequestLoader
+
+
+@pytest.fixture
+def loader(chat_db):
+    loader = RequestLoader(chat_db)
+    loader.start_counting()
+    yield loader
+    loader.stop_counting()
+
+
+@pytest.fixture
+def session_id(chat_db):
+    session_id = chat_db.create_chat_session()
+    chat_db.add_message(session_id, "user", "Χάλασε το αυτοκίνητο στην Πάτρα")
+    chat_db.update_case_info(session_id, location="Πάτρα")
+    return session_id
+
+
+def test_repeated_reads_run_one_query_each(loader, session_id):
+    loader.get_case_by_session(session_id)
+    loader.get_chat_history(session_id)
+    queries = loader.stats["queries"]
+
+    for _ in range(3):
+        loader.get_case_by_session(session_id)
+        loader.get_chat_history(session_id)
+
+    assert queries > 0
+    assert loader.stats["queries"] == queries
+    assert loader.stats["hits"] == 6
+
+
+def test_message_written_through_the_loader_evicts_the_history(loader, session_id):
+    assert len(loader.get_chat_history(session_id)) == 1
+
+    loader.add_message(session_id, "assistant", "Στέλνουμε οδική βοήθεια")
+
+    assert len(loader.get_chat_history(session_id)) == 2
+
+
+def test_case_update_evicts_the_case(loader, session_id):
+    assert loader.get_case_by_session(session_id)["location"] == "Πάτρα"
+
+    loader.update_case_info(session_id, location="Αθήνα")
+
+    assert loader.get_case_by_session(session_id)["location"] == "Αθήνα"
+
+
+def test_write_by_case_id_evicts_the_case_of_its_session(loader, session_id):
+    case = loader.get_case_by_session(session_id)
+    history = loader.get_chat_history(session_id)
+
+    loader.update_case_flags(case["id"], fraud=True)
+
+    assert loader.get_case_by_session(session_id)["flags"]["is_fraud"]
+    # Only the kinds of row the write changes are dropped
+    assert loader.get_chat_history(session_id) is history
+
+
+def test_write_leaves_other_sessions_cached(chat_db, loader, session_id):
+    other = chat_db.create_chat_session()
+    chat_db.update_case_info(other, location="Λάρισα")
+    other_case = loader.get_case_by_session(other)
+
+    loader.update_case_info(session_id, location="Αθήνα")
+
+    assert loader.get_case_by_session(other) is other_case
+
+
+def test_write_by_another_connection_is_not_seen_until_the_next_loader(chat_db, loader, session_id):
+    loader.get_chat_history(session_id)
+    chat_db.add_message(session_id, "assistant", "Στέλνουμε οδική βοήθεια")
+
+    assert len(loader.get_chat_history(session_id)) == 1
+    assert len(RequestLoader(chat_db).get_chat_history(session_id)) == 2
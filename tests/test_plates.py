@@ -0,0 +1,76 @@
+import pytest
+
+from database.database import ChatDatabase
+from database.plates import format_plate, normalize_plate
+
+
+@pytest.mark.parametrize(
+    "raw",
+    ["ΙΚΥ 1234", "IKY-1234", "iky1234", "ικυ 1234", " Ι.Κ.Υ.-1234 ", "Ικύ-1234"],
+)
+def test_spellings_of_one_plate_share_a_key(raw):
+    assert normalize_plate(raw) == "IKY1234"
+
+
+def test_greek_letters_become_their_latin_twins():
+    assert normalize_plate("ΡΑΧ 5678") == normalize_plate("PAX 5678") == normalize_plate("RAX 5678")
+
+
+@pytest.mark.parametrize(
+    ("raw", "key"),
+    [
+        ("RO12 ABC", "RO12ABC"),  # British
+        ("HH-RX 123", "HHRX123"),  # German
+        ("RAX 123", "RAX123"),  # not four digits
+        ("RLX 1234", "RLX1234"),  # Λ has no Latin twin, so L is no Greek letter
+    ],
+)
+def test_plates_that_cannot_be_greek_are_not_folded(raw, key):
+    assert normalize_plate(raw) == key
+
+
+def test_foreign_plates_differing_in_r_and_p_are_two_vehicles(db_path):
+    db = ChatDatabase(db_path)
+    first = db.create_chat_session()
+    second = db.create_chat_session()
+    db.update_case_info(first, registration_number="RO12 ABE")
+    db.update_case_info(second, registration_number="PO12 ABE")
+
+    assert [c["session_id"] for c in db.get_cases_by_plate("RO12ABE")] == [first]
+    assert db.get_case_by_session(first)["registration_number"] == "RO12ABE"
+
+
+def test_letters_mistyped_as_digits():
+    assert normalize_plate("ΙΚΥ 1O3I") == "IKY1031"
+    # Not in the digit part
+    assert normalize_plate("ΟΙΚ 1234") == "OIK1234"
+
+
+def test_empty_plates():
+    assert normalize_plate(None) is None
+    assert normalize_plate("") is None
+    assert normalize_plate(" - ") is None
+
+
+def test_format_plate():
+    assert format_plate("ικυ 1234") == "IKY-1234"
+    assert format_plate("ΥΧΡ1234") == "YXP-1234"
+    # Not a plate shape: kept as a key, or as typed when nothing is left
+    assert format_plate("AB 12 CD") == "AB12CD"
+    assert format_plate(" - ") == "-"
+    assert format_plate(None) is None
+
+
+def test_cases_are_found_by_any_spelling_of_their_plate(db_path):
+    db = ChatDatabase(db_path)
+    first = db.create_chat_session()
+    second = db.create_chat_session()
+    db.update_case_info(first, registration_number="ΙΚΥ 1234")
+    db.update_case_info(second, registration_number="iky-1234")
+
+    cases = db.get_cases_by_plate("IKY1234")
+    assert {case["session_id"] for case in cases} == {first, second}
+    assert {case["registration_number"] for case in cases} == {"IKY-1234"}
+    assert [c["session_id"] for c in db.get_cases_by_plate("ικυ 1234", exclude_session_id=first)] == [
+        second
+    ]
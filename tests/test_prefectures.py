@@ -0,0 +1,84 @@
+import pytest
+
+from reference.prefectures import (
+    PlaceIndex,
+    find_place,
+    fold,
+    resolve_prefecture,
+    same_prefecture,
+    skeleton,
+)
+
+
+def test_greek_and_greeklish_spellings_fold_together():
+    assert skeleton("ηρακλειο") == skeleton("irakleiou") == skeleton("ηρακλιο") == "irakl"
+    assert fold("θεσσαλονικη") == fold("thessaloniki")
+
+
+@pytest.mark.parametrize(
+    "text, prefecture",
+    [
+        ("Ηράκλειο", "Ηράκλειο"),
+        ("Irakleio", "Ηράκλειο"),
+        ("Hrakleiou", "Ηράκλειο"),
+        ("στο κέντρο του Ηρακλείου", "Ηράκλειο"),
+        ("Patras", "Αχαΐα"),
+        ("Θεσαλονικη", "Θεσσαλονίκη"),
+        ("Nea Smirni", "Αττική"),
+        ("Λεωφόρος Βουλιαγμένης 102, Ελληνικό", "Αττική"),
+        ("Ερμού 12, 26221", "Αχαΐα"),
+        ("στην εθνική οδό Αθηνών Λαμίας", "Φθιώτιδα"),
+    ],
+)
+def test_resolve_prefecture(text, prefecture):
+    assert resolve_prefecture(text) == prefecture
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["μπροστά στο κατάστημα ηλεκτρικών ειδών", "στο πάρκινγκ του νοσοκομείου", "", "βαριά ζημιά"],
+)
+def test_unplaceable_text(text):
+    assert resolve_prefecture(text) is None
+    assert find_place(text) is None
+
+
+def test_find_place_returns_coordinates():
+    place = find_place("Irakleio")
+    assert place["name"] == "Ηράκλειο"
+    assert place["prefecture"] == "Ηράκλειο"
+    assert (place["lat"], place["lon"]) == pytest.approx((35.339, 25.144))
+
+
+def test_find_place_skips_bare_prefectures():
+    assert find_place("Γλυφάδα, Αττική")["name"] == "Γλυφάδα"
+    assert find_place("Αττική") is None
+    assert resolve_prefecture("Αττική") == "Αττική"
+
+
+def test_postal_code_wins_over_a_guessed_name():
+    # "Kalanata" alone is guessed to be Καλαμάτα
+    assert resolve_prefecture("Kalanata") == "Μεσσηνία"
+    assert resolve_prefecture("Kalanata 71202") == "Ηράκλειο"
+    assert find_place("Kalanata 71202") is None
+
+
+def test_same_prefecture():
+    assert same_prefecture("Γλυφάδα", "Marousi") is True
+    assert same_prefecture("Γλυφάδα", "Patra") is False
+    assert same_prefecture("Γλυφάδα", "κάπου") is None
+    assert same_prefecture(None, "Patra") is None
+
+
+def test_index_exact_and_fuzzy_lookups():
+    index = PlaceIndex([("Καλαμάτα", {"name": "Καλαμάτα"}), ("Καλαμαριά", {"name": "Καλαμαριά"})])
+    assert index.exact(fold("καλαματα"))["name"] == "Καλαμάτα"
+    assert index.exact("kalam") is None
+    assert index.fuzzy("kalamta", 1)["name"] == "Καλαμάτα"
+    assert index.fuzzy("kalamaria", 2)["name"] == "Καλαμαριά"
+    assert index.fuzzy("xalkida", 2) is None
+
+
+def test_index_keeps_the_first_entry_of_a_key():
+    index = PlaceIndex([("Λάρισα", {"name": "place"}), ("Λάρισα", {"name": "prefecture"})])
+    assert index.exact(fold("λαρισα"))["name"] == "place"
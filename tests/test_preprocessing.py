@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from images.preprocessing import ORIGINAL_MARKER, preprocess_image
+
+
+def save_photo(path, size, quality, exif=None):
+    """A noisy photo, so the JPEG size depends on the quality setting"""
+    image = Image.effect_noise(size, 64).convert("RGB")
+    options = {"exif": exif.tobytes()} if exif is not None else {}
+    image.save(path, format="JPEG", quality=quality, **options)
+    return str(path)
+
+
+def camera_exif():
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"  # Make
+    exif[0x0110] = "Phone 12"  # Model
+    return exif
+
+
+def test_large_photo_is_downscaled_without_exif(tmp_path):
+    path = save_photo(tmp_path / "photo.jpg", (2400, 1800), 95, camera_exif())
+
+    result = preprocess_image(path, max_dimension=800)
+
+    assert result["path"] != path
+    assert result["processed_bytes"] < result["original_bytes"]
+    with Image.open(result["path"]) as analyzed:
+        assert max(analyzed.size) == 800
+        assert not analyzed.getexif()
+
+
+def test_small_photo_with_exif_is_still_stripped(tmp_path):
+    # Re-encoding at a higher quality makes it larger, but its metadata
+    # (camera, GPS position) must not reach the model
+    path = save_photo(tmp_path / "photo.jpg", (200, 150), 10, camera_exif())
+
+    result = preprocess_image(path, quality=95)
+
+    assert result["path"] != path
+    with Image.open(result["path"]) as analyzed:
+        assert not analyzed.getexif()
+    assert not os.path.exists(result["path"] + ORIGINAL_MARKER)
+
+
+def test_small_clean_photo_is_analyzed_as_uploaded(tmp_path):
+    path = save_photo(tmp_path / "photo.jpg", (200, 150), 10)
+
+    result = preprocess_image(path, quality=95)
+
+    assert result["path"] == path
+    assert os.path.exists(f"{tmp_path / 'photo'}.vision.jpg{ORIGINAL_MARKER}")
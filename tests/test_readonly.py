@@ -0,0 +1,59 @@
+import os
+import sqlite3
+
+import pytest
+
+from database.database import ChatDatabase
+from database.readonly import ReadOnlyChatDatabase, open_read_only
+from database.sharding import open_database
+
+
+@pytest.mark.parametrize("shards", [1, 3])
+def test_reads_of_a_fresh_database_are_empty(db_path, shards):
+    reader = open_read_only(open_database(db_path, shards=shards, lazy_schema=True))
+
+    assert reader.get_all_sessions() == []
+    assert reader.get_session("missing") is None
+    assert reader.get_cases_by_plate("IKY1234") == []
+    assert reader.get_cases_by_tags(["ac"])["total"] == 0
+
+
+@pytest.mark.parametrize("shards", [1, 3])
+def test_reads_see_the_writers_rows(db_path, shards):
+    db = open_database(db_path, shards=shards, lazy_schema=True)
+    reader = open_read_only(db)
+    assert reader.get_all_sessions() == []
+
+    session_id = db.create_chat_session(customer_name="Νίκος")
+    db.update_case_info(session_id, registration_number="ΙΚΥ 1234")
+
+    assert [s["session_id"] for s in reader.get_all_sessions()] == [session_id]
+    assert reader.get_case_by_session(session_id)["registration_number"] == "IKY-1234"
+
+
+def test_reader_cannot_write(db_path):
+    reader = open_read_only(ChatDatabase(db_path))
+    with pytest.raises(sqlite3.OperationalError):
+        reader.create_chat_session()
+
+
+def test_connections_are_reused(db_path):
+    reader = open_read_only(ChatDatabase(db_path), pool_size=2)
+    for _ in range(5):
+        reader.get_all_sessions()
+    assert len(reader._idle) == 1
+
+
+def test_snapshot_reads_lag_until_refreshed(db_path):
+    db = ChatDatabase(db_path)
+    first = db.create_chat_session()
+    reader = ReadOnlyChatDatabase(db_path, snapshot_interval=3600, writer=db)
+
+    assert [s["session_id"] for s in reader.get_all_sessions()] == [first]
+    assert os.path.exists(reader.snapshot_path)
+
+    second = db.create_chat_session()
+    assert len(reader.get_all_sessions()) == 1
+
+    reader.refresh_snapshot()
+    assert {s["session_id"] for s in reader.get_all_sessions()} == {first, second}
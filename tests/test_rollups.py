@@ -0,0 +1,107 @@
+import sqlite3
+
+import pytest
+
+from database.database import ChatDatabase
+from database.rollups import since_bucket, summarize_rollups
+from database.sharding import open_database
+
+
+def case_counts(db, granularity="day"):
+    """{case_type: (cases, fast_track, fraud)} over the rollup rows still counting something"""
+    totals = {}
+    for row in db.get_rollups(granularity, since_bucket(granularity, 2))["cases"]:
+        cases, fast_track, fraud = totals.get(row["case_type"], (0, 0, 0))
+        totals[row["case_type"]] = (cases + row["cases"], fast_track + row["fast_track"], fraud + row["fraud"])
+    return {case_type: counts for case_type, counts in totals.items() if any(counts)}
+
+
+@pytest.fixture(params=[1, 3], ids=["single", "sharded"])
+def db(request, db_path):
+    return open_database(db_path, shards=request.param)
+
+
+def test_new_case_is_counted_in_every_granularity(db):
+    db.update_case_info(db.create_chat_session(), case_type="AC")
+    assert case_counts(db, "hour") == case_counts(db, "day") == {"AC": (1, 0, 0)}
+
+
+def test_retyped_case_moves_between_types(db):
+    session_id = db.create_chat_session()
+    db.update_case_info(session_id, case_type="AC")
+    db.update_case_info(session_id, case_type="RA")
+    assert case_counts(db) == {"RA": (1, 0, 0)}
+
+
+def test_flags_are_retracted_and_added_back(db):
+    case_id = db.update_case_info(db.create_chat_session(), case_type="AC")
+    db.update_case_flags(case_id=case_id, fast_track=True)
+    db.update_case_flags(case_id=case_id, fraud=True)
+    assert case_counts(db) == {"AC": (1, 1, 1)}
+
+    db.update_case_flags(case_id=case_id, fast_track=False)
+    db.update_case_flags(case_id=case_id, delay_voucher=True)
+    assert case_counts(db) == {"AC": (1, 0, 1)}
+
+
+def test_rebuild_matches_the_incremental_counts(db):
+    for case_type in ("AC", "AC", "RA"):
+        case_id = db.update_case_info(db.create_chat_session(), case_type=case_type)
+        db.update_case_flags(case_id=case_id, fast_track=case_type == "RA")
+    incremental = case_counts(db)
+
+    db.rebuild_rollups()
+    assert case_counts(db) == incremental == {"AC": (2, 0, 0), "RA": (1, 1, 0)}
+
+
+def test_ended_sessions_are_counted(db):
+    session_id = db.create_chat_session()
+    db.end_session(session_id)
+    sessions = db.get_rollups("day", since_bucket("day", 2))["sessions"]
+    assert sum(row["sessions_ended"] for row in sessions) == 1
+
+
+def test_summary_rates(db):
+    for fraud in (True, False, False, False):
+        case_id = db.update_case_info(db.create_chat_session(), case_type="AC")
+        db.update_case_flags(case_id=case_id, fraud=fraud)
+
+    totals = summarize_rollups(db.get_rollups("day", since_bucket("day", 2)))["totals"]
+    assert totals["cases"] == 4
+    assert totals["by_type"] == {"AC": 4, "RA": 0, "OTHER": 0}
+    assert totals["fraud_rate"] == 0.25
+    assert totals["avg_session_seconds"] is None
+
+
+def make_legacy_duplicates(db_path, case_id):
+    """What older versions left: a detail row per chat turn, counted per row"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP INDEX idx_case_flags_case_unique")
+    conn.execute("DROP INDEX idx_case_summary_case_unique")
+    conn.execute("INSERT INTO case_flags (case_id, is_fast_track, is_fraud) VALUES (?, 1, 0)", (case_id,))
+    conn.execute("INSERT INTO case_flags (case_id, is_fast_track, is_fraud) VALUES (?, 0, 1)", (case_id,))
+    conn.execute("INSERT INTO case_summary (case_id, tags) VALUES (?, '[\"stale\"]')", (case_id,))
+    conn.execute("INSERT INTO case_summary (case_id, tags) VALUES (?, '[\"latest\"]')", (case_id,))
+    conn.commit()
+    conn.close()
+
+
+def test_legacy_duplicate_rows_are_collapsed(db_path):
+    db = ChatDatabase(db_path)
+    case_id = db.update_case_info(db.create_chat_session(), case_type="AC")
+    db.update_case_flags(case_id=case_id, fast_track=True)
+    make_legacy_duplicates(db_path, case_id)
+    db.rebuild_rollups()
+    assert case_counts(db) == {"AC": (3, 2, 1)}
+
+    # Reopening migrates: the latest row of each case stays
+    db = ChatDatabase(db_path)
+    assert case_counts(db) == {"AC": (1, 0, 1)}
+    assert db.get_case_by_session(db.get_all_sessions()[0]["session_id"])["summary"]["tags"] == [
+        "latest"
+    ]
+    assert db.get_cases_by_tags(["stale"])["total"] == 0
+    assert db.get_cases_by_tags(["latest"])["total"] == 1
+
+    with sqlite3.connect(db_path) as conn, pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO case_flags (case_id) VALUES (?)", (case_id,))
@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+from database.sharding import CASE_ID_SPAN, ShardedChatDatabase, open_database, shard_path
+
+SHARDS = 3
+
+
+@pytest.fixture
+def db(db_path):
+    return open_database(db_path, shards=SHARDS)
+
+
+def test_open_database_shards_only_when_asked(db_path):
+    assert not isinstance(open_database(db_path), ShardedChatDatabase)
+    assert isinstance(open_database(db_path, shards=2), ShardedChatDatabase)
+
+
+def test_every_shard_file_is_created_up_front(db_path):
+    open_database(db_path, shards=SHARDS, lazy_schema=True)
+    for i in range(SHARDS):
+        assert os.path.exists(shard_path(db_path, i, SHARDS))
+
+
+def test_session_rows_live_in_its_shard(db):
+    session_id = db.create_chat_session(customer_name="Μαρία")
+    db.add_message(session_id, "user", "Καλησπέρα")
+    shard = db.shard_for(session_id)
+
+    assert shard.get_session(session_id)["customer_name"] == "Μαρία"
+    assert [m["message"] for m in shard.get_chat_history(session_id)] == ["Καλησπέρα"]
+    for other in db.shards:
+        if other is not shard:
+            assert other.get_session(session_id) is None
+    assert db.get_chat_history(session_id) == shard.get_chat_history(session_id)
+
+
+def test_case_ids_name_their_shard(db):
+    for _ in range(20):
+        session_id = db.create_chat_session()
+        case_id = db.update_case_info(session_id, case_type="RA", location="Πάτρα")
+        shard = db.shard_for(session_id)
+
+        assert db.shard_for_case(case_id) is shard
+        assert db.shards.index(shard) == case_id // CASE_ID_SPAN
+
+        db.update_case_flags(case_id=case_id, fast_track=True)
+        assert shard.get_case_by_session(session_id)["flags"]["is_fast_track"]
+
+
+def test_sessions_spread_over_the_shards(db):
+    sessions = [db.create_chat_session() for _ in range(60)]
+    assert all(len(shard.get_all_sessions()) for shard in db.shards)
+    assert sum(len(shard.get_all_sessions()) for shard in db.shards) == len(sessions)
+
+
+def test_listings_gather_every_shard_in_order(db):
+    sessions = [db.create_chat_session() for _ in range(12)]
+
+    listed = db.get_all_sessions()
+    assert {s["session_id"] for s in listed} == set(sessions)
+    started = [s["started_at"] for s in listed]
+    assert started == sorted(started, reverse=True)
+
+
+def test_plate_lookups_gather_every_shard(db):
+    sessions = [db.create_chat_session() for _ in range(8)]
+    for session_id in sessions:
+        db.update_case_info(session_id, registration_number="ΙΚΥ 1234")
+
+    assert {c["session_id"] for c in db.get_cases_by_plate("IKY-1234")} == set(sessions)
+    assert len(db.get_cases_by_plate("iky1234", exclude_session_id=sessions[0])) == 7
+
+
+def test_tag_search_sums_every_shard(db):
+    sessions = [db.create_chat_session() for _ in range(8)]
+    for i, session_id in enumerate(sessions):
+        case_id = db.update_case_info(session_id, case_type="AC")
+        db.update_case_summary(case_id=case_id, tags=["ac", "fraud-risk"] if i % 2 else ["ac"])
+
+    result = db.get_cases_by_tags(["fraud-risk"])
+    assert result["total"] == 4
+    assert result["tag_counts"] == {"fraud-risk": 4}
+    assert len(db.get_cases_by_tags(["ac"], limit=3)["cases"]) == 3
+    assert db.get_cases_by_tags(["ac", "fraud-risk"], match_all=True)["total"] == 4
+
+
+def test_shared_tables_stay_in_the_main_file(db):
+    job_id = db.create_image_job("s1", {"images": []})
+    assert db.primary.get_image_job(job_id)["status"] == "queued"
+    assert all(shard.get_image_job(job_id) is None for shard in db.shards)
+
+
+def sessions_on_other_shards(db, plate):
+    """One session with a case of this plate on each shard"""
+    sessions = {}
+    while len(sessions) < SHARDS:
+        session_id = db.create_chat_session()
+        shard = db.shard_for(session_id)
+        if shard not in sessions:
+            db.update_case_info(session_id, registration_number=plate, location="Πάτρα")
+            sessions[shard] = session_id
+    return sessions
+
+
+def test_case_writes_bump_sessions_listing_it_on_other_shards(db):
+    sessions = sessions_on_other_shards(db, "ΙΚΥ 1234")
+    writer, *others = sessions.items()
+    shard, session_id = writer
+
+    def versions():
+        return [other.get_session_version(sid) for other, sid in others]
+
+    before = versions()
+    db.update_case_info(session_id, location="Αθήνα")
+    after_write = versions()
+    # Nothing changed, or nothing the other sessions show
+    db.update_case_info(session_id, location="Αθήνα")
+    db.update_case_info(session_id, final_destination="Λάρισα")
+
+    assert all(a > b for a, b in zip(after_write, before))
+    assert versions() == after_write